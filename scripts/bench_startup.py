@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+"""
+Cold start benchmark for the MCP Geocoding Server
+Starts the server over stdio the way an editor does and measures the time
+from process start to the first tools/list response and to the first
+get_coordinates response answered without the network (an offline airport
+code, so no Nominatim request is made)
+
+Usage: python scripts/bench_startup.py [--runs N] [--loop auto|uvloop|asyncio]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import IO, Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SERVER_COMMAND = [
+    sys.executable,
+    "-c",
+    "from geocode_mcp.server import run_server; run_server()",
+]
+
+
+def _request(stdin: IO[str], message_id: int, method: str, params: Any) -> None:
+    message = {"jsonrpc": "2.0", "id": message_id, "method": method, "params": params}
+    stdin.write(json.dumps(message) + "\n")
+    stdin.flush()
+
+
+def _response(stdout: IO[str], message_id: int) -> dict[str, Any]:
+    """Read messages until the response to ``message_id`` arrives."""
+    for line in stdout:
+        message = json.loads(line)
+        if message.get("id") == message_id:
+            if "error" in message:
+                raise RuntimeError(f"Server error: {message['error']}")
+            return message["result"]
+    raise RuntimeError("Server exited before responding")
+
+
+def measure(location: str, env: dict[str, str]) -> dict[str, float]:
+    """Start one server process and time its first responses, in seconds."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        SERVER_COMMAND,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        env=env,
+    )
+    assert process.stdin is not None and process.stdout is not None
+    try:
+        _request(
+            process.stdin,
+            1,
+            "initialize",
+            {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {},
+                "clientInfo": {"name": "bench-startup", "version": "1.0"},
+            },
+        )
+        _response(process.stdout, 1)
+        initialized = time.perf_counter()
+
+        process.stdin.write(
+            json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + "\n"
+        )
+        _request(process.stdin, 2, "tools/list", {})
+        _response(process.stdout, 2)
+        listed = time.perf_counter()
+
+        _request(
+            process.stdin,
+            3,
+            "tools/call",
+            {"name": "get_coordinates", "arguments": {"location": location}},
+        )
+        result = _response(process.stdout, 3)
+        answered = time.perf_counter()
+        if '"source": "offline"' not in result["content"][0]["text"]:
+            raise RuntimeError(f"{location!r} was not answered offline")
+    finally:
+        process.stdin.close()
+        process.wait(timeout=10)
+
+    return {
+        "initialize": initialized - started,
+        "list_tools": listed - started,
+        "get_coordinates": answered - started,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="server starts to time")
+    parser.add_argument(
+        "--loop",
+        choices=("auto", "uvloop", "asyncio"),
+        help="event loop for the server (sets GEOCODE_MCP_EVENT_LOOP)",
+    )
+    parser.add_argument("--location", default="SEA", help="offline location to look up")
+    parser.add_argument("--json", action="store_true", help="print raw timings")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(PROJECT_ROOT / "src"), env.get("PYTHONPATH")])
+    )
+    if args.loop:
+        env["GEOCODE_MCP_EVENT_LOOP"] = args.loop
+
+    # One untimed start so every timed run sees warm OS file caches and
+    # compiled bytecode, as an editor reopening a window would
+    measure(args.location, env)
+    runs = [measure(args.location, env) for _ in range(args.runs)]
+
+    if args.json:
+        print(json.dumps(runs))
+        return
+    print(f"{args.runs} runs, loop={env.get('GEOCODE_MCP_EVENT_LOOP', 'auto')}")
+    for phase in runs[0]:
+        timings = sorted(run[phase] * 1000 for run in runs)
+        print(
+            f"  first {phase + ' response:':<26}"
+            f"median {statistics.median(timings):7.1f} ms  "
+            f"min {timings[0]:7.1f} ms  max {timings[-1]:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
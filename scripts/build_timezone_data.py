@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+"""
+Rebuild the bundled timezone index
+Downloads the pinned timezone-boundary-builder polygons (the release with
+oceans, as packaged in the timezonefinder source distribution), checks their
+SHA-256, and writes src/geocode_mcp/data/timezones.bin with the default cell
+size and simplification tolerance
+
+The polygons are read straight from timezonefinder's data files, so neither
+timezonefinder nor numpy needs to be installed. With --check the index is
+rebuilt to a temporary file and compared with the committed one.
+
+Usage: python scripts/build_timezone_data.py [--source SDIST] [--check]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import sys
+import tarfile
+import tempfile
+import urllib.request
+from array import array
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+# Run against this checkout's sources
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from geocode_mcp.geometry import simplify_geometry
+from geocode_mcp.timezones import (
+    DATA_DIR,
+    DEFAULT_CELL_SIZE,
+    DEFAULT_TOLERANCE,
+    build_index,
+)
+
+# timezonefinder 6.5.9 packages the 444-zone timezone-boundary-builder
+# release with oceans
+SOURCE_URL = (
+    "https://files.pythonhosted.org/packages/5e/4d/"
+    "8694391d6b014bc49f8fd2eb8c05c94526b36fba8dc76d439f3d51948e46/"
+    "timezonefinder-6.5.9.tar.gz"
+)
+SOURCE_SHA256 = "0d84c792a499fd098a35c701c3e3293423ba8d45c81b3eecd7c7cb72c7f1f415"
+
+# Coordinates are stored as int32 multiples of this many degrees
+COORDINATE_UNIT = 10**-7
+
+DESTINATION = DATA_DIR / "timezones.bin"
+
+
+def fetch_source(path: Path | None) -> bytes:
+    """The pinned source distribution, downloaded unless ``path`` is given."""
+    if path is not None:
+        data = path.read_bytes()
+    else:
+        with urllib.request.urlopen(SOURCE_URL) as response:
+            data = response.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if digest != SOURCE_SHA256:
+        raise ValueError(f"Source checksum mismatch: {digest} != {SOURCE_SHA256}")
+    return data
+
+
+def _read_members(archive: bytes) -> dict[str, bytes]:
+    """Data files of the timezonefinder package, by file name."""
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz") as tar:
+        files = {}
+        for member in tar.getmembers():
+            parts = member.name.split("/")
+            if len(parts) == 3 and parts[1] == "timezonefinder" and member.isfile():
+                extracted = tar.extractfile(member)
+                if extracted is not None:
+                    files[parts[2]] = extracted.read()
+        return files
+
+
+def _values(data: bytes, typecode: str) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _ring(data: bytes, offset: int, count: int) -> list[list[float]]:
+    """Read ``count`` int32 longitudes followed by as many latitudes."""
+    xs = _values(data[offset : offset + 4 * count], "i")
+    ys = _values(data[offset + 4 * count : offset + 8 * count], "i")
+    return [
+        [x * COORDINATE_UNIT, y * COORDINATE_UNIT] for x, y in zip(xs, ys, strict=True)
+    ]
+
+
+def read_zones(files: dict[str, bytes]) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Yield each zone's name and MultiPolygon geometry."""
+    names = json.loads(files["timezone_names.json"])
+    first_polygon = _values(files["poly_nr2zone_id.bin"], "H")
+    coord_amount = _values(files["poly_coord_amount.bin"], "I")
+    polygon_offset = _values(files["poly_adr2data.bin"], "I")
+    hole_registry = json.loads(files["hole_registry.json"])
+    hole_amount = _values(files["hole_coord_amount.bin"], "H")
+    hole_offset = _values(files["hole_adr2data.bin"], "I")
+    polygon_data, hole_data = files["poly_data.bin"], files["hole_data.bin"]
+
+    for zone, name in enumerate(names):
+        polygons = []
+        for polygon in range(first_polygon[zone], first_polygon[zone + 1]):
+            rings = [
+                _ring(polygon_data, polygon_offset[polygon], coord_amount[polygon])
+            ]
+            holes, first_hole = hole_registry.get(str(polygon), (0, 0))
+            for hole in range(first_hole, first_hole + holes):
+                rings.append(_ring(hole_data, hole_offset[hole], hole_amount[hole]))
+            polygons.append(rings)
+        yield name, {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def build(archive: bytes, destination: Path) -> int:
+    """Write the index for the pinned polygons; returns the zone count."""
+    zones = (
+        (name, simplify_geometry(geometry, DEFAULT_TOLERANCE))
+        for name, geometry in read_zones(_read_members(archive))
+    )
+    return build_index(zones, destination, DEFAULT_CELL_SIZE, DEFAULT_TOLERANCE)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--source",
+        type=Path,
+        help="Use a local copy of the pinned source distribution",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Compare a fresh build with the committed index instead",
+    )
+    args = parser.parse_args()
+    archive = fetch_source(args.source)
+
+    if not args.check:
+        count = build(archive, DESTINATION)
+        print(f"Wrote {count} zones to {DESTINATION}")
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "timezones.bin"
+        build(archive, path)
+        if path.read_bytes() != DESTINATION.read_bytes():
+            sys.exit(f"{DESTINATION} does not match a fresh build")
+    print(f"{DESTINATION} matches a fresh build")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+"""
+Replay benchmark for the MCP Geocoding Server
+Replays a capture log (written with GEOCODE_MCP_CAPTURE set) through the
+server's get_coordinates handler against a local stub of the Nominatim API,
+at the original pace, scaled, or as fast as possible, and reports cache hit
+ratios, latency percentiles and the number of upstream requests
+
+Captured queries are hashes, so each one is replayed as a synthetic location
+derived from its hash (repeats stay repeats) and offline answers are replayed
+as an airport code. Each call is replayed in its captured session, so the
+server's per-session limits and fair queueing apply as they did live;
+GEOCODE_MCP_REDIS_URL applies as usual.
+
+Usage: python scripts/replay_capture.py LOG [--speed 1|N|max] [--json]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import sys
+import time
+from collections import Counter
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+from aiohttp import web
+
+# Run against this checkout's sources
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from geocode_mcp import server
+from geocode_mcp.capture import (
+    OUTCOMES,
+    CallRecord,
+    CaptureLog,
+    load_records,
+    read_records,
+)
+from geocode_mcp.client import GeocodeClient
+from geocode_mcp.l2cache import cache_from_env
+from geocode_mcp.ratelimit import RateLimiter
+
+# Replayed for calls that were answered by the offline tables
+OFFLINE_LOCATION = "SEA"
+
+# Outcomes that did not need a Nominatim request
+HITS = ("offline", "cache", "l2")
+
+
+class StubNominatim:
+    """Local /search endpoint answering every query after a fixed delay."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.requests = 0
+        self._runner: web.AppRunner | None = None
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        query = request.query.get("q", "")
+        digest = hashlib.blake2b(query.encode(), digest_size=8).digest()
+        lat = int.from_bytes(digest[:4]) / 2**32 * 170 - 85
+        lon = int.from_bytes(digest[4:]) / 2**32 * 360 - 180
+        limit = int(request.query.get("limit", 1))
+        return web.json_response(
+            [
+                {
+                    "lat": str(lat),
+                    "lon": str(lon + i / 1000),
+                    "display_name": f"{query} #{i}",
+                    "place_id": int.from_bytes(digest[:6]) + i,
+                    "type": "city",
+                    "class": "place",
+                    "importance": 0.5,
+                    "boundingbox": [lat - 0.1, lat + 0.1, lon - 0.1, lon + 0.1],
+                }
+                for i in range(limit)
+            ]
+        )
+
+    async def start(self) -> str:
+        """Serve on a free local port and return the base URL."""
+        app = web.Application()
+        app.router.add_get("/search", self.search)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def _percentile(values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return 0.0
+    rank = max(1, round(percent / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(records: Sequence[CallRecord]) -> dict[str, Any]:
+    """Outcome counts, hit ratio and latency percentiles (ms) of some calls."""
+    outcomes = Counter(record.outcome for record in records)
+    latencies = sorted(record.latency * 1000 for record in records)
+    return {
+        "calls": len(records),
+        "sessions": len({record.session for record in records}),
+        "outcomes": {outcome: outcomes[outcome] for outcome in OUTCOMES},
+        "hit_ratio": (
+            sum(outcomes[outcome] for outcome in HITS) / len(records)
+            if records
+            else 0.0
+        ),
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p90": _percentile(latencies, 90),
+            "p99": _percentile(latencies, 99),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+    }
+
+
+def _arguments(record: CallRecord) -> dict[str, Any]:
+    if record.outcome == "offline":
+        location = OFFLINE_LOCATION
+    else:
+        location = f"replay {record.query.hex()}"
+    return {"location": location, "limit": max(1, record.limit)}
+
+
+async def replay(
+    records: Sequence[CallRecord],
+    speed: float | None,
+    upstream_latency: float,
+    rate: float,
+    concurrency: int,
+) -> dict[str, Any]:
+    """Replay ``records`` and summarize the calls as the server saw them.
+
+    ``speed`` divides the original gaps between calls; ``None`` sends them
+    back to back, at most ``concurrency`` at a time.
+    """
+    stub = StubNominatim(upstream_latency)
+    base_url = await stub.start()
+    server.client = GeocodeClient(
+        base_url, limiter=RateLimiter(rate), l2=cache_from_env()
+    )
+    log = io.BytesIO()
+    server.capture = CaptureLog(log)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(record: CallRecord) -> None:
+        # Ordinal 0 marks calls that were made outside an MCP session
+        await server.call_tool_in_session(
+            "get_coordinates", _arguments(record), record.session or None
+        )
+
+    async def paced(record: CallRecord) -> None:
+        async with semaphore:
+            await call(record)
+
+    loop = asyncio.get_running_loop()
+    tasks = []
+    started = time.perf_counter()
+    try:
+        if speed is None:
+            tasks = [asyncio.ensure_future(paced(record)) for record in records]
+        else:
+            origin, first = loop.time(), records[0].timestamp if records else 0.0
+            for record in records:
+                delay = origin + (record.timestamp - first) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.ensure_future(call(record)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    finally:
+        await server.client.close()
+        await stub.stop()
+
+    log.seek(0)
+    summary = summarize(list(read_records(log)))
+    summary["wall_time_s"] = elapsed
+    summary["upstream_requests"] = stub.requests
+    return summary
+
+
+def _print_summary(title: str, summary: dict[str, Any]) -> None:
+    print(title)
+    counts = ", ".join(
+        f"{outcome} {count}" for outcome, count in summary["outcomes"].items() if count
+    )
+    print(f"  calls:      {summary['calls']} ({counts})")
+    print(f"  sessions:   {summary['sessions']}")
+    print(f"  hit ratio:  {summary['hit_ratio']:.1%}")
+    latency = summary["latency_ms"]
+    print(
+        f"  latency:    p50 {latency['p50']:.1f} ms  p90 {latency['p90']:.1f} ms  "
+        f"p99 {latency['p99']:.1f} ms  max {latency['max']:.1f} ms"
+    )
+    if "upstream_requests" in summary:
+        print(f"  upstream:   {summary['upstream_requests']} requests")
+        print(f"  wall time:  {summary['wall_time_s']:.2f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("log", type=Path, help="capture log to replay")
+    parser.add_argument(
+        "--speed",
+        default="1",
+        help="1 replays at the original pace, N runs N times faster, max sends calls back to back",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="calls in flight at once with --speed max (default: 16)",
+    )
+    parser.add_argument(
+        "--upstream-latency",
+        type=float,
+        default=0.05,
+        help="seconds the stub Nominatim takes per request (default: 0.05)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="requests per second sent to the stub (default: 0, unpaced)",
+    )
+    parser.add_argument("--json", action="store_true", help="print raw results")
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    if speed is not None and speed <= 0:
+        parser.error("--speed must be positive or 'max'")
+    records = sorted(load_records(args.log), key=lambda record: record.timestamp)
+    result = {
+        "capture": summarize(records),
+        "replay": asyncio.run(
+            replay(records, speed, args.upstream_latency, args.rate, args.concurrency)
+        ),
+    }
+
+    if args.json:
+        print(json.dumps(result))
+        return
+    _print_summary(f"Captured ({args.log})", result["capture"])
+    _print_summary(f"Replayed (speed={args.speed})", result["replay"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Geocode MCP
+MCP server and in-process Python client for OpenStreetMap Nominatim geocoding
+"""
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from geocode_mcp.arrow import ArrowBatchWriter
+    from geocode_mcp.client import (
+        BoundingBox,
+        GeocodeClient,
+        GeocodeResult,
+        Place,
+        SyncGeocodeClient,
+    )
+    from geocode_mcp.ratelimit import RateLimiter
+
+__all__ = [
+    "ArrowBatchWriter",
+    "BoundingBox",
+    "GeocodeClient",
+    "GeocodeResult",
+    "Place",
+    "RateLimiter",
+    "SyncGeocodeClient",
+]
+
+# Public names resolve on first access, so importing one submodule (or
+# starting the server) does not load the others, nor optional dependencies
+# such as pyarrow
+_EXPORTS = {
+    "ArrowBatchWriter": "geocode_mcp.arrow",
+    "BoundingBox": "geocode_mcp.client",
+    "GeocodeClient": "geocode_mcp.client",
+    "GeocodeResult": "geocode_mcp.client",
+    "Place": "geocode_mcp.client",
+    "RateLimiter": "geocode_mcp.ratelimit",
+    "SyncGeocodeClient": "geocode_mcp.client",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
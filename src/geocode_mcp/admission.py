@@ -0,0 +1,216 @@
+"""
+Admission control for tool calls
+Caps concurrent work globally and per client session, keeps a bounded wait
+queue served round-robin across sessions, and rejects calls up front when the
+expected wait would outlast the caller's deadline
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from collections.abc import AsyncGenerator, Callable, Hashable
+from contextlib import asynccontextmanager
+
+MAX_CONCURRENT_ENV = "GEOCODE_MCP_MAX_CONCURRENT"
+MAX_PER_SESSION_ENV = "GEOCODE_MCP_MAX_PER_SESSION"
+MAX_QUEUE_ENV = "GEOCODE_MCP_MAX_QUEUE"
+MAX_QUEUE_PER_SESSION_ENV = "GEOCODE_MCP_MAX_QUEUE_PER_SESSION"
+
+# Stands in for a session with nothing queued when estimating waits
+_NEW_SESSION = object()
+
+
+class AdmissionRejected(Exception):
+    """Raised when a call cannot be admitted in time."""
+
+
+class AdmissionController:
+    """Concurrency limiter with per-session fairness.
+
+    Waiting calls are grouped by session and sessions take turns, so one
+    client queueing hundreds of calls delays another client's next call by at
+    most one slot. Each session may only fill part of the queue
+    (``max_queue_per_session``, a quarter of it by default), so a client
+    fanning out cannot lock other clients out. The expected wait is estimated
+    from the caller's place in the rotation and a moving average of recent
+    service times.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_per_session: int = 4,
+        max_queue: int = 256,
+        max_queue_per_session: int | None = None,
+        initial_service_time: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if min(max_concurrent, max_per_session) < 1 or max_queue < 0:
+            raise ValueError("Concurrency limits must be positive")
+        if max_queue_per_session is not None and max_queue_per_session < 0:
+            raise ValueError("Concurrency limits must be positive")
+        self.max_concurrent = max_concurrent
+        self.max_per_session = max_per_session
+        self.max_queue = max_queue
+        if max_queue_per_session is None:
+            max_queue_per_session = max(1, max_queue // 4)
+        self.max_queue_per_session = max_queue_per_session
+        self._clock = clock
+        self._service_time = initial_service_time
+        self._active: Counter[Hashable] = Counter()
+        self._active_total = 0
+        self._waiting: dict[Hashable, deque[asyncio.Future[None]]] = {}
+        self._rotation: deque[Hashable] = deque()
+        self._queued = 0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Build a controller, reading limits from the environment."""
+        defaults = cls()
+        return cls(
+            max_concurrent=int(
+                os.environ.get(MAX_CONCURRENT_ENV, defaults.max_concurrent)
+            ),
+            max_per_session=int(
+                os.environ.get(MAX_PER_SESSION_ENV, defaults.max_per_session)
+            ),
+            max_queue=int(os.environ.get(MAX_QUEUE_ENV, defaults.max_queue)),
+            max_queue_per_session=(
+                int(os.environ[MAX_QUEUE_PER_SESSION_ENV])
+                if os.environ.get(MAX_QUEUE_PER_SESSION_ENV)
+                else None
+            ),
+        )
+
+    @property
+    def active(self) -> int:
+        return self._active_total
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def estimated_wait(self, session: Hashable = _NEW_SESSION) -> float:
+        """Seconds a call from ``session`` queued now would likely wait.
+
+        Sessions take turns, so only the calls served before this one in the
+        round-robin count: one per session ahead of it for every call the
+        session already has waiting, not the depth of the whole queue.
+        """
+        if self._active_total < self.max_concurrent and not self._queued:
+            return 0.0
+        own = self._waiting.get(session)
+        turn = len(own) if own else 0
+        position = self._rotation.index(session) if own else len(self._rotation)
+        ahead = 0
+        for place, other in enumerate(self._rotation):
+            waiting = len(self._waiting[other])
+            ahead += min(waiting, turn + (place < position))
+        rounds = (ahead // self.max_concurrent) + 1
+        return rounds * self._service_time
+
+    @asynccontextmanager
+    async def slot(
+        self, session: Hashable, timeout: float | None = None
+    ) -> AsyncGenerator[None]:
+        """Hold one concurrency slot for ``session`` while the block runs.
+
+        Raises :class:`AdmissionRejected` if the queue or the session's share
+        of it is full, if the estimated wait exceeds ``timeout`` or if no slot
+        frees up in time.
+        """
+        await self._acquire(session, timeout)
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self._release(session, self._clock() - started)
+
+    def _can_start(self, session: Hashable) -> bool:
+        return (
+            self._active_total < self.max_concurrent
+            and self._active[session] < self.max_per_session
+        )
+
+    async def _acquire(self, session: Hashable, timeout: float | None) -> None:
+        if not self._waiting.get(session) and self._can_start(session):
+            self._grant(session)
+            return
+        queue = self._waiting.get(session)
+        if queue is not None and len(queue) >= self.max_queue_per_session:
+            raise AdmissionRejected(
+                "Server busy: too many queued requests from this session"
+            )
+        if self._queued >= self.max_queue:
+            raise AdmissionRejected("Server busy: too many queued requests")
+        if timeout is not None and self.estimated_wait(session) > timeout:
+            raise AdmissionRejected(
+                "Server busy: estimated wait exceeds the request timeout"
+            )
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        queue = self._waiting.setdefault(session, deque())
+        if not queue:
+            self._rotation.append(session)
+        queue.append(waiter)
+        self._queued += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except BaseException as error:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up: hand the slot back
+                self._release(session, None)
+            else:
+                waiter.cancel()
+                self._forget(session, waiter)
+            if isinstance(error, TimeoutError):
+                raise AdmissionRejected(
+                    "Server busy: timed out waiting for a free slot"
+                ) from None
+            raise
+
+    def _forget(self, session: Hashable, waiter: asyncio.Future[None]) -> None:
+        queue = self._waiting.get(session)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._queued -= 1
+        if not queue:
+            del self._waiting[session]
+            self._rotation.remove(session)
+
+    def _grant(self, session: Hashable) -> None:
+        self._active[session] += 1
+        self._active_total += 1
+
+    def _release(self, session: Hashable, service_time: float | None) -> None:
+        self._active[session] -= 1
+        if self._active[session] <= 0:
+            del self._active[session]
+        self._active_total -= 1
+        if service_time is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * service_time
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting sessions in round-robin order."""
+        skipped = 0
+        while self._active_total < self.max_concurrent and skipped < len(
+            self._rotation
+        ):
+            session = self._rotation[0]
+            self._rotation.rotate(-1)
+            if self._active[session] >= self.max_per_session:
+                skipped += 1
+                continue
+            queue = self._waiting[session]
+            waiter = queue.popleft()
+            self._queued -= 1
+            if not queue:
+                del self._waiting[session]
+                self._rotation.pop()
+            self._grant(session)
+            waiter.set_result(None)
+            skipped = 0
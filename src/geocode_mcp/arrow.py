@@ -0,0 +1,311 @@
+"""
+Columnar output for bulk geocoding
+Accumulates geocoding results directly into Arrow record batches and streams
+them to Arrow IPC or Parquet in fixed-size chunks, so large jobs never build
+JSON text and hold at most one chunk in memory
+
+Requires the optional ``arrow`` extra (pyarrow).
+"""
+
+import asyncio
+from array import array
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any, Self
+
+try:
+    import pyarrow as pa  # ty: ignore[unresolved-import]
+    import pyarrow.ipc  # ty: ignore[unresolved-import]
+    import pyarrow.parquet as pq  # ty: ignore[unresolved-import]
+except ImportError as error:
+    raise ImportError(
+        "geocode_mcp.arrow requires pyarrow; install geocode-mcp[arrow]"
+    ) from error
+
+if TYPE_CHECKING:
+    from geocode_mcp.client import GeocodeClient
+
+# Rows per record batch (and Parquet row group)
+DEFAULT_BATCH_SIZE = 16384
+
+OUTPUTS = ("ipc", "parquet")
+
+_labels = pa.dictionary(pa.int32(), pa.string())
+
+# One row per place; a location without places gets one row whose place
+# columns are null and whose ``error`` says why
+SCHEMA = pa.schema(
+    [
+        pa.field("index", pa.int32()),
+        pa.field("query", _labels, nullable=False),
+        pa.field("source", _labels, nullable=False),
+        pa.field("error", pa.string()),
+        pa.field("latitude", pa.float64()),
+        pa.field("longitude", pa.float64()),
+        pa.field("display_name", pa.string()),
+        pa.field("place_id", pa.string()),
+        pa.field("type", _labels),
+        pa.field("class", _labels),
+        pa.field("importance", pa.float64()),
+        pa.field("country_code", _labels),
+        # south, north, west, east
+        pa.field("bounding_box", pa.list_(pa.float64(), 4)),
+        pa.field("timezone", _labels),
+    ]
+)
+
+
+def _validity(flags: bytearray) -> "pa.Buffer | None":
+    """Validity bitmap from one 0/1 byte per row; ``None`` when all are set."""
+    if 0 not in flags:
+        return None
+    as_bytes = pa.Array.from_buffers(
+        pa.uint8(), len(flags), [None, pa.py_buffer(flags)]
+    )
+    return as_bytes.cast(pa.bool_()).buffers()[1]
+
+
+class _Labels:
+    """Dictionary-encoded string column built one code at a time."""
+
+    __slots__ = ("codes", "valid", "values", "_lookup")
+
+    def __init__(self) -> None:
+        self.codes = array("i")
+        self.valid = bytearray()
+        self.values: list[str] = []
+        self._lookup: dict[str, int] = {}
+
+    def append(self, value: str | None) -> None:
+        if value is None:
+            self.codes.append(0)
+            self.valid.append(0)
+            return
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+        self.valid.append(1)
+
+    def finish(self) -> "pa.DictionaryArray":
+        indices = pa.Array.from_buffers(
+            pa.int32(),
+            len(self.codes),
+            [_validity(self.valid), pa.py_buffer(self.codes)],
+        )
+        return pa.DictionaryArray.from_arrays(
+            indices, pa.array(self.values, pa.string()), safe=False
+        )
+
+
+class ArrowBatchWriter:
+    """Write geocoding responses as Arrow record batches.
+
+    ``sink`` is a path or writable file (or pyarrow ``NativeFile``); with
+    ``output="ipc"`` it receives an Arrow IPC stream, with ``"parquet"`` a
+    Parquet file with one row group per batch. Without a sink, batches are
+    kept in memory and :meth:`table` joins them without copying.
+
+    Columns are filled as responses are added and handed to pyarrow as they
+    are: coordinates and bounding boxes wrap the accumulated ``array('d')``
+    buffers, and repeated strings (query, source, type, class, country code,
+    timezone) are stored as dictionary codes. Every ``batch_size`` rows the
+    batch is written out and the buffers start afresh.
+    """
+
+    def __init__(
+        self,
+        sink: Any = None,
+        *,
+        output: str = "ipc",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        compression: str | None = None,
+    ) -> None:
+        if output not in OUTPUTS:
+            raise ValueError(f"output must be one of: {', '.join(OUTPUTS)}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.output = output
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self.batches: list[pa.RecordBatch] = []
+        self._writer: Any = None
+        if sink is not None:
+            if output == "parquet":
+                self._writer = pq.ParquetWriter(
+                    sink, SCHEMA, compression=compression or "snappy"
+                )
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=compression)
+                self._writer = pa.ipc.new_stream(sink, SCHEMA, options=options)
+        self._reset()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _reset(self) -> None:
+        self._rows = 0
+        self._index: list[int | None] = []
+        self._error: list[str | None] = []
+        self._found = bytearray()
+        self._latitude = array("d")
+        self._longitude = array("d")
+        self._importance = array("d")
+        self._bounding_box = array("d")
+        self._display_name: list[str | None] = []
+        self._place_id: list[str | None] = []
+        self._labels = {
+            name: _Labels()
+            for name in ("query", "source", "type", "class", "country_code", "timezone")
+        }
+
+    def add(self, response: dict[str, Any]) -> None:
+        """Add one response as returned by ``geocode()`` or ``geocode_batch()``."""
+        places = response.get("coordinates") or [None]
+        labels = self._labels
+        for place in places:
+            self._rows += 1
+            self._index.append(response.get("index"))
+            labels["query"].append(response.get("query", ""))
+            labels["source"].append(response.get("source", "nominatim"))
+            if place is None:
+                self._error.append(response.get("error", "No coordinates found"))
+                self._found.append(0)
+                self._latitude.append(0.0)
+                self._longitude.append(0.0)
+                self._importance.append(0.0)
+                self._bounding_box.extend((0.0, 0.0, 0.0, 0.0))
+                self._display_name.append(None)
+                self._place_id.append(None)
+                for name in ("type", "class", "country_code", "timezone"):
+                    labels[name].append(None)
+                continue
+            bbox = place["bounding_box"]
+            self._error.append(None)
+            self._found.append(1)
+            self._latitude.append(place["latitude"])
+            self._longitude.append(place["longitude"])
+            self._importance.append(float(place.get("importance") or 0))
+            self._bounding_box.extend(
+                (bbox["south"], bbox["north"], bbox["west"], bbox["east"])
+            )
+            self._display_name.append(place["display_name"])
+            self._place_id.append(str(place["place_id"]))
+            labels["type"].append(place.get("type", ""))
+            labels["class"].append(place.get("class", ""))
+            labels["country_code"].append(place.get("country_code", ""))
+            labels["timezone"].append(place.get("timezone"))
+        if self._rows >= self.batch_size:
+            self.flush()
+
+    def _record_batch(self) -> "pa.RecordBatch":
+        """The rows added since the last flush, as a record batch."""
+        rows = self._rows
+        found = _validity(self._found)
+
+        def floats(values: array, length: int = rows) -> "pa.Array":
+            return pa.Array.from_buffers(
+                pa.float64(), length, [found, pa.py_buffer(values)]
+            )
+
+        labels = {name: column.finish() for name, column in self._labels.items()}
+        return pa.RecordBatch.from_arrays(
+            [
+                pa.array(self._index, pa.int32()),
+                labels["query"],
+                labels["source"],
+                pa.array(self._error, pa.string()),
+                floats(self._latitude),
+                floats(self._longitude),
+                pa.array(self._display_name, pa.string()),
+                pa.array(self._place_id, pa.string()),
+                labels["type"],
+                labels["class"],
+                floats(self._importance),
+                labels["country_code"],
+                pa.Array.from_buffers(
+                    pa.list_(pa.float64(), 4),
+                    rows,
+                    [found],
+                    children=[
+                        pa.Array.from_buffers(
+                            pa.float64(),
+                            4 * rows,
+                            [None, pa.py_buffer(self._bounding_box)],
+                        )
+                    ],
+                ),
+                labels["timezone"],
+            ],
+            schema=SCHEMA,
+        )
+
+    def flush(self) -> "pa.RecordBatch | None":
+        """Write out the pending rows as one batch; returns it, if any."""
+        if not self._rows:
+            return None
+        batch = self._record_batch()
+        if self._writer is None:
+            self.batches.append(batch)
+        else:
+            self._writer.write_batch(batch)
+        self.rows_written += batch.num_rows
+        self._reset()
+        return batch
+
+    def table(self) -> "pa.Table":
+        """Every batch written so far, for writers without a sink."""
+        self.flush()
+        return pa.Table.from_batches(self.batches, schema=SCHEMA)
+
+    def close(self) -> None:
+        """Write pending rows and finish the output."""
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+async def geocode_to_arrow(
+    client: "GeocodeClient",
+    locations: Sequence[str],
+    sink: Any,
+    limit: int = 1,
+    *,
+    output: str = "ipc",
+    concurrency: int = 4,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    compression: str | None = None,
+    **filters: Any,
+) -> int:
+    """Geocode ``locations`` with ``client`` and stream the results to ``sink``.
+
+    Locations are processed ``batch_size`` at a time with
+    :meth:`GeocodeClient.geocode_batch`, so memory stays bounded however many
+    there are; rows are written in completion order and carry their
+    ``index``. Returns the number of rows written.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with ArrowBatchWriter(
+        sink, output=output, batch_size=batch_size, compression=compression
+    ) as writer:
+        for start in range(0, len(locations), batch_size):
+
+            async def on_result(item: dict[str, Any], start: int = start) -> None:
+                # geocode_batch numbers items within the chunk
+                writer.add({**item, "index": start + item["index"]})
+
+            await client.geocode_batch(
+                locations[start : start + batch_size],
+                limit,
+                on_result=on_result,
+                slot=lambda: semaphore,
+                **filters,
+            )
+    return writer.rows_written
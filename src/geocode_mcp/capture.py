@@ -0,0 +1,202 @@
+"""
+Traffic capture
+Records anonymized get_coordinates calls (when, which query, which client
+session, limit, latency and how the call was answered) to a compact binary
+log that scripts/replay_capture.py can replay against a stub upstream
+
+Log layout (little endian):
+    header   magic "GMCP", version
+    records  float64 start time (Unix seconds), 16-byte query hash, uint32
+             session ordinal, uint8 limit, uint8 outcome, float32 latency in
+             seconds
+
+Queries are identified by a keyed BLAKE2b hash of their canonical cache key,
+so equivalent queries share a hash but the log never holds the query text.
+The key is kept in a file next to the log (or given in
+GEOCODE_MCP_CAPTURE_KEY), so a query repeated after a restart still hashes
+alike; delete the key file to start unlinkable hashes. Sessions are numbered
+in order of their first call, continuing from the log's last number, and 0
+stands for calls made outside an MCP session.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import struct
+import weakref
+from collections.abc import Hashable, Iterator, MutableMapping
+from contextvars import ContextVar
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+
+MAGIC = b"GMCP"
+VERSION = 2
+HEADER = struct.Struct("<4sH")
+RECORD = struct.Struct("<d16sIBBf")
+
+# File that captured calls are appended to; capture is off when unset
+CAPTURE_ENV = "GEOCODE_MCP_CAPTURE"
+
+# Hex hashing key to use instead of the key file next to the log
+CAPTURE_KEY_ENV = "GEOCODE_MCP_CAPTURE_KEY"
+
+KEY_SIZE = 32
+
+# How a call was answered, stored as the index into this tuple
+OUTCOMES = (
+    "offline",
+    "cache",
+    "l2",
+    "upstream",
+    "error",
+    "timeout",
+    "busy",
+    "cancelled",
+)
+
+# Set by the client while it answers a call, read back by the capture hook
+call_outcome = ContextVar[str | None]("call_outcome", default=None)
+
+
+def note_outcome(outcome: str) -> None:
+    """Record how the current call was answered."""
+    call_outcome.set(outcome)
+
+
+class CallRecord(NamedTuple):
+    """One captured call."""
+
+    timestamp: float
+    query: bytes
+    session: int
+    limit: int
+    outcome: str
+    latency: float
+
+
+def _load_key(path: Path) -> bytes:
+    """Read the hashing key stored next to a log, creating it if needed."""
+    key_path = path.with_name(path.name + ".key")
+    try:
+        descriptor = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        key = key_path.read_bytes()
+        if len(key) != KEY_SIZE:
+            raise ValueError(f"{key_path} is not a capture key") from None
+        return key
+    key = secrets.token_bytes(KEY_SIZE)
+    with os.fdopen(descriptor, "wb") as file:
+        file.write(key)
+    return key
+
+
+class CaptureLog:
+    """Append-only writer for captured calls.
+
+    Without ``key`` hashes are keyed randomly, so they only match within
+    this writer; ``first_session`` is the ordinal the next new session gets.
+    """
+
+    def __init__(
+        self, file: BinaryIO, key: bytes | None = None, first_session: int = 1
+    ) -> None:
+        self.file = file
+        self._key = key if key is not None else secrets.token_bytes(KEY_SIZE)
+        # Sessions are held weakly so ended ones can be collected; keys that
+        # cannot be (ints, strings) are held as they are
+        self._sessions: weakref.WeakKeyDictionary[Hashable, int] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._plain_sessions: dict[Hashable, int] = {}
+        self._next_session = max(1, first_session)
+        if file.tell() == 0:
+            file.write(HEADER.pack(MAGIC, VERSION))
+
+    @classmethod
+    def from_env(cls) -> "CaptureLog | None":
+        """Log appending to the file named by GEOCODE_MCP_CAPTURE, if set."""
+        path = os.environ.get(CAPTURE_ENV, "").strip()
+        if not path:
+            return None
+        log_path = Path(path)
+        hex_key = os.environ.get(CAPTURE_KEY_ENV, "").strip()
+        key = bytes.fromhex(hex_key) if hex_key else _load_key(log_path)
+        first_session = 1
+        if log_path.is_file() and log_path.stat().st_size:
+            first_session = last_session(log_path) + 1
+        return cls(open(log_path, "ab"), key, first_session)
+
+    def session_ordinal(self, session: Hashable) -> int:
+        """Number ``session`` in order of first appearance; 0 for no session."""
+        if session is None:
+            return 0
+        try:
+            weakref.ref(session)
+        except TypeError:
+            sessions: MutableMapping[Hashable, int] = self._plain_sessions
+        else:
+            sessions = self._sessions
+        ordinal = sessions.get(session)
+        if ordinal is None:
+            ordinal = sessions[session] = self._next_session
+            self._next_session += 1
+        return ordinal
+
+    def query_hash(self, key: Hashable) -> bytes:
+        """Anonymized identity of a query's cache key."""
+        return hashlib.blake2b(
+            json.dumps(key, separators=(",", ":")).encode(),
+            digest_size=16,
+            key=self._key,
+        ).digest()
+
+    def record(
+        self,
+        timestamp: float,
+        key: Hashable,
+        limit: int,
+        outcome: str,
+        latency: float,
+        session: Hashable = None,
+    ) -> None:
+        """Append one call; each record is flushed as it is written."""
+        self.file.write(
+            RECORD.pack(
+                timestamp,
+                self.query_hash(key),
+                self.session_ordinal(session),
+                max(0, min(limit, 255)),
+                OUTCOMES.index(outcome),
+                latency,
+            )
+        )
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def read_records(file: BinaryIO) -> Iterator[CallRecord]:
+    """Yield the calls stored in a capture log."""
+    header = file.read(HEADER.size)
+    if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION):
+        raise ValueError("Not a geocode-mcp capture log")
+    while chunk := file.read(RECORD.size):
+        if len(chunk) < RECORD.size:
+            # The writer stopped part way through its last record
+            return
+        timestamp, query, session, limit, outcome, latency = RECORD.unpack(chunk)
+        yield CallRecord(timestamp, query, session, limit, OUTCOMES[outcome], latency)
+
+
+def load_records(path: Path) -> list[CallRecord]:
+    """Read every call from the capture log at ``path``."""
+    with open(path, "rb") as file:
+        return list(read_records(file))
+
+
+def last_session(path: Path) -> int:
+    """Highest session ordinal in the capture log at ``path``."""
+    with open(path, "rb") as file:
+        return max((record.session for record in read_records(file)), default=0)
@@ -0,0 +1,678 @@
+"""
+In-process geocoding client
+Gives Python code the same geocoding behaviour as the MCP server (offline
+tables, result cache, request coalescing and Nominatim rate limiting) without
+spawning the server or going through JSON-RPC
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Sequence
+from contextlib import AbstractAsyncContextManager, nullcontext
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, NamedTuple, Self, cast
+from urllib.parse import urlencode
+
+from geocode_mcp.cache import TTLCache
+from geocode_mcp.capture import note_outcome
+from geocode_mcp.geometry import (
+    DEFAULT_TOLERANCE,
+    ENCODINGS,
+    encode_geometry,
+    simplify_geometry,
+)
+from geocode_mcp.l2cache import L2Cache
+from geocode_mcp.lookup import lookup_place
+from geocode_mcp.query import SearchQuery
+from geocode_mcp.ratelimit import RateLimiter
+from geocode_mcp.singleflight import SingleFlight
+from geocode_mcp.spatial import SpatialIndex
+from geocode_mcp.timezones import timezone_at
+
+if TYPE_CHECKING:
+    # aiohttp is imported on first use; answering offline or cached lookups
+    # never needs it
+    import aiohttp
+
+DEFAULT_BASE_URL = "https://nominatim.openstreetmap.org"
+USER_AGENT = "MCP-Geocoding-Tool/1.0 (Python)"
+
+
+class BoundingBox(NamedTuple):
+    south: float
+    north: float
+    west: float
+    east: float
+
+
+@dataclass(frozen=True, slots=True)
+class Place:
+    """One geocoding match."""
+
+    latitude: float
+    longitude: float
+    display_name: str
+    place_id: int | str
+    type: str
+    place_class: str
+    importance: float
+    country_code: str
+    bounding_box: BoundingBox
+    geometry: Any = None
+    timezone: str | None = None
+
+    @classmethod
+    def from_result(cls, result: dict[str, Any]) -> "Place":
+        """Build a place from one entry of a response's ``coordinates``."""
+        box = result["bounding_box"]
+        return cls(
+            latitude=result["latitude"],
+            longitude=result["longitude"],
+            display_name=result["display_name"],
+            place_id=result["place_id"],
+            type=result["type"],
+            place_class=result["class"],
+            importance=result["importance"],
+            country_code=result["country_code"],
+            bounding_box=BoundingBox(
+                box["south"], box["north"], box["west"], box["east"]
+            ),
+            geometry=result.get("geometry"),
+            timezone=result.get("timezone"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class GeocodeResult:
+    """The answer for one location of a batch.
+
+    ``places`` is empty when nothing matched or the lookup failed; ``error``
+    then says why. ``source`` is ``"offline"`` for answers from the bundled
+    lookup tables and ``"nominatim"`` otherwise.
+    """
+
+    query: str
+    places: tuple[Place, ...] = ()
+    source: str = "nominatim"
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @classmethod
+    def from_response(cls, response: dict[str, Any]) -> "GeocodeResult":
+        """Build a result from a response dict as returned by ``geocode()``."""
+        return cls(
+            query=response.get("query", ""),
+            places=tuple(
+                Place.from_result(result) for result in response.get("coordinates", [])
+            ),
+            source=response.get("source", "nominatim"),
+            error=response.get("error"),
+        )
+
+
+def _format_result(item: dict[str, Any]) -> dict[str, Any]:
+    """Convert a Nominatim search hit into the server's result schema."""
+    return {
+        "latitude": float(item["lat"]),
+        "longitude": float(item["lon"]),
+        "display_name": item["display_name"],
+        "place_id": item["place_id"],
+        "type": item.get("type", ""),
+        "class": item.get("class", ""),
+        "importance": item.get("importance", 0),
+        "country_code": (item.get("address") or {}).get("country_code", ""),
+        "bounding_box": {
+            "south": float(item["boundingbox"][0]),
+            "north": float(item["boundingbox"][1]),
+            "west": float(item["boundingbox"][2]),
+            "east": float(item["boundingbox"][3]),
+        },
+    }
+
+
+def _check_result_options(geometry: str | None, tolerance: float) -> None:
+    """Validate the options that shape results rather than the search."""
+    if geometry is not None and geometry not in ENCODINGS:
+        raise ValueError(f"geometry must be one of: none, {', '.join(ENCODINGS)}")
+    if tolerance < 0:
+        raise ValueError("tolerance cannot be negative")
+
+
+def _attach_timezones(response: dict[str, Any]) -> None:
+    """Add the offline timezone of every result in ``response``."""
+    for result in response.get("coordinates", []):
+        result["timezone"] = timezone_at(result["latitude"], result["longitude"])
+
+
+def _build_response(
+    query: SearchQuery, results: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """Wrap formatted results in the response returned to callers."""
+    if not results:
+        return {
+            "error": "No coordinates found for the specified location",
+            "query": query.describe(),
+            "suggestions": [
+                "Try including more specific details (e.g., state, country)",
+                "Check spelling of the location name",
+                "Use a more general location (e.g., city instead of specific address)",
+            ],
+        }
+    return {
+        "query": query.describe(),
+        "results_count": len(results),
+        "coordinates": [dict(result) for result in results],
+    }
+
+
+def _in_country(result: dict[str, Any], country: str) -> bool:
+    """Whether a structured ``country`` (name or code) names the result's country.
+
+    Offline results end their display name with the country name.
+    """
+    name = result["display_name"].rsplit(",", 1)[-1]
+    return country.casefold() in (
+        result["country_code"].casefold(),
+        name.strip().casefold(),
+    )
+
+
+class GeocodeClient:
+    """Geocode locations in-process.
+
+    Each client owns its HTTP session, result and geometry caches, rate
+    limiter and spatial index. Use it as an async context manager, or call
+    :meth:`close` when done, to release the HTTP session.
+
+    The default limiter sends at most one request per second, as the public
+    Nominatim instance requires; pass ``limiter=RateLimiter(0)`` when
+    ``base_url`` points at a self-hosted instance.
+
+    With an ``l2`` cache, answers missing from the in-memory cache are looked
+    up there before going to Nominatim, and new answers are written to it in
+    the background, so processes sharing it share their upstream work. Keys
+    found in memory never reach the L2 cache.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        *,
+        limiter: RateLimiter | None = None,
+        cache_size: int = 1024,
+        cache_ttl: float = 3600,
+        user_agent: str = USER_AGENT,
+        l2: L2Cache | None = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.user_agent = user_agent
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.cache_ttl = cache_ttl
+        self.l2 = l2
+
+        # Geocoding answers keyed by SearchQuery.cache_key(); values hold the
+        # limit the answer was fetched with and its formatted results
+        self.result_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+        # Simplified boundary geometries keyed by (place_id, tolerance); kept
+        # apart from result_cache because they are much larger than points
+        self.geometry_cache = TTLCache(maxsize=256, ttl=cache_ttl)
+
+        # Every place geocoded so far, for local spatial queries
+        self.spatial_index = SpatialIndex()
+
+        # Identical Nominatim requests in flight at the same time share one
+        # fetch
+        self.inflight = SingleFlight()
+
+        self.http_session: aiohttp.ClientSession | None = None
+
+        # Background writes to the L2 cache, awaited on close
+        self._l2_writes: set[asyncio.Task[None]] = set()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def get_http_session(self) -> "aiohttp.ClientSession":
+        """Get or create this client's HTTP session."""
+        if self.http_session is None:
+            import aiohttp
+
+            self.http_session = aiohttp.ClientSession()
+        return cast("aiohttp.ClientSession", self.http_session)
+
+    async def close(self) -> None:
+        """Flush L2 writes and close connections; the client reopens them if used again."""
+        if self._l2_writes:
+            await asyncio.gather(*self._l2_writes, return_exceptions=True)
+        if self.l2 is not None:
+            await self.l2.close()
+        if self.http_session is not None:
+            session = self.http_session
+            self.http_session = None
+            await session.close()
+
+    async def geocode(
+        self,
+        location: str = "",
+        limit: int = 1,
+        *,
+        countrycodes: str | Sequence[str] | None = None,
+        viewbox: Any = None,
+        bounded: bool = False,
+        geometry: str | None = None,
+        tolerance: float = DEFAULT_TOLERANCE,
+        timezone: bool = False,
+        slot: Callable[[], AbstractAsyncContextManager[Any]] | None = None,
+        **address: str | None,
+    ) -> dict[str, Any]:
+        """Geocode a location using Nominatim API.
+
+        Structured ``address`` fields (street, city, county, state, country,
+        postalcode) may be given instead of ``location``. ``countrycodes`` and
+        a ``bounded`` ``viewbox`` restrict the results; they are sent upstream
+        and also used to filter cached answers for the unrestricted search.
+
+        With ``geometry`` set to ``"polyline"`` or ``"quantized"`` each result
+        also carries its boundary, simplified with ``tolerance`` (degrees) and
+        encoded. With ``timezone`` each result also carries its IANA
+        ``timezone``, looked up offline in the bundled timezone boundaries
+        (see :mod:`geocode_mcp.timezones`).
+
+        Upper-case IATA/ICAO airport codes and postal codes found in the
+        offline lookup tables are answered without a network request. Only
+        the L2 cache and Nominatim lookups run inside ``slot()`` when given,
+        so offline and cached answers never wait behind network work.
+        """
+        _check_result_options(geometry, tolerance)
+        query = SearchQuery.create(
+            location,
+            countrycodes=countrycodes,
+            viewbox=viewbox,
+            bounded=bounded,
+            **address,
+        )
+        response = await self._geocode(query, limit, geometry, tolerance, slot)
+        if timezone:
+            _attach_timezones(response)
+        return response
+
+    async def _geocode(
+        self,
+        query: SearchQuery,
+        limit: int,
+        geometry: str | None,
+        tolerance: float,
+        slot: Callable[[], AbstractAsyncContextManager[Any]] | None = None,
+    ) -> dict[str, Any]:
+        """Answer ``query`` offline, from the caches or from Nominatim.
+
+        Notes which of those answered for traffic capture.
+        """
+        if geometry is None:
+            offline = self._offline_response(query)
+            if offline is not None:
+                note_outcome("offline")
+                return offline
+
+        cached = self._cached_response(query, limit)
+        if cached is not None and (
+            geometry is None or self._attach_geometries(cached, geometry, tolerance)
+        ):
+            note_outcome("cache")
+            return cached
+
+        async with slot() if slot is not None else nullcontext():
+            return await self._fetch(query, limit, geometry, tolerance)
+
+    async def _fetch(
+        self,
+        query: SearchQuery,
+        limit: int,
+        geometry: str | None,
+        tolerance: float,
+    ) -> dict[str, Any]:
+        """Answer ``query`` from the L2 cache or from Nominatim.
+
+        The in-memory cache is checked again first, as another call may have
+        filled it while this one waited for a slot.
+        """
+        outcome = "cache"
+        cached = self._cached_response(query, limit)
+        if cached is None and self.l2 is not None:
+            outcome = "l2"
+            await self._fill_from_l2([query])
+            cached = self._cached_response(query, limit)
+        if cached is not None and (
+            geometry is None or self._attach_geometries(cached, geometry, tolerance)
+        ):
+            note_outcome(outcome)
+            return cached
+
+        extra_params = {}
+        if geometry is not None:
+            # Let Nominatim simplify too, so the upstream payload is already small
+            extra_params = {
+                "polygon_geojson": "1",
+                "polygon_threshold": str(tolerance),
+            }
+        data = await self._search(query, limit, extra_params)
+        note_outcome("upstream")
+
+        results = [_format_result(item) for item in data]
+        entry = {"limit": limit, "coordinates": results}
+        self.result_cache.set(query.cache_key(), entry)
+        self._store_in_l2(query.cache_key(), entry)
+        self.spatial_index.bulk_load(results)
+
+        response = _build_response(query, results)
+        if geometry is not None:
+            for item in data:
+                if "geojson" in item:
+                    self.geometry_cache.set(
+                        (item["place_id"], tolerance),
+                        simplify_geometry(item["geojson"], tolerance),
+                    )
+            self._attach_geometries(response, geometry, tolerance)
+        return response
+
+    async def geocode_batch(
+        self,
+        locations: Sequence[str],
+        limit: int = 1,
+        *,
+        on_result: Callable[[dict[str, Any]], Awaitable[None]] | None = None,
+        slot: Callable[[], AbstractAsyncContextManager[Any]] | None = None,
+        geometry: str | None = None,
+        tolerance: float = DEFAULT_TOLERANCE,
+        timezone: bool = False,
+        **filters: Any,
+    ) -> list[dict[str, Any]]:
+        """Geocode several locations, reporting each answer as soon as it is known.
+
+        Locations answered by the offline tables or the cache are reported
+        first, without waiting for any network request; the L2 cache, if any,
+        is consulted for all the remaining ones in one round trip. The rest are looked
+        up concurrently and reported in completion order; each lookup runs
+        inside ``slot()`` when given, which lets callers bound concurrency.
+        ``filters`` (countrycodes, viewbox, bounded) apply to every location;
+        ``geometry``, ``tolerance`` and ``timezone`` add to every answer as in
+        :meth:`geocode`, whichever path it came from.
+
+        Every item carries its ``index`` in ``locations`` and is passed to
+        ``on_result`` when it completes; the returned list is in input order.
+        A location that fails gets an ``error`` item instead of failing the
+        batch.
+        """
+        _check_result_options(geometry, tolerance)
+        items: list[dict[str, Any]] = [{} for _ in locations]
+
+        async def report(index: int, response: dict[str, Any]) -> None:
+            if timezone:
+                _attach_timezones(response)
+            items[index] = {"index": index, **response}
+            if on_result is not None:
+                await on_result(items[index])
+
+        pending = []
+        for index, location in enumerate(locations):
+            try:
+                query = SearchQuery.create(location, **filters)
+            except ValueError as error:
+                await report(index, {"error": str(error), "query": location})
+                continue
+            local = self._local_response(query, limit, geometry, tolerance)
+            if local is None:
+                pending.append((index, query))
+            else:
+                await report(index, local)
+
+        if pending and self.l2 is not None:
+            await self._fill_from_l2([query for _, query in pending])
+            misses = []
+            for index, query in pending:
+                shared = self._local_response(query, limit, geometry, tolerance)
+                if shared is None:
+                    misses.append((index, query))
+                else:
+                    await report(index, shared)
+            pending = misses
+
+        async def lookup(index: int, query: SearchQuery) -> tuple[int, dict[str, Any]]:
+            try:
+                response = await self._geocode(query, limit, geometry, tolerance, slot)
+                return index, response
+            except Exception as error:
+                return index, {"error": str(error), "query": locations[index]}
+
+        tasks = [
+            asyncio.ensure_future(lookup(index, query)) for index, query in pending
+        ]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                index, response = await completed
+                await report(index, response)
+        finally:
+            # Stop outstanding lookups if the batch itself is cancelled
+            for task in tasks:
+                task.cancel()
+        return items
+
+    async def geocode_many(
+        self,
+        locations: Sequence[str],
+        limit: int = 1,
+        *,
+        concurrency: int = 4,
+        **filters: Any,
+    ) -> list[GeocodeResult]:
+        """Geocode several locations and return one result per location.
+
+        At most ``concurrency`` network lookups are in flight at once; the
+        rate limiter still paces the requests themselves.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        semaphore = asyncio.Semaphore(concurrency)
+        items = await self.geocode_batch(
+            locations, limit, slot=lambda: semaphore, **filters
+        )
+        return [GeocodeResult.from_response(item) for item in items]
+
+    def _local_response(
+        self,
+        query: SearchQuery,
+        limit: int,
+        geometry: str | None,
+        tolerance: float,
+    ) -> dict[str, Any] | None:
+        """Answer from the offline tables or the cache, as :meth:`_geocode` would.
+
+        Offline answers have no boundary, so they are skipped when
+        ``geometry`` is asked for, as are cached answers whose simplified
+        geometries are not cached too.
+        """
+        if geometry is None:
+            offline = self._offline_response(query)
+            if offline is not None:
+                return offline
+        cached = self._cached_response(query, limit)
+        if cached is not None and (
+            geometry is None or self._attach_geometries(cached, geometry, tolerance)
+        ):
+            return cached
+        return None
+
+    def _cached_response(self, query: SearchQuery, limit: int) -> dict[str, Any] | None:
+        """Answer from the cache, either directly or by filtering a cached superset.
+
+        An entry fetched with a larger limit serves smaller ones. A cached
+        unfiltered answer serves a country/viewbox-restricted request when
+        enough of its results pass the filter, or when it already held every
+        match.
+        """
+        entry = self.result_cache.get(query.cache_key())
+        if entry is not None:
+            exhaustive = len(entry["coordinates"]) < entry["limit"]
+            if limit <= entry["limit"] or exhaustive:
+                return _build_response(query, entry["coordinates"][:limit])
+
+        if query.is_filtered:
+            entry = self.result_cache.get(query.unfiltered().cache_key())
+            if entry is not None:
+                exhaustive = len(entry["coordinates"]) < entry["limit"]
+                matches = [
+                    result for result in entry["coordinates"] if query.accepts(result)
+                ]
+                if len(matches) >= limit or exhaustive:
+                    return _build_response(query, matches[:limit])
+        return None
+
+    async def _fill_from_l2(self, queries: Sequence[SearchQuery]) -> None:
+        """Copy L2 entries for ``queries`` into the in-memory cache.
+
+        Unfiltered forms of filtered queries are fetched too, as
+        :meth:`_cached_response` can answer from them. One round trip.
+        """
+        assert self.l2 is not None
+        keys = list(
+            dict.fromkeys(
+                key
+                for query in queries
+                for key in (
+                    query.cache_key(),
+                    query.unfiltered().cache_key() if query.is_filtered else None,
+                )
+                if key is not None
+            )
+        )
+        for key, entry in zip(keys, await self.l2.get_many(keys), strict=True):
+            if not (
+                isinstance(entry, dict) and "limit" in entry and "coordinates" in entry
+            ):
+                continue
+            current = self.result_cache.get(key)
+            if current is None or entry["limit"] > current["limit"]:
+                self.result_cache.set(key, entry)
+                self.spatial_index.bulk_load(entry["coordinates"])
+
+    def _store_in_l2(self, key: tuple[Any, ...], entry: dict[str, Any]) -> None:
+        """Write ``entry`` to the L2 cache without delaying the caller."""
+        if self.l2 is None:
+            return
+        task = asyncio.ensure_future(self.l2.set_many([(key, entry)], self.cache_ttl))
+        self._l2_writes.add(task)
+        task.add_done_callback(self._l2_writes.discard)
+
+    def _attach_geometries(
+        self, response: dict[str, Any], encoding: str, tolerance: float
+    ) -> bool:
+        """Add cached simplified geometries to every result in ``response``.
+
+        Returns ``False`` without modifying the response if any is missing.
+        """
+        results = response.get("coordinates", [])
+        geometries = [
+            self.geometry_cache.get((result["place_id"], tolerance))
+            for result in results
+        ]
+        if any(geometry is None for geometry in geometries):
+            return False
+        for result, geometry in zip(results, geometries, strict=True):
+            encoded = encode_geometry(geometry, encoding)
+            if encoded is not None:
+                result["geometry"] = encoded
+        return True
+
+    def _offline_response(self, query: SearchQuery) -> dict[str, Any] | None:
+        """Answer airport codes and postal codes from the bundled lookup tables."""
+        postalcode = query.postalcode
+        if query.street or query.city or query.county or query.state:
+            postalcode = ""
+        result = lookup_place(query.location, postalcode, query.countrycodes)
+        if result is None or not query.accepts(result):
+            return None
+        if query.country and not _in_country(result, query.country):
+            return None
+        self.spatial_index.insert(result)
+        response = _build_response(query, [result])
+        response["source"] = "offline"
+        return response
+
+    async def _search(
+        self, query: SearchQuery, limit: int, extra_params: dict[str, str]
+    ) -> list[dict[str, Any]]:
+        """Run a Nominatim search and return the raw JSON hits.
+
+        Concurrent identical searches share one request. A cancelled caller
+        detaches from it; the request itself is aborted once no caller is left.
+        """
+        params = {**query.params(limit), **extra_params}
+        url = f"{self.base_url}/search?{urlencode(params)}"
+        return await self.inflight.run(url, lambda: self._fetch_json(url))
+
+    async def _fetch_json(self, url: str) -> list[dict[str, Any]]:
+        """GET a Nominatim URL and decode the JSON body."""
+        import aiohttp
+
+        session = await self.get_http_session()
+        await self.limiter.acquire()
+
+        headers = {"User-Agent": self.user_agent}
+
+        try:
+            async with session.get(url, headers=headers) as response:
+                if not response.ok:
+                    raise Exception(
+                        f"Nominatim API error: {response.status} {response.reason}"
+                    )
+
+                return await response.json()
+
+        except aiohttp.ClientError as error:
+            raise Exception(
+                f"Network error: Unable to connect to geocoding service - {str(error)}"
+            ) from error
+
+
+class SyncGeocodeClient:
+    """Blocking wrapper around :class:`GeocodeClient`.
+
+    Runs the async client on a private event loop, so it suits scripts and
+    threaded services; do not use it from code already running in an event
+    loop. Use it as a context manager, or call :meth:`close` when done.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._runner = asyncio.Runner()
+        self.client = GeocodeClient(*args, **kwargs)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def geocode(
+        self, location: str = "", limit: int = 1, **options: Any
+    ) -> dict[str, Any]:
+        """Blocking :meth:`GeocodeClient.geocode`."""
+        return self._runner.run(self.client.geocode(location, limit, **options))
+
+    def geocode_many(
+        self, locations: Sequence[str], limit: int = 1, **options: Any
+    ) -> list[GeocodeResult]:
+        """Blocking :meth:`GeocodeClient.geocode_many`."""
+        return self._runner.run(self.client.geocode_many(locations, limit, **options))
+
+    def close(self) -> None:
+        """Close the HTTP session and the private event loop."""
+        try:
+            self._runner.run(self.client.close())
+        finally:
+            self._runner.close()
@@ -0,0 +1,241 @@
+"""
+Compact boundary geometries
+Simplifies GeoJSON outlines with Douglas-Peucker and encodes them as Google
+polylines or delta-encoded integers, keeping the GeoJSON nesting
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+ENCODINGS = ("polyline", "quantized")
+DEFAULT_TOLERANCE = 0.001
+DEFAULT_PRECISION = 5
+
+Position = Sequence[float]
+
+# Depth of the coordinate-list leaves (lines or rings) for each GeoJSON type
+_LEAF_DEPTH = {
+    "LineString": 0,
+    "MultiLineString": 1,
+    "Polygon": 1,
+    "MultiPolygon": 2,
+}
+
+
+def _segment_distances(
+    points: Sequence[Position], first: int, last: int
+) -> list[float]:
+    """Squared planar distances of ``points[first+1:last]`` to the chord."""
+    x1, y1 = points[first][0], points[first][1]
+    x2, y2 = points[last][0], points[last][1]
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    if length == 0:
+        return [(p[0] - x1) ** 2 + (p[1] - y1) ** 2 for p in points[first + 1 : last]]
+    return [
+        (dy * p[0] - dx * p[1] + x2 * y1 - y2 * x1) ** 2 / length
+        for p in points[first + 1 : last]
+    ]
+
+
+def simplify_line(points: Sequence[Position], tolerance: float) -> list[Position]:
+    """Douglas-Peucker simplification keeping both endpoints.
+
+    Iterative so long boundaries cannot hit the recursion limit; distances for
+    each span are computed in a single pass over its points.
+    """
+    if tolerance <= 0 or len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    threshold = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(points, first, last)
+        farthest = max(range(len(distances)), key=distances.__getitem__)
+        if distances[farthest] > threshold:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(points, keep, strict=True) if kept]
+
+
+def simplify_ring(ring: Sequence[Position], tolerance: float) -> list[Position]:
+    """Simplify a closed ring, returning ``[]`` if it collapses.
+
+    The ring is split at the vertex farthest from its start so neither half
+    has coincident endpoints.
+    """
+    if ring and ring[0] != ring[-1]:
+        ring = [*ring, ring[0]]
+    if tolerance <= 0 or len(ring) < 5:
+        return list(ring)
+    x0, y0 = ring[0][0], ring[0][1]
+    split = max(
+        range(1, len(ring) - 1),
+        key=lambda i: (ring[i][0] - x0) ** 2 + (ring[i][1] - y0) ** 2,
+    )
+    first = simplify_line(ring[: split + 1], tolerance)
+    second = simplify_line(ring[split:], tolerance)
+    simplified = first[:-1] + second
+    return simplified if len(simplified) >= 4 else []
+
+
+def _bbox_ring(ring: Sequence[Position]) -> list[Position]:
+    xs = [point[0] for point in ring]
+    ys = [point[1] for point in ring]
+    west, east, south, north = min(xs), max(xs), min(ys), max(ys)
+    return [(west, south), (east, south), (east, north), (west, north), (west, south)]
+
+
+def _simplify_polygon(
+    rings: Sequence[Sequence[Position]], tolerance: float
+) -> list[list[Position]]:
+    exterior = simplify_ring(rings[0], tolerance)
+    if not exterior:
+        return []
+    holes = (simplify_ring(hole, tolerance) for hole in rings[1:])
+    return [exterior, *(hole for hole in holes if hole)]
+
+
+def simplify_geometry(geometry: dict[str, Any], tolerance: float) -> dict[str, Any]:
+    """Simplify a GeoJSON geometry, dropping rings smaller than the tolerance.
+
+    If every polygon collapses, the first one is replaced by its bounding box
+    so an area result never loses its outline entirely.
+    """
+    kind = geometry.get("type")
+    coordinates = geometry.get("coordinates") or []
+    if kind == "LineString":
+        simplified: Any = simplify_line(coordinates, tolerance)
+    elif kind == "MultiLineString":
+        simplified = [simplify_line(line, tolerance) for line in coordinates]
+    elif kind == "Polygon":
+        simplified = _simplify_polygon(coordinates, tolerance) or [
+            _bbox_ring(coordinates[0])
+        ]
+    elif kind == "MultiPolygon":
+        polygons = (_simplify_polygon(rings, tolerance) for rings in coordinates)
+        simplified = [polygon for polygon in polygons if polygon] or [
+            [_bbox_ring(coordinates[0][0])]
+        ]
+    else:
+        return {"type": kind, "coordinates": coordinates}
+    return {"type": kind, "coordinates": simplified}
+
+
+def _encode_value(value: int, chunks: list[str]) -> None:
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+
+
+def encode_polyline(
+    points: Sequence[Position], precision: int = DEFAULT_PRECISION
+) -> str:
+    """Encode ``(lon, lat)`` positions with the Google polyline algorithm.
+
+    Following the format, each pair is written latitude first.
+    """
+    factor = 10**precision
+    chunks: list[str] = []
+    prev_lat = prev_lon = 0
+    for point in points:
+        lat = round(point[1] * factor)
+        lon = round(point[0] * factor)
+        _encode_value(lat - prev_lat, chunks)
+        _encode_value(lon - prev_lon, chunks)
+        prev_lat, prev_lon = lat, lon
+    return "".join(chunks)
+
+
+def decode_polyline(
+    encoded: str, precision: int = DEFAULT_PRECISION
+) -> list[tuple[float, float]]:
+    """Decode a Google polyline back into ``(lon, lat)`` positions."""
+    factor = 10**precision
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    points = []
+    lat = lon = 0
+    for dlat, dlon in zip(values[::2], values[1::2], strict=True):
+        lat += dlat
+        lon += dlon
+        points.append((lon / factor, lat / factor))
+    return points
+
+
+def quantize(
+    points: Sequence[Position], precision: int = DEFAULT_PRECISION
+) -> list[int]:
+    """Flatten ``(lon, lat)`` positions into delta-encoded integers.
+
+    The first pair is absolute, later pairs are differences from the previous
+    point, all scaled by ``10**precision``.
+    """
+    factor = 10**precision
+    flat = []
+    prev_x = prev_y = 0
+    for point in points:
+        x = round(point[0] * factor)
+        y = round(point[1] * factor)
+        flat.extend((x - prev_x, y - prev_y))
+        prev_x, prev_y = x, y
+    return flat
+
+
+def dequantize(
+    flat: Sequence[int], precision: int = DEFAULT_PRECISION
+) -> list[tuple[float, float]]:
+    """Reverse :func:`quantize`."""
+    factor = 10**precision
+    points = []
+    x = y = 0
+    for dx, dy in zip(flat[::2], flat[1::2], strict=True):
+        x += dx
+        y += dy
+        points.append((x / factor, y / factor))
+    return points
+
+
+def encode_geometry(
+    geometry: dict[str, Any],
+    encoding: str,
+    precision: int = DEFAULT_PRECISION,
+) -> dict[str, Any] | None:
+    """Encode every line/ring of a geometry, keeping the GeoJSON nesting.
+
+    Returns ``None`` for geometries without an outline, such as points.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown geometry encoding: {encoding}")
+    kind = geometry.get("type", "")
+    depth = _LEAF_DEPTH.get(kind)
+    if depth is None:
+        return None
+    encode = encode_polyline if encoding == "polyline" else quantize
+
+    def walk(node: Any, level: int) -> Any:
+        if level == 0:
+            return encode(node, precision)
+        return [walk(child, level - 1) for child in node]
+
+    return {
+        "type": kind,
+        "encoding": encoding,
+        "precision": precision,
+        "coordinates": walk(geometry["coordinates"], depth),
+    }
@@ -0,0 +1,287 @@
+"""
+Shared second-level result cache
+Lets several server processes reuse each other's Nominatim answers through a
+Redis-protocol store, behind each process's in-memory cache; values are
+stored as version-tagged, zlib-compressed compact JSON
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import zlib
+from collections.abc import Callable, Hashable, Sequence
+from typing import Any, Protocol
+from urllib.parse import unquote, urlsplit
+
+REDIS_URL_ENV = "GEOCODE_MCP_REDIS_URL"
+
+# First byte of every stored value; bump when the encoding changes so old
+# entries read as misses instead of garbage
+VALUE_VERSION = 1
+
+KEY_PREFIX = "geocode-mcp:"
+
+
+class RedisError(Exception):
+    """Error reply from the Redis server."""
+
+
+class L2Cache(Protocol):
+    """Interface the client uses to talk to a shared cache."""
+
+    async def get_many(self, keys: Sequence[Hashable]) -> list[Any | None]:
+        """Fetch values for ``keys``; ``None`` marks a miss."""
+        ...
+
+    async def set_many(self, items: Sequence[tuple[Hashable, Any]], ttl: float) -> None:
+        """Store ``(key, value)`` pairs, each expiring after ``ttl`` seconds."""
+        ...
+
+    async def close(self) -> None: ...
+
+
+def encode_value(value: Any) -> bytes:
+    """Serialize ``value`` as version byte + zlib-compressed compact JSON."""
+    payload = json.dumps(value, separators=(",", ":")).encode()
+    return bytes([VALUE_VERSION]) + zlib.compress(payload)
+
+
+def decode_value(data: bytes) -> Any | None:
+    """Inverse of :func:`encode_value`; unreadable values decode as ``None``."""
+    if not data or data[0] != VALUE_VERSION:
+        return None
+    try:
+        return json.loads(zlib.decompress(data[1:]))
+    except (zlib.error, ValueError):
+        return None
+
+
+def storage_key(key: Hashable, prefix: str = KEY_PREFIX) -> bytes:
+    """Fixed-length store key for a cache key (a tuple of JSON-able values)."""
+    digest = hashlib.blake2b(
+        json.dumps(key, separators=(",", ":")).encode(), digest_size=16
+    ).hexdigest()
+    return f"{prefix}{digest}".encode()
+
+
+class MemoryL2Cache:
+    """In-process stand-in for a shared cache.
+
+    Stores encoded values exactly as the Redis backend would, so it exercises
+    the same key and value handling; useful for tests and single-process runs.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._data: dict[bytes, tuple[float, bytes]] = {}
+        # Round trips made, as a Redis backend would count them
+        self.requests = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def get_many(self, keys: Sequence[Hashable]) -> list[Any | None]:
+        self.requests += 1
+        now = self._clock()
+        values: list[Any | None] = []
+        for key in keys:
+            entry = self._data.get(storage_key(key))
+            if entry is None or entry[0] <= now:
+                values.append(None)
+            else:
+                values.append(decode_value(entry[1]))
+        return values
+
+    async def set_many(self, items: Sequence[tuple[Hashable, Any]], ttl: float) -> None:
+        self.requests += 1
+        expires = self._clock() + ttl
+        for key, value in items:
+            self._data[storage_key(key)] = (expires, encode_value(value))
+
+    async def close(self) -> None:
+        # Like a Redis server, the store outlives the clients using it
+        pass
+
+
+def _command(*parts: bytes | str | int) -> bytes:
+    """Encode one command as a RESP array of bulk strings."""
+    out = [b"*%d\r\n" % len(parts)]
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        elif isinstance(part, int):
+            part = b"%d" % part
+        out.append(b"$%d\r\n%s\r\n" % (len(part), part))
+    return b"".join(out)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    """Read one RESP2 reply; error replies are returned, not raised."""
+    line = await reader.readuntil(b"\r\n")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload
+    if kind == b"-":
+        return RedisError(payload.decode(errors="replace"))
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply type {kind!r}")
+
+
+class RedisL2Cache:
+    """Shared cache on any server speaking the Redis protocol (RESP2).
+
+    Uses one connection, opened on first use. Batch reads are a single MGET
+    and batch writes are pipelined SET ... EX commands, so each costs one
+    round trip. The cache is best effort: a slow or unreachable server turns
+    into misses and dropped writes (counted in ``failures``), never errors.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        *,
+        db: int = 0,
+        username: str | None = None,
+        password: str | None = None,
+        tls: bool = False,
+        prefix: str = KEY_PREFIX,
+        timeout: float = 0.25,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.db = db
+        self.username = username
+        self.password = password
+        self.tls = tls
+        self.prefix = prefix
+        self.timeout = timeout
+        self.failures = 0
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **options: Any) -> "RedisL2Cache":
+        """Build a cache from ``redis://[[user]:password@]host[:port][/db]``."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("redis", "rediss"):
+            raise ValueError(f"Unsupported cache URL scheme: {parts.scheme}")
+        db = parts.path.lstrip("/")
+        return cls(
+            parts.hostname or "localhost",
+            parts.port or 6379,
+            db=int(db) if db else 0,
+            username=unquote(parts.username) if parts.username else None,
+            password=unquote(parts.password) if parts.password else None,
+            tls=parts.scheme == "rediss",
+            **options,
+        )
+
+    async def get_many(self, keys: Sequence[Hashable]) -> list[Any | None]:
+        if not keys:
+            return []
+        names = [storage_key(key, self.prefix) for key in keys]
+        try:
+            (reply,) = await self._execute([_command("MGET", *names)])
+        except (OSError, EOFError, TimeoutError, RedisError, ValueError):
+            self.failures += 1
+            return [None] * len(keys)
+        return [decode_value(data) if data is not None else None for data in reply]
+
+    async def set_many(self, items: Sequence[tuple[Hashable, Any]], ttl: float) -> None:
+        if not items:
+            return
+        seconds = max(1, int(ttl))
+        commands = [
+            _command(
+                "SET", storage_key(key, self.prefix), encode_value(value), "EX", seconds
+            )
+            for key, value in items
+        ]
+        try:
+            await self._execute(commands)
+        except (OSError, EOFError, TimeoutError, RedisError, ValueError):
+            self.failures += 1
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._disconnect()
+
+    async def _execute(self, commands: list[bytes]) -> list[Any]:
+        """Send ``commands`` in one write and read one reply for each."""
+        async with self._lock:
+            try:
+                async with asyncio.timeout(self.timeout):
+                    reader, writer = await self._connection()
+                    writer.write(b"".join(commands))
+                    await writer.drain()
+                    replies = [await _read_reply(reader) for _ in commands]
+            except BaseException:
+                # A partly read pipeline leaves the connection out of step
+                await self._disconnect()
+                raise
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def _connection(
+        self,
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._reader is None or self._writer is None:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port, ssl=self.tls or None
+            )
+            self._reader, self._writer = reader, writer
+            setup = []
+            if self.password is not None:
+                if self.username is not None:
+                    setup.append(_command("AUTH", self.username, self.password))
+                else:
+                    setup.append(_command("AUTH", self.password))
+            if self.db:
+                setup.append(_command("SELECT", self.db))
+            if setup:
+                writer.write(b"".join(setup))
+                await writer.drain()
+                for _ in setup:
+                    reply = await _read_reply(reader)
+                    if isinstance(reply, RedisError):
+                        raise reply
+        return self._reader, self._writer
+
+    async def _disconnect(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+def cache_from_env() -> L2Cache | None:
+    """Shared cache named by GEOCODE_MCP_REDIS_URL, if set.
+
+    ``memory://`` selects the in-process stand-in.
+    """
+    url = os.environ.get(REDIS_URL_ENV, "").strip()
+    if not url:
+        return None
+    if url == "memory://":
+        return MemoryL2Cache()
+    return RedisL2Cache.from_url(url)
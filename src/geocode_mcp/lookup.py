@@ -0,0 +1,318 @@
+"""
+Offline lookup tables
+Airport codes and postal codes answered from compact, memory-mapped hash
+tables before any request is sent to Nominatim
+
+Table layout (little endian):
+    header   magic "GMLT", version, key size, record count, slot count
+    slots    slot_count x (key bytes, uint32 record index + 1; 0 = empty)
+    records  record_count x (primary key bytes, float64 lat, float64 lon,
+             2-byte country, uint32 name offset, uint16 name length)
+    names    UTF-8 names referenced by the records
+
+Slots use open addressing with linear probing on ``crc32(key)``, so a lookup
+touches one or two slots regardless of table size.
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import re
+import struct
+import zlib
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any, NamedTuple
+
+MAGIC = b"GMLT"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+
+DATA_DIR = Path(__file__).parent / "data"
+
+# Directory holding replacement tables (e.g. built from a full airport or
+# postal code dataset); files missing there fall back to the bundled ones
+LOOKUP_DIR_ENV = "GEOCODE_MCP_LOOKUP_DIR"
+
+AIRPORT_CODE = re.compile(r"^[A-Z]{3,4}$")
+POSTAL_CODES = {
+    "us": (re.compile(r"^(\d{5})(?:-\d{4})?$"), "{0}"),
+    "gb": (re.compile(r"^([A-Z]{1,2}\d[A-Z\d]?) ?(\d[A-Z]{2})$"), "{0} {1}"),
+    "ca": (re.compile(r"^([A-Z]\d[A-Z]) ?(\d[A-Z]\d)$"), "{0} {1}"),
+}
+
+
+class LookupEntry(NamedTuple):
+    """A single table hit; ``code`` is the record's primary key."""
+
+    code: str
+    latitude: float
+    longitude: float
+    country_code: str
+    name: str
+
+
+class LookupTable:
+    """Read-only view over a table file, mapped on first access."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._map: mmap.mmap | None = None
+        self._slot: struct.Struct | None = None
+        self._record: struct.Struct | None = None
+        self._slot_count = 0
+        self._records_offset = 0
+        self._names_offset = 0
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, key_size, record_count, slot_count = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION:
+            mapped.close()
+            raise ValueError(f"{self.path} is not a lookup table")
+        self._slot = struct.Struct(f"<{key_size}sI")
+        self._record = _record_struct(key_size)
+        self._slot_count = slot_count
+        self._records_offset = HEADER.size + slot_count * self._slot.size
+        self._names_offset = self._records_offset + record_count * self._record.size
+        self._map = mapped
+
+    def get(self, key: str) -> LookupEntry | None:
+        """Return the entry stored under ``key``, if any."""
+        if self._map is None:
+            self._load()
+        mapped, slot, record_struct = self._map, self._slot, self._record
+        assert mapped is not None and slot is not None and record_struct is not None
+        encoded = key.encode()
+        if len(encoded) > slot.size - 4:
+            return None
+        mask = self._slot_count - 1
+        index = zlib.crc32(encoded) & mask
+        for _ in range(self._slot_count):
+            stored, record = slot.unpack_from(mapped, HEADER.size + index * slot.size)
+            if record == 0:
+                return None
+            if stored.rstrip(b"\0") == encoded:
+                code, lat, lon, country, offset, length = record_struct.unpack_from(
+                    mapped, self._records_offset + (record - 1) * record_struct.size
+                )
+                start = self._names_offset + offset
+                return LookupEntry(
+                    code.rstrip(b"\0").decode(),
+                    lat,
+                    lon,
+                    country.decode(),
+                    mapped[start : start + length].decode(),
+                )
+            index = (index + 1) & mask
+        return None
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def _record_struct(key_size: int) -> struct.Struct:
+    return struct.Struct(f"<{key_size}sdd2sIH")
+
+
+def build_table(
+    rows: Iterable[tuple[Sequence[str], float, float, str, str]],
+    path: Path,
+    key_size: int,
+) -> int:
+    """Write a table from ``(keys, lat, lon, country_code, name)`` rows.
+
+    Each row may be reachable under several keys (e.g. IATA and ICAO codes);
+    the first non-empty one is its primary key. Returns the number of records
+    written.
+    """
+    record_struct = _record_struct(key_size)
+    records = bytearray()
+    names = bytearray()
+    keyed: dict[bytes, int] = {}
+    count = 0
+    for keys, lat, lon, country, name in rows:
+        encoded_keys = [key.encode() for key in keys if key]
+        if not encoded_keys:
+            raise ValueError(f"Row for {name!r} has no key")
+        for encoded in encoded_keys:
+            if len(encoded) > key_size:
+                raise ValueError(f"Key {encoded!r} is longer than {key_size} bytes")
+        encoded_name = name.encode()
+        count += 1
+        records += record_struct.pack(
+            encoded_keys[0],
+            lat,
+            lon,
+            country.lower().encode()[:2],
+            len(names),
+            len(encoded_name),
+        )
+        names += encoded_name
+        for encoded in encoded_keys:
+            keyed.setdefault(encoded, count)
+
+    slot_count = 1
+    while slot_count < max(2 * len(keyed), 8):
+        slot_count *= 2
+    slot = struct.Struct(f"<{key_size}sI")
+    slots = bytearray(slot_count * slot.size)
+    occupied = [False] * slot_count
+    for encoded, record in keyed.items():
+        index = zlib.crc32(encoded) & (slot_count - 1)
+        while occupied[index]:
+            index = (index + 1) & (slot_count - 1)
+        occupied[index] = True
+        slot.pack_into(slots, index * slot.size, encoded, record)
+
+    path.write_bytes(
+        HEADER.pack(MAGIC, VERSION, key_size, count, slot_count)
+        + slots
+        + records
+        + names
+    )
+    return count
+
+
+# Table name -> (key size, CSV key columns)
+TABLES = {
+    "airports": (4, ("iata", "icao")),
+    "postcodes": (12, ("key",)),
+}
+
+_tables: dict[str, LookupTable | None] = {}
+
+
+def get_table(name: str) -> LookupTable | None:
+    """Return the named table, resolving its file on first use."""
+    if name not in _tables:
+        override = os.environ.get(LOOKUP_DIR_ENV)
+        candidates = [Path(override) / f"{name}.bin"] if override else []
+        candidates.append(DATA_DIR / f"{name}.bin")
+        path = next((path for path in candidates if path.is_file()), None)
+        _tables[name] = LookupTable(path) if path is not None else None
+    return _tables[name]
+
+
+def reset_tables() -> None:
+    """Unmap every table so the next lookup re-resolves the files."""
+    for table in _tables.values():
+        if table is not None:
+            table.close()
+    _tables.clear()
+
+
+def _airport_result(entry: LookupEntry) -> dict[str, Any]:
+    return {
+        "latitude": entry.latitude,
+        "longitude": entry.longitude,
+        "display_name": entry.name,
+        "place_id": f"airport:{entry.code}",
+        "type": "aerodrome",
+        "class": "aeroway",
+        "importance": 0,
+        "country_code": entry.country_code,
+        "bounding_box": {
+            "south": entry.latitude,
+            "north": entry.latitude,
+            "west": entry.longitude,
+            "east": entry.longitude,
+        },
+    }
+
+
+def _postcode_result(entry: LookupEntry) -> dict[str, Any]:
+    return {
+        **_airport_result(entry),
+        "place_id": f"postcode:{entry.code}",
+        "type": "postcode",
+        "class": "place",
+    }
+
+
+def postcode_keys(code: str, countrycodes: Sequence[str] = ()) -> list[str]:
+    """Table keys (``"cc:CODE"``) a postal code could be stored under."""
+    code = " ".join(code.upper().split())
+    keys = []
+    for country in countrycodes or POSTAL_CODES:
+        pattern = POSTAL_CODES.get(country)
+        if pattern is None:
+            keys.append(f"{country}:{code}")
+            continue
+        match = pattern[0].match(code)
+        if match:
+            keys.append(f"{country}:{pattern[1].format(*match.groups())}")
+    return keys
+
+
+def lookup_place(
+    location: str = "",
+    postalcode: str = "",
+    countrycodes: Sequence[str] = (),
+) -> dict[str, Any] | None:
+    """Resolve an airport code or postal code locally.
+
+    ``location`` is matched as an upper-case IATA/ICAO code or a postal code;
+    ``postalcode`` is the structured postal code field. Returns a formatted
+    result, or ``None`` when the tables have no answer.
+    """
+    if location and AIRPORT_CODE.match(location):
+        table = get_table("airports")
+        entry = table.get(location) if table is not None else None
+        if entry is not None and (
+            not countrycodes or entry.country_code in countrycodes
+        ):
+            return _airport_result(entry)
+
+    code = postalcode or location
+    if code:
+        table = get_table("postcodes")
+        if table is not None:
+            for key in postcode_keys(code, countrycodes):
+                entry = table.get(key)
+                if entry is not None:
+                    return _postcode_result(entry)
+    return None
+
+
+def _read_csv(
+    path: Path, key_columns: Sequence[str]
+) -> list[tuple[list[str], float, float, str, str]]:
+    with open(path, newline="", encoding="utf-8") as file:
+        return [
+            (
+                [row[column] for column in key_columns],
+                float(row["latitude"]),
+                float(row["longitude"]),
+                row["country_code"],
+                row["name"],
+            )
+            for row in csv.DictReader(file)
+        ]
+
+
+def build_from_csv(name: str, source: Path, destination: Path) -> int:
+    """Build the named table from a CSV file."""
+    key_size, key_columns = TABLES[name]
+    return build_table(_read_csv(source, key_columns), destination, key_size)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Command line entry point: rebuild a table from CSV."""
+    parser = argparse.ArgumentParser(
+        description="Build an offline lookup table for geocode-mcp"
+    )
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("source", type=Path, help="CSV file to read")
+    parser.add_argument("destination", type=Path, help="Table file to write")
+    args = parser.parse_args(argv)
+    count = build_from_csv(args.table, args.source, args.destination)
+    print(f"Wrote {count} records to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
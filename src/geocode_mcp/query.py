@@ -0,0 +1,198 @@
+"""
+Canonical geocoding queries
+Normalises free-text and structured search parameters so equivalent requests
+produce the same Nominatim parameters and the same cache key
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+from typing import Any
+
+STRUCTURED_FIELDS = ("street", "city", "county", "state", "country", "postalcode")
+
+# Parameters accepted by geocode_location() on top of the location and limit
+FILTER_FIELDS = ("countrycodes", "viewbox", "bounded", *STRUCTURED_FIELDS)
+
+Viewbox = tuple[float, float, float, float]
+
+
+def _normalize_text(value: str | None) -> str:
+    return " ".join((value or "").split())
+
+
+def _normalize_countrycodes(value: str | Sequence[str] | None) -> tuple[str, ...]:
+    if not value:
+        return ()
+    codes = value.split(",") if isinstance(value, str) else value
+    normalized = set()
+    for code in codes:
+        code = code.strip().lower()
+        if not code:
+            continue
+        if len(code) != 2 or not code.isalpha():
+            raise ValueError(f"Invalid country code: {code!r}")
+        normalized.add(code)
+    return tuple(sorted(normalized))
+
+
+def _normalize_viewbox(value: Any) -> Viewbox | None:
+    """Accept ``{west, south, east, north}`` or ``[x1, y1, x2, y2]``.
+
+    Any two opposite corners make a list viewbox, but named sides must be in
+    order: Nominatim cannot search a box crossing the antimeridian, and
+    re-sorting ``west > east`` would turn it into one spanning the globe.
+    """
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        try:
+            corners = [value["west"], value["south"], value["east"], value["north"]]
+        except KeyError as error:
+            raise ValueError(f"viewbox is missing {error.args[0]!r}") from None
+        if float(corners[0]) > float(corners[2]):
+            raise ValueError(
+                "viewbox west is east of east; boxes crossing the antimeridian "
+                "are not supported, search each side separately"
+            )
+        if float(corners[1]) > float(corners[3]):
+            raise ValueError("viewbox south is north of north")
+    elif isinstance(value, str):
+        corners = value.split(",")
+    else:
+        corners = list(value)
+    if len(corners) != 4:
+        raise ValueError("viewbox needs exactly four coordinates")
+    x1, y1, x2, y2 = (float(corner) for corner in corners)
+    west, east = sorted((x1, x2))
+    south, north = sorted((y1, y2))
+    if not (-180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError("viewbox longitudes must be between -180 and 180")
+    if not (-90 <= south <= 90 and -90 <= north <= 90):
+        raise ValueError("viewbox latitudes must be between -90 and 90")
+    return (
+        round(west, 6),
+        round(south, 6),
+        round(east, 6),
+        round(north, 6),
+    )
+
+
+@dataclass(frozen=True)
+class SearchQuery:
+    """A normalised Nominatim search.
+
+    Either ``location`` (free text) or the structured address fields are set,
+    never both. Text is whitespace-collapsed, country codes are lower-cased and
+    sorted, and the viewbox is reordered to ``(west, south, east, north)``.
+    """
+
+    location: str = ""
+    street: str = ""
+    city: str = ""
+    county: str = ""
+    state: str = ""
+    country: str = ""
+    postalcode: str = ""
+    countrycodes: tuple[str, ...] = ()
+    viewbox: Viewbox | None = None
+    bounded: bool = False
+
+    @classmethod
+    def create(
+        cls,
+        location: str | None = None,
+        *,
+        countrycodes: str | Sequence[str] | None = None,
+        viewbox: Any = None,
+        bounded: bool = False,
+        **structured: str | None,
+    ) -> "SearchQuery":
+        """Build a canonical query, validating the parameter combination."""
+        unknown = set(structured) - set(STRUCTURED_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown search field: {sorted(unknown)[0]}")
+        fields = {name: _normalize_text(structured.get(name)) for name in structured}
+        location = _normalize_text(location)
+        if location and any(fields.values()):
+            raise ValueError(
+                "Use either location or structured address fields, not both"
+            )
+        if not location and not any(fields.values()):
+            raise ValueError("Location parameter is required and cannot be empty")
+        box = _normalize_viewbox(viewbox)
+        return cls(
+            location=location,
+            countrycodes=_normalize_countrycodes(countrycodes),
+            viewbox=box,
+            bounded=bool(bounded) and box is not None,
+            **fields,
+        )
+
+    @property
+    def is_filtered(self) -> bool:
+        """Whether the query only narrows the results of its unfiltered form."""
+        return bool(self.countrycodes) or self.bounded
+
+    def describe(self) -> str:
+        """Human readable form of the query, echoed back in responses."""
+        if self.location:
+            return self.location
+        return ", ".join(
+            value for name in STRUCTURED_FIELDS if (value := getattr(self, name))
+        )
+
+    def cache_key(self) -> tuple[Any, ...]:
+        """Key shared by every request that Nominatim would answer identically.
+
+        Free text is case-folded; the limit is deliberately excluded so a
+        cached answer for a larger limit can serve a smaller one.
+        """
+        return (
+            self.location.casefold(),
+            tuple(getattr(self, name).casefold() for name in STRUCTURED_FIELDS),
+            self.countrycodes,
+            self.viewbox,
+            self.bounded,
+        )
+
+    def unfiltered(self) -> "SearchQuery":
+        """The same search without country or bounded-viewbox restrictions.
+
+        Only meaningful for filtered queries: an unbounded viewbox changes
+        Nominatim's ranking, so it is kept.
+        """
+        if not self.bounded:
+            return replace(self, countrycodes=())
+        return replace(self, countrycodes=(), viewbox=None, bounded=False)
+
+    def accepts(self, result: dict[str, Any]) -> bool:
+        """Apply the country and bounded-viewbox filters to a formatted result."""
+        if self.countrycodes and result.get("country_code") not in self.countrycodes:
+            return False
+        if self.bounded and self.viewbox is not None:
+            west, south, east, north = self.viewbox
+            if not (
+                west <= result["longitude"] <= east
+                and south <= result["latitude"] <= north
+            ):
+                return False
+        return True
+
+    def params(self, limit: int) -> dict[str, str]:
+        """Nominatim ``/search`` parameters in a stable order."""
+        params = {"format": "json"}
+        if self.location:
+            params["q"] = self.location
+        else:
+            for name in STRUCTURED_FIELDS:
+                if value := getattr(self, name):
+                    params[name] = value
+        params["limit"] = str(limit)
+        params["addressdetails"] = "1"
+        if self.countrycodes:
+            params["countrycodes"] = ",".join(self.countrycodes)
+        if self.viewbox is not None:
+            params["viewbox"] = ",".join(str(value) for value in self.viewbox)
+            if self.bounded:
+                params["bounded"] = "1"
+        return params
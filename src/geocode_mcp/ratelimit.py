@@ -0,0 +1,61 @@
+"""
+Upstream request pacing
+Spaces requests to Nominatim evenly so the server stays within the public
+instance's usage policy of one request per second
+"""
+
+import asyncio
+import os
+import time
+from collections.abc import Callable
+
+NOMINATIM_RATE_ENV = "GEOCODE_MCP_NOMINATIM_RATE"
+
+
+class RateLimiter:
+    """Hand out start times at most ``rate`` per second.
+
+    Callers take turns in arrival order, and each one waits until one
+    interval after the previous caller started. A caller that is cancelled
+    while waiting gives up its turn without using it, so later callers are
+    not held back by requests that were never sent. A ``rate`` of zero
+    disables pacing.
+    """
+
+    def __init__(
+        self, rate: float = 1.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        if rate < 0:
+            raise ValueError("rate cannot be negative")
+        self.rate = rate
+        self._interval = 1.0 / rate if rate else 0.0
+        self._clock = clock
+        self._next_start = float("-inf")
+        self._turn = asyncio.Lock()
+        self._waiting = 0
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Build a limiter, reading the rate from the environment."""
+        return cls(float(os.environ.get(NOMINATIM_RATE_ENV, 1.0)))
+
+    def delay(self) -> float:
+        """Seconds a request arriving now would wait before starting."""
+        return (
+            max(0.0, self._next_start - self._clock()) + self._waiting * self._interval
+        )
+
+    async def acquire(self) -> None:
+        """Wait for this caller's turn to send a request."""
+        if not self._interval:
+            return
+        self._waiting += 1
+        try:
+            async with self._turn:
+                now = self._clock()
+                start = max(now, self._next_start)
+                if start > now:
+                    await asyncio.sleep(start - now)
+                self._next_start = start + self._interval
+        finally:
+            self._waiting -= 1
@@ -7,99 +7,118 @@ Uses OpenStreetMap Nominatim API (free, no API key required)
 """
 
 import asyncio
+import functools
+import itertools
 import json
-from collections.abc import Sequence
-from typing import Any, cast
-from urllib.parse import quote
+import os
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable, Hashable, Sequence
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
 
-import aiohttp
-import mcp.server.stdio
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 
-# Global HTTP session
-http_session: aiohttp.ClientSession | None = None
+from geocode_mcp.admission import AdmissionController, AdmissionRejected
+from geocode_mcp.capture import CaptureLog, call_outcome, note_outcome
+from geocode_mcp.client import GeocodeClient
+from geocode_mcp.geometry import DEFAULT_TOLERANCE, ENCODINGS
+from geocode_mcp.l2cache import cache_from_env
+from geocode_mcp.query import FILTER_FIELDS, STRUCTURED_FIELDS, SearchQuery
+from geocode_mcp.ratelimit import RateLimiter
+from geocode_mcp.timezones import TIMEZONE_DATA_ENV, get_index, timezone_at
 
-# Create the server instance
-server = Server("geocoding-server")
+if TYPE_CHECKING:
+    import aiohttp
 
+# Deadline assumed for a get_coordinates call that does not pass a timeout
+DEFAULT_CALL_TIMEOUT = 30.0
 
-async def get_http_session() -> aiohttp.ClientSession:
-    """Get or create the global HTTP session."""
-    global http_session
-    if http_session is None:
-        http_session = aiohttp.ClientSession()
-    return cast(aiohttp.ClientSession, http_session)
+# Most locations accepted by one get_coordinates_batch call
+MAX_BATCH_SIZE = 100
 
+# Event loop for run_server: "auto" (uvloop when installed), "uvloop" or "asyncio"
+EVENT_LOOP_ENV = "GEOCODE_MCP_EVENT_LOOP"
 
-async def close_http_session() -> None:
-    """Close the global HTTP session."""
-    global http_session
-    if http_session is not None:
-        session = http_session  # Create a local reference
-        http_session = None  # Clear the global first
-        await session.close()  # type: ignore[possibly-unbound-attribute]
+# Geocoding state shared by every MCP session: HTTP session, caches (plus the
+# shared L2 cache when GEOCODE_MCP_REDIS_URL is set), request coalescing,
+# Nominatim rate limiter and spatial index
+client = GeocodeClient(limiter=RateLimiter.from_env(), l2=cache_from_env())
 
+# Global and per-session concurrency limits for get_coordinates calls
+admission = AdmissionController.from_env()
 
-async def geocode_location(location: str, limit: int = 1) -> dict[str, Any]:
-    """Geocode a location using Nominatim API."""
-    session = await get_http_session()
+# Anonymized log of get_coordinates calls, when GEOCODE_MCP_CAPTURE is set
+capture = CaptureLog.from_env()
 
-    encoded_location = quote(location)
-    url = f"https://nominatim.openstreetmap.org/search?format=json&q={encoded_location}&limit={limit}&addressdetails=1"
+# Session that calls made outside an MCP request belong to; see
+# call_tool_in_session()
+_outside_session = ContextVar[Hashable]("outside_session", default=None)
 
-    headers = {"User-Agent": "MCP-Geocoding-Tool/1.0 (Python)"}
+# Create the server instance
+server = Server("geocoding-server")
 
-    try:
-        async with session.get(url, headers=headers) as response:
-            if not response.ok:
-                raise Exception(
-                    f"Nominatim API error: {response.status} {response.reason}"
-                )
 
-            data = await response.json()
-
-            if not data:
-                return {
-                    "error": "No coordinates found for the specified location",
-                    "query": location,
-                    "suggestions": [
-                        "Try including more specific details (e.g., state, country)",
-                        "Check spelling of the location name",
-                        "Use a more general location (e.g., city instead of specific address)",
-                    ],
-                }
-
-            results = []
-            for item in data:
-                result = {
-                    "latitude": float(item["lat"]),
-                    "longitude": float(item["lon"]),
-                    "display_name": item["display_name"],
-                    "place_id": item["place_id"],
-                    "type": item.get("type", ""),
-                    "class": item.get("class", ""),
-                    "importance": item.get("importance", 0),
-                    "bounding_box": {
-                        "south": float(item["boundingbox"][0]),
-                        "north": float(item["boundingbox"][1]),
-                        "west": float(item["boundingbox"][2]),
-                        "east": float(item["boundingbox"][3]),
-                    },
-                }
-                results.append(result)
-
-            return {
-                "query": location,
-                "results_count": len(results),
-                "coordinates": results,
-            }
+async def get_http_session() -> "aiohttp.ClientSession":
+    """Get or create the server client's HTTP session."""
+    return await client.get_http_session()
 
-    except aiohttp.ClientError as error:
-        raise Exception(
-            f"Network error: Unable to connect to geocoding service - {str(error)}"
-        ) from error
+
+async def close_http_session() -> None:
+    """Close the server client's HTTP session."""
+    await client.close()
+
+
+async def geocode_location(
+    location: str = "", limit: int = 1, **options: Any
+) -> dict[str, Any]:
+    """Geocode a location with the server's shared client.
+
+    Accepts the same options as :meth:`GeocodeClient.geocode`.
+    """
+    return await client.geocode(location, limit, **options)
+
+
+async def geocode_batch(
+    locations: Sequence[str],
+    limit: int = 1,
+    *,
+    on_result: Callable[[dict[str, Any]], Awaitable[None]] | None = None,
+    session: Hashable = None,
+    **filters: Any,
+) -> list[dict[str, Any]]:
+    """Geocode several locations with the server's shared client.
+
+    Each network lookup holds an admission slot for ``session``, so a large
+    batch shares the server fairly with other clients. At most
+    ``max_per_session`` lookups wait for or hold a slot at once, so a full
+    batch never overflows the session's share of the queue. See
+    :meth:`GeocodeClient.geocode_batch` for ordering and error reporting.
+    """
+    fan_out = asyncio.Semaphore(admission.max_per_session)
+
+    @asynccontextmanager
+    async def slot() -> AsyncGenerator[None]:
+        async with fan_out, admission.slot(session):
+            yield
+
+    return await client.geocode_batch(
+        locations, limit, on_result=on_result, slot=slot, **filters
+    )
+
+
+PLACE_FILTER_PROPERTIES: dict[str, Any] = {
+    "class": {
+        "type": "string",
+        "description": "Only return places of this OSM class (e.g., 'place', 'amenity')",
+    },
+    "type": {
+        "type": "string",
+        "description": "Only return places of this OSM type (e.g., 'city', 'restaurant')",
+    },
+}
 
 
 @server.list_tools()
@@ -123,30 +142,425 @@ async def handle_list_tools() -> list[types.Tool]:
                         "minimum": 1,
                         "maximum": 10,
                     },
+                    **{
+                        field: {
+                            "type": "string",
+                            "description": f"Structured search: {field} (use instead of location)",
+                        }
+                        for field in STRUCTURED_FIELDS
+                    },
+                    "countrycodes": {
+                        "type": "string",
+                        "description": "Comma-separated ISO 3166-1 alpha-2 codes to restrict results to (e.g., 'us,ca')",
+                    },
+                    "viewbox": {
+                        "type": "object",
+                        "description": "Preferred search area; results outside it are excluded when bounded is true",
+                        "properties": {
+                            "south": {"type": "number"},
+                            "north": {"type": "number"},
+                            "west": {"type": "number"},
+                            "east": {"type": "number"},
+                        },
+                        "required": ["south", "north", "west", "east"],
+                    },
+                    "bounded": {
+                        "type": "boolean",
+                        "description": "Only return results inside viewbox (default: false)",
+                        "default": False,
+                    },
+                    "geometry": {
+                        "type": "string",
+                        "description": "Include simplified boundary outlines as Google polylines or delta-encoded integers (default: none)",
+                        "enum": ["none", *ENCODINGS],
+                        "default": "none",
+                    },
+                    "tolerance": {
+                        "type": "number",
+                        "description": f"Boundary simplification tolerance in degrees (default: {DEFAULT_TOLERANCE})",
+                        "default": DEFAULT_TOLERANCE,
+                        "minimum": 0,
+                    },
+                    "timezone": {
+                        "type": "boolean",
+                        "description": "Add each result's IANA timezone (e.g. Europe/Madrid), looked up offline in timezone-boundary-builder polygons (default: false)",
+                        "default": False,
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": f"Seconds the caller is prepared to wait; busy servers reject calls that could not start in time (default: {DEFAULT_CALL_TIMEOUT:g})",
+                        "default": DEFAULT_CALL_TIMEOUT,
+                        "exclusiveMinimum": 0,
+                    },
                 },
-                "required": ["location"],
             },
-        )
+        ),
+        types.Tool(
+            name="get_coordinates_batch",
+            description="Get coordinates for several locations at once; with a progress token, each answer is streamed as a progress notification as soon as it is ready",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "locations": {
+                        "type": "array",
+                        "description": f"Locations to geocode (max: {MAX_BATCH_SIZE})",
+                        "items": {"type": "string"},
+                        "minItems": 1,
+                        "maxItems": MAX_BATCH_SIZE,
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of results per location (default: 1, max: 10)",
+                        "default": 1,
+                        "minimum": 1,
+                        "maximum": 10,
+                    },
+                    "countrycodes": {
+                        "type": "string",
+                        "description": "Comma-separated ISO 3166-1 alpha-2 codes to restrict results to (e.g., 'us,ca')",
+                    },
+                },
+                "required": ["locations"],
+            },
+        ),
+        types.Tool(
+            name="nearest_places",
+            description="Find the places nearest to a point among locations already geocoded by this server",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "latitude": {
+                        "type": "number",
+                        "minimum": -90,
+                        "maximum": 90,
+                    },
+                    "longitude": {
+                        "type": "number",
+                        "minimum": -180,
+                        "maximum": 180,
+                    },
+                    "k": {
+                        "type": "number",
+                        "description": "Number of places to return (default: 5, max: 50)",
+                        "default": 5,
+                        "minimum": 1,
+                        "maximum": 50,
+                    },
+                    "max_distance_km": {
+                        "type": "number",
+                        "description": "Ignore places further away than this distance",
+                        "minimum": 0,
+                    },
+                    **PLACE_FILTER_PROPERTIES,
+                },
+                "required": ["latitude", "longitude"],
+            },
+        ),
+        types.Tool(
+            name="places_within",
+            description="Find places already geocoded by this server inside a bounding box or within a radius of a point",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "bounding_box": {
+                        "type": "object",
+                        "description": "Area to search; west > east crosses the antimeridian",
+                        "properties": {
+                            "south": {"type": "number"},
+                            "north": {"type": "number"},
+                            "west": {"type": "number"},
+                            "east": {"type": "number"},
+                        },
+                        "required": ["south", "north", "west", "east"],
+                    },
+                    "latitude": {"type": "number", "minimum": -90, "maximum": 90},
+                    "longitude": {
+                        "type": "number",
+                        "minimum": -180,
+                        "maximum": 180,
+                    },
+                    "radius_km": {
+                        "type": "number",
+                        "description": "Search radius around latitude/longitude",
+                        "minimum": 0,
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of places to return (default: 50, max: 500)",
+                        "default": 50,
+                        "minimum": 1,
+                        "maximum": 500,
+                    },
+                    **PLACE_FILTER_PROPERTIES,
+                },
+            },
+        ),
+        types.Tool(
+            name="timezone_at",
+            description="Get the IANA timezone of a point (e.g. Asia/Kolkata), looked up offline in timezone-boundary-builder polygons simplified to about 1 km; oceans get their nautical Etc/GMT zone",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "latitude": {"type": "number", "minimum": -90, "maximum": 90},
+                    "longitude": {
+                        "type": "number",
+                        "minimum": -180,
+                        "maximum": 180,
+                    },
+                },
+                "required": ["latitude", "longitude"],
+            },
+        ),
     ]
 
 
+def _coordinate(arguments: dict[str, Any], name: str, bound: float) -> float:
+    """Read a required latitude/longitude style argument."""
+    if arguments.get(name) is None:
+        raise ValueError(f"{name} parameter is required")
+    value = float(arguments[name])
+    if not -bound <= value <= bound:
+        raise ValueError(f"{name} must be between -{bound:g} and {bound:g}")
+    return value
+
+
+def _with_distance(distance: float, place: dict[str, Any]) -> dict[str, Any]:
+    return {**place, "distance_km": round(distance, 3)}
+
+
+def nearest_places(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Answer a ``nearest_places`` call from the spatial index."""
+    latitude = _coordinate(arguments, "latitude", 90)
+    longitude = _coordinate(arguments, "longitude", 180)
+    k = max(1, min(int(arguments.get("k", 5)), 50))
+    max_distance = arguments.get("max_distance_km")
+
+    matches = client.spatial_index.nearest(
+        latitude,
+        longitude,
+        k,
+        place_class=arguments.get("class"),
+        place_type=arguments.get("type"),
+        max_distance_km=float(max_distance) if max_distance is not None else None,
+    )
+    places = [_with_distance(distance, place) for distance, place in matches]
+    return {
+        "query": {"latitude": latitude, "longitude": longitude, "k": k},
+        "results_count": len(places),
+        "places": places,
+    }
+
+
+def places_within(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Answer a ``places_within`` call from the spatial index."""
+    limit = max(1, min(int(arguments.get("limit", 50)), 500))
+    filters = {
+        "place_class": arguments.get("class"),
+        "place_type": arguments.get("type"),
+        "limit": limit,
+    }
+
+    bbox = arguments.get("bounding_box")
+    if bbox is not None:
+        south = _coordinate(bbox, "south", 90)
+        north = _coordinate(bbox, "north", 90)
+        west = _coordinate(bbox, "west", 180)
+        east = _coordinate(bbox, "east", 180)
+        if south > north:
+            raise ValueError("south must not be greater than north")
+        places = client.spatial_index.within_bbox(south, west, north, east, **filters)
+        query: dict[str, Any] = {
+            "bounding_box": {"south": south, "north": north, "west": west, "east": east}
+        }
+    elif arguments.get("radius_km") is not None:
+        latitude = _coordinate(arguments, "latitude", 90)
+        longitude = _coordinate(arguments, "longitude", 180)
+        radius = float(arguments["radius_km"])
+        if radius < 0:
+            raise ValueError("radius_km cannot be negative")
+        places = [
+            _with_distance(distance, place)
+            for distance, place in client.spatial_index.within_radius(
+                latitude, longitude, radius, **filters
+            )
+        ]
+        query = {"latitude": latitude, "longitude": longitude, "radius_km": radius}
+    else:
+        raise ValueError(
+            "Either bounding_box or latitude, longitude and radius_km are required"
+        )
+
+    return {"query": query, "results_count": len(places), "places": places}
+
+
+def find_timezone(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Answer a ``timezone_at`` call from the offline timezone index."""
+    latitude = _coordinate(arguments, "latitude", 90)
+    longitude = _coordinate(arguments, "longitude", 180)
+    if get_index() is None:
+        raise ValueError(f"No timezone index installed; see {TIMEZONE_DATA_ENV}")
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "timezone": timezone_at(latitude, longitude),
+    }
+
+
+def _capture_call(arguments: dict[str, Any], started_at: float, latency: float) -> None:
+    """Append a finished get_coordinates call to the capture log."""
+    assert capture is not None
+    location = str(arguments.get("location", "")).strip()
+    try:
+        limit = min(int(arguments.get("limit", 1)), 10)
+        key = SearchQuery.create(
+            location,
+            **{
+                field: arguments[field]
+                for field in FILTER_FIELDS
+                if arguments.get(field) is not None
+            },
+        ).cache_key()
+    except (TypeError, ValueError):
+        limit, key = 1, ("invalid", location)
+    # A call that ended without an outcome was cancelled before answering
+    outcome = call_outcome.get() or "cancelled"
+    capture.record(started_at, key, limit, outcome, latency, _current_session())
+
+
+def _current_session() -> Hashable:
+    """Identify the MCP session making the current request."""
+    try:
+        return server.request_context.session
+    except LookupError:
+        # Called directly rather than through the MCP server
+        return _outside_session.get()
+
+
+def _progress_reporter(
+    total: int,
+) -> Callable[[dict[str, Any]], Awaitable[None]] | None:
+    """Send each completed batch item to the client as a progress notification.
+
+    Returns ``None`` when the client did not ask for progress.
+    """
+    try:
+        context = server.request_context
+    except LookupError:
+        return None
+    token = context.meta.progressToken if context.meta is not None else None
+    if token is None:
+        return None
+    completed = itertools.count(1)
+
+    async def report(item: dict[str, Any]) -> None:
+        await context.session.send_progress_notification(
+            token,
+            next(completed),
+            total,
+            message=json.dumps(item, separators=(",", ":")),
+            related_request_id=str(context.request_id),
+        )
+
+    return report
+
+
+# Tools answered synchronously from local data
+TOOL_HANDLERS: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+    "nearest_places": nearest_places,
+    "places_within": places_within,
+    "timezone_at": find_timezone,
+}
+
+
 @server.call_tool()
 async def handle_call_tool(
     name: str, arguments: dict[str, Any]
 ) -> Sequence[types.TextContent | types.ImageContent | types.EmbeddedResource]:
     """Handle tool calls."""
     if name == "get_coordinates":
+        started_at, started = time.time(), time.perf_counter()
+        call_outcome.set(None)
         try:
             location = arguments.get("location", "").strip()
             limit = min(int(arguments.get("limit", 1)), 10)
+            filters = {
+                field: arguments[field]
+                for field in FILTER_FIELDS
+                if arguments.get(field) is not None
+            }
+            geometry = arguments.get("geometry", "none")
+            if geometry != "none":
+                filters["geometry"] = geometry
+                filters["tolerance"] = float(
+                    arguments.get("tolerance", DEFAULT_TOLERANCE)
+                )
+            if arguments.get("timezone"):
+                filters["timezone"] = True
+            timeout = float(arguments.get("timeout", DEFAULT_CALL_TIMEOUT))
+
+            # The deadline covers queueing and the upstream request; when it
+            # passes, or the client cancels the request, the in-flight HTTP
+            # call is abandoned and the admission slot is released. Offline
+            # and cached answers are given without taking a slot
+            session = _current_session()
+            async with asyncio.timeout(timeout):
+                coordinates = await geocode_location(
+                    location,
+                    limit,
+                    slot=functools.partial(admission.slot, session, timeout),
+                    **filters,
+                )
 
-            if not location:
-                raise ValueError("Location parameter is required and cannot be empty")
-
-            coordinates = await geocode_location(location, limit)
-
+            if geometry != "none":
+                # Outlines dominate the payload; skip indentation whitespace
+                text = json.dumps(coordinates, separators=(",", ":"))
+            else:
+                text = json.dumps(coordinates, indent=2)
+            return [types.TextContent(type="text", text=text)]
+        except TimeoutError:
+            note_outcome("timeout")
             return [
-                types.TextContent(type="text", text=json.dumps(coordinates, indent=2))
+                types.TextContent(
+                    type="text",
+                    text=f"Error: Request timed out after {timeout:g} seconds",
+                )
+            ]
+        except Exception as error:
+            note_outcome("busy" if isinstance(error, AdmissionRejected) else "error")
+            return [types.TextContent(type="text", text=f"Error: {str(error)}")]
+        finally:
+            if capture is not None:
+                _capture_call(arguments, started_at, time.perf_counter() - started)
+    elif name == "get_coordinates_batch":
+        try:
+            locations = arguments.get("locations") or []
+            if not isinstance(locations, list) or not locations:
+                raise ValueError("locations must be a non-empty list of strings")
+            if len(locations) > MAX_BATCH_SIZE:
+                raise ValueError(f"At most {MAX_BATCH_SIZE} locations per batch")
+            limit = min(int(arguments.get("limit", 1)), 10)
+            filters = {}
+            if arguments.get("countrycodes") is not None:
+                filters["countrycodes"] = arguments["countrycodes"]
+
+            items = await geocode_batch(
+                [str(location).strip() for location in locations],
+                limit,
+                on_result=_progress_reporter(len(locations)),
+                session=_current_session(),
+                **filters,
+            )
+            text = json.dumps({"results_count": len(items), "results": items}, indent=2)
+            return [types.TextContent(type="text", text=text)]
+        except Exception as error:
+            return [types.TextContent(type="text", text=f"Error: {str(error)}")]
+    elif name in TOOL_HANDLERS:
+        try:
+            handler = TOOL_HANDLERS[name]
+            return [
+                types.TextContent(
+                    type="text", text=json.dumps(handler(arguments), indent=2)
+                )
             ]
         except Exception as error:
             return [types.TextContent(type="text", text=f"Error: {str(error)}")]
@@ -154,6 +568,22 @@ async def handle_call_tool(
         raise ValueError(f"Unknown tool: {name}")
 
 
+async def call_tool_in_session(
+    name: str, arguments: dict[str, Any], session: Hashable
+) -> Sequence[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """Handle a tool call made outside an MCP request on behalf of ``session``.
+
+    Admission limits, fair queueing and traffic capture treat the call as
+    coming from ``session`` (any hashable; ``None`` for no session), as
+    scripts/replay_capture.py needs to replay captured sessions.
+    """
+    token = _outside_session.set(session)
+    try:
+        return await handle_call_tool(name, arguments)
+    finally:
+        _outside_session.reset(token)
+
+
 async def main() -> None:
     """Main entry point for the server."""
     # Initialize options
@@ -166,6 +596,8 @@ async def main() -> None:
         ),
     )
 
+    import mcp.server.stdio
+
     try:
         async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
             await server.run(
@@ -175,11 +607,33 @@ async def main() -> None:
             )
     finally:
         await close_http_session()
+        if capture is not None:
+            capture.close()
+
+
+def _loop_factory() -> Callable[[], asyncio.AbstractEventLoop] | None:
+    """Pick the event loop implementation named by GEOCODE_MCP_EVENT_LOOP."""
+    choice = os.environ.get(EVENT_LOOP_ENV, "auto")
+    if choice not in ("auto", "uvloop", "asyncio"):
+        raise ValueError(f"{EVENT_LOOP_ENV} must be one of: auto, uvloop, asyncio")
+    if choice == "asyncio":
+        return None
+    try:
+        import uvloop  # ty: ignore[unresolved-import]
+    except ImportError:
+        if choice == "uvloop":
+            raise
+        return None
+    return uvloop.new_event_loop
 
 
 def run_server() -> None:
     """Synchronous entry point for the server."""
-    asyncio.run(main())
+    with asyncio.Runner(loop_factory=_loop_factory()) as runner:
+        # Most tool calls are answered from memory; eager tasks run them to
+        # completion without an extra trip through the event loop
+        runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+        runner.run(main())
 
 
 if __name__ == "__main__":
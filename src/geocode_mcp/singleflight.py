@@ -0,0 +1,58 @@
+"""
+Request coalescing
+Concurrent callers asking for the same upstream request share one in-flight
+fetch; a caller that is cancelled detaches without disturbing the others
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task[Any]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time.
+
+    The shared call is cancelled only once every caller waiting on it has
+    gone, so an abandoned fetch stops using its connection straight away.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def waiters(self, key: Hashable) -> int:
+        """Number of callers currently waiting on ``key``."""
+        flight = self._flights.get(key)
+        return flight.waiters if flight is not None else 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``call()``, joining an identical call already in flight."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._discard(key, flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Last interested caller left: abort the shared call and make
+                # sure later callers start a fresh one
+                self._discard(key, flight)
+                flight.task.cancel()
+
+    def _discard(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
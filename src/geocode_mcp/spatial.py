@@ -0,0 +1,292 @@
+"""
+Spatial index over geocoded places
+Keeps every place the server has resolved in a uniform latitude/longitude grid
+so nearest-neighbour and area queries can be answered without the network
+"""
+
+import math
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+EARTH_RADIUS_KM = 6371.0088
+
+Place = dict[str, Any]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _matches(place: Place, place_class: str | None, place_type: str | None) -> bool:
+    if place_class is not None and place.get("class") != place_class:
+        return False
+    if place_type is not None and place.get("type") != place_type:
+        return False
+    return True
+
+
+class SpatialIndex:
+    """Uniform grid index keyed by ``place_id``.
+
+    Each place lives in exactly one cell, so memory grows linearly with the
+    number of places. Re-inserting a ``place_id`` replaces the stored entry.
+    """
+
+    def __init__(self, cell_size: float = 1.0) -> None:
+        if not 0 < cell_size <= 90:
+            raise ValueError("cell_size must be between 0 and 90 degrees")
+        self._cell_size = cell_size
+        self._rows = math.ceil(180 / cell_size)
+        self._cols = math.ceil(360 / cell_size)
+        self._places: dict[Any, Place] = {}
+        self._place_cells: dict[Any, tuple[int, int]] = {}
+        self._cells: dict[tuple[int, int], set[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def __contains__(self, place_id: object) -> bool:
+        return place_id in self._places
+
+    def __iter__(self) -> Iterator[Place]:
+        return iter(self._places.values())
+
+    def _row(self, lat: float) -> int:
+        return min(max(int((lat + 90) // self._cell_size), 0), self._rows - 1)
+
+    def _col(self, lon: float) -> int:
+        return int((lon + 180) // self._cell_size) % self._cols
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return self._row(lat), self._col(lon)
+
+    def insert(self, place: Place) -> None:
+        """Add or replace a single place."""
+        self.bulk_load((place,))
+
+    def bulk_load(self, places: Iterable[Place]) -> int:
+        """Add or replace many places in one pass, returning how many were stored.
+
+        Places without a ``place_id`` or coordinates are skipped.
+        """
+        loaded = 0
+        for place in places:
+            place_id = place.get("place_id")
+            lat = place.get("latitude")
+            lon = place.get("longitude")
+            if place_id is None or lat is None or lon is None:
+                continue
+            cell = self._cell(lat, lon)
+            previous = self._place_cells.get(place_id)
+            if previous is not None and previous != cell:
+                self._discard_from_cell(previous, place_id)
+            self._places[place_id] = dict(place)
+            self._place_cells[place_id] = cell
+            self._cells.setdefault(cell, set()).add(place_id)
+            loaded += 1
+        return loaded
+
+    def remove(self, place_id: Any) -> bool:
+        """Remove a place, returning whether it was present."""
+        cell = self._place_cells.pop(place_id, None)
+        if cell is None:
+            return False
+        del self._places[place_id]
+        self._discard_from_cell(cell, place_id)
+        return True
+
+    def clear(self) -> None:
+        """Drop every indexed place."""
+        self._places.clear()
+        self._place_cells.clear()
+        self._cells.clear()
+
+    def _discard_from_cell(self, cell: tuple[int, int], place_id: Any) -> None:
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(place_id)
+            if not members:
+                del self._cells[cell]
+
+    def _col_ranges(self, west: float, east: float) -> list[range]:
+        if east - west >= 360:
+            return [range(self._cols)]
+        first, last = self._col(west), self._col(east)
+        if west <= east and first <= last:
+            return [range(first, last + 1)]
+        return [range(first, self._cols), range(0, last + 1)]
+
+    def _ids_in_cells(
+        self, south: float, west: float, north: float, east: float
+    ) -> Iterator[Any]:
+        rows = range(self._row(south), self._row(north) + 1)
+        col_ranges = self._col_ranges(west, east)
+        cell_count = len(rows) * sum(len(cols) for cols in col_ranges)
+        if cell_count >= len(self._cells):
+            # Sparse index: scanning occupied cells beats walking empty ones
+            for (row, col), members in self._cells.items():
+                if row in rows and any(col in cols for cols in col_ranges):
+                    yield from members
+            return
+        for row in rows:
+            for cols in col_ranges:
+                for col in cols:
+                    members = self._cells.get((row, col))
+                    if members:
+                        yield from members
+
+    def within_bbox(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        *,
+        place_class: str | None = None,
+        place_type: str | None = None,
+        limit: int | None = None,
+    ) -> list[Place]:
+        """Places whose point lies inside the box, ordered by importance.
+
+        A box with ``west > east`` is treated as crossing the antimeridian.
+        """
+        crosses = west > east
+        found = []
+        for place_id in self._ids_in_cells(south, west, north, east):
+            place = self._places[place_id]
+            lat, lon = place["latitude"], place["longitude"]
+            if not south <= lat <= north:
+                continue
+            if crosses:
+                if not (lon >= west or lon <= east):
+                    continue
+            elif not west <= lon <= east:
+                continue
+            if _matches(place, place_class, place_type):
+                found.append(place)
+        found.sort(key=lambda place: place.get("importance") or 0, reverse=True)
+        return found[:limit] if limit is not None else found
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        *,
+        place_class: str | None = None,
+        place_type: str | None = None,
+        limit: int | None = None,
+    ) -> list[tuple[float, Place]]:
+        """``(distance_km, place)`` pairs within the radius, nearest first."""
+        found = [
+            (distance, place)
+            for distance, place in self._candidates_within(
+                latitude, longitude, radius_km
+            )
+            if _matches(place, place_class, place_type)
+        ]
+        found.sort(key=lambda pair: pair[0])
+        return found[:limit] if limit is not None else found
+
+    def _candidates_within(
+        self, latitude: float, longitude: float, radius_km: float
+    ) -> Iterator[tuple[float, Place]]:
+        angular = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angular)
+        south, north = latitude - dlat, latitude + dlat
+        ratio = math.sin(angular) / max(math.cos(math.radians(latitude)), 1e-12)
+        if north >= 90 or south <= -90 or angular >= math.pi / 2 or ratio >= 1:
+            # The circle reaches a pole, so every longitude is in range
+            west, east = -180.0, 180.0
+        else:
+            dlon = math.degrees(math.asin(ratio))
+            west = (longitude - dlon + 180) % 360 - 180
+            east = (longitude + dlon + 180) % 360 - 180
+        for place_id in self._ids_in_cells(
+            max(south, -90.0), west, min(north, 90.0), east
+        ):
+            place = self._places[place_id]
+            distance = haversine_km(
+                latitude, longitude, place["latitude"], place["longitude"]
+            )
+            if distance <= radius_km:
+                yield distance, place
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 5,
+        *,
+        place_class: str | None = None,
+        place_type: str | None = None,
+        max_distance_km: float | None = None,
+    ) -> list[tuple[float, Place]]:
+        """The ``k`` nearest ``(distance_km, place)`` pairs, nearest first.
+
+        Grid rings around the query cell are widened until ``k`` matching
+        candidates are seen; the k-th candidate distance then bounds an exact
+        radius query, so the answer does not depend on the cell size.
+        """
+        if k <= 0 or not self._places:
+            return []
+        row, col = self._cell(latitude, longitude)
+        candidates: list[Place] = []
+        ring = 0
+        while True:
+            if (2 * ring + 1) ** 2 >= len(self._cells):
+                candidates = [
+                    place
+                    for place in self._places.values()
+                    if _matches(place, place_class, place_type)
+                ]
+                break
+            for cell in self._ring_cells(row, col, ring):
+                for place_id in self._cells.get(cell, ()):
+                    place = self._places[place_id]
+                    if _matches(place, place_class, place_type):
+                        candidates.append(place)
+            if len(candidates) >= k:
+                break
+            ring += 1
+
+        distances = sorted(
+            haversine_km(latitude, longitude, place["latitude"], place["longitude"])
+            for place in candidates
+        )
+        if not distances:
+            return []
+        bound = distances[min(k, len(distances)) - 1]
+        if max_distance_km is not None:
+            bound = min(bound, max_distance_km)
+        return self.within_radius(
+            latitude,
+            longitude,
+            bound,
+            place_class=place_class,
+            place_type=place_type,
+            limit=k,
+        )
+
+    def _ring_cells(self, row: int, col: int, ring: int) -> set[tuple[int, int]]:
+        if ring == 0:
+            return {(row, col)}
+        cells = set()
+        for offset in range(-ring, ring + 1):
+            for r in (row - ring, row + ring):
+                if 0 <= r < self._rows:
+                    cells.add((r, (col + offset) % self._cols))
+            r = row + offset
+            if 0 <= r < self._rows:
+                cells.add((r, (col - ring) % self._cols))
+                cells.add((r, (col + ring) % self._cols))
+        return cells
@@ -0,0 +1,463 @@
+"""
+Offline timezone lookup
+Resolves the IANA timezone of a point from a memory-mapped grid index built
+from timezone-boundary-builder polygons; the package ships one built from the
+release with oceans (data/timezones.bin)
+
+Index layout (little endian):
+    header   magic "GMTZ", version, cell size and simplification tolerance
+             in degrees, grid columns and rows, zone count, record and name
+             offsets
+    cells    rows x columns uint32 values, row 0 starting at (-90, -180):
+             0 = no zone, n = entirely inside zone n - 1, or the offset of a
+             boundary record with the high bit set
+    records  per boundary cell: uint16 candidate count, then per candidate
+             uint16 zone, uint8 "south-west corner inside", uint32 edge
+             count and the float32 (x1, y1, x2, y2) polygon edges touching
+             the cell
+    names    newline separated zone names
+
+A cell lying entirely inside one zone is answered from the cell array alone.
+In a boundary cell, a point's side of each candidate polygon follows from the
+precomputed state of the cell's corner plus the edges crossed on the way from
+the corner to the point, so only the few edges inside the cell are tested.
+Polygons simplified independently leave slivers between neighbouring zones;
+a point in one is given the zone whose edge is nearest, if that edge lies
+within the simplification tolerance.
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any
+
+from geocode_mcp.geometry import simplify_geometry
+
+MAGIC = b"GMTZ"
+VERSION = 2
+HEADER = struct.Struct("<4sHHddIIIII")
+CANDIDATE = struct.Struct("<HBxI")
+
+# Cell values with this bit set point into the records section
+BOUNDARY = 0x80000000
+
+DEFAULT_CELL_SIZE = 0.5
+
+# Douglas-Peucker tolerance in degrees (about 1 km) applied to the boundary
+# polygons when building from GeoJSON
+DEFAULT_TOLERANCE = 0.01
+
+DATA_DIR = Path(__file__).parent / "data"
+
+# Index file built with ``python -m geocode_mcp.timezones`` to use instead of
+# the bundled data/timezones.bin
+TIMEZONE_DATA_ENV = "GEOCODE_MCP_TIMEZONE_DATA"
+
+# Decoded boundary cells kept in memory per index
+CELL_CACHE_SIZE = 4096
+
+Edge = tuple[float, float, float, float]
+
+# Zone name, whether the cell's south-west corner is inside it, and the
+# flattened edges of the zone touching the cell
+Candidate = tuple[str, bool, tuple[float, ...]]
+
+
+class TimezoneIndex:
+    """Read-only view over an index file, mapped on first access."""
+
+    def __init__(self, path: Path, cache_size: int = CELL_CACHE_SIZE) -> None:
+        self.path = path
+        self.cache_size = cache_size
+        self._map: mmap.mmap | None = None
+        self._cells: OrderedDict[int, tuple[Candidate, ...]] = OrderedDict()
+        self._zones: list[str] = []
+        self._cell_size = 0.0
+        self._tolerance = 0.0
+        self._cols = 0
+        self._rows = 0
+        self._records_offset = 0
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            _,
+            cell_size,
+            tolerance,
+            cols,
+            rows,
+            zone_count,
+            records_offset,
+            names_offset,
+        ) = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION:
+            mapped.close()
+            raise ValueError(f"{self.path} is not a timezone index")
+        names = mapped[names_offset:].decode()
+        self._zones = names.split("\n") if zone_count else []
+        self._cell_size = cell_size
+        self._tolerance = tolerance
+        self._cols = cols
+        self._rows = rows
+        self._records_offset = records_offset
+        self._map = mapped
+
+    @property
+    def zones(self) -> list[str]:
+        """Every zone name in the index."""
+        if self._map is None:
+            self._load()
+        return list(self._zones)
+
+    def lookup(self, latitude: float, longitude: float) -> str | None:
+        """Return the zone containing the point, or ``None`` if none does."""
+        if self._map is None:
+            self._load()
+        mapped = self._map
+        assert mapped is not None
+        size = self._cell_size
+        col = min(max(int((longitude + 180) / size), 0), self._cols - 1)
+        row = min(max(int((latitude + 90) / size), 0), self._rows - 1)
+        (value,) = struct.unpack_from(
+            "<I", mapped, HEADER.size + 4 * (row * self._cols + col)
+        )
+        if not value & BOUNDARY:
+            return self._zones[value - 1] if value else None
+
+        west = -180 + col * size
+        south = -90 + row * size
+        candidates = self._cell(value & ~BOUNDARY)
+        for zone, inside, edges in candidates:
+            # Walk from the south-west corner east along the cell's south
+            # side, then north to the point, flipping at each edge crossed
+            values = iter(edges)
+            for x1, y1, x2, y2 in zip(values, values, values, values, strict=True):
+                if (y1 > south) != (y2 > south):
+                    x = x1 + (south - y1) * (x2 - x1) / (y2 - y1)
+                    if west < x <= longitude:
+                        inside = not inside
+                if (x1 > longitude) != (x2 > longitude):
+                    y = y1 + (longitude - x1) * (y2 - y1) / (x2 - x1)
+                    if south < y <= latitude:
+                        inside = not inside
+            if inside:
+                return zone
+        if self._tolerance:
+            return _nearest(candidates, latitude, longitude, self._tolerance)
+        return None
+
+    def _cell(self, offset: int) -> tuple[Candidate, ...]:
+        """Decode (and cache) the boundary record at ``offset``."""
+        cells = self._cells
+        cached = cells.get(offset)
+        if cached is not None:
+            cells.move_to_end(offset)
+            return cached
+        mapped = self._map
+        assert mapped is not None
+        position = self._records_offset + offset
+        (count,) = struct.unpack_from("<H", mapped, position)
+        position += 2
+        candidates = []
+        for _ in range(count):
+            zone, inside, edge_count = CANDIDATE.unpack_from(mapped, position)
+            position += CANDIDATE.size
+            edges = struct.unpack_from(f"<{4 * edge_count}f", mapped, position)
+            position += 16 * edge_count
+            candidates.append((self._zones[zone], bool(inside), edges))
+        decoded = tuple(candidates)
+        cells[offset] = decoded
+        if len(cells) > self.cache_size:
+            cells.popitem(last=False)
+        return decoded
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._cells.clear()
+
+
+def _nearest(
+    candidates: Sequence[Candidate],
+    latitude: float,
+    longitude: float,
+    within: float,
+) -> str | None:
+    """Zone of the edge closest to the point, if one lies ``within`` degrees."""
+    best, best_distance = None, within * within
+    for zone, _, edges in candidates:
+        values = iter(edges)
+        for x1, y1, x2, y2 in zip(values, values, values, values, strict=True):
+            dx, dy = x2 - x1, y2 - y1
+            t = ((longitude - x1) * dx + (latitude - y1) * dy) / (dx * dx + dy * dy)
+            t = min(max(t, 0.0), 1.0)
+            distance = (x1 + t * dx - longitude) ** 2 + (y1 + t * dy - latitude) ** 2
+            if distance <= best_distance:
+                best, best_distance = zone, distance
+    return best
+
+
+def _geometry_edges(geometry: dict[str, Any]) -> list[Edge]:
+    """Edges of every ring of a GeoJSON Polygon or MultiPolygon."""
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError(f"Unsupported geometry type: {geometry['type']}")
+    edges = []
+    for polygon in polygons:
+        for ring in polygon:
+            points = [(float(point[0]), float(point[1])) for point in ring]
+            if points and points[0] != points[-1]:
+                points.append(points[0])
+            edges.extend(
+                (x1, y1, x2, y2)
+                for (x1, y1), (x2, y2) in zip(points, points[1:], strict=False)
+                if (x1, y1) != (x2, y2)
+            )
+    return edges
+
+
+def _float32_edges(edges: list[Edge]) -> list[Edge]:
+    """Round edges to the float32 values stored in the index.
+
+    Cell states are computed from the rounded edges, so they agree with what
+    lookups read back. Edges that collapse to a point are dropped.
+    """
+    values = iter(array("f", (v for edge in edges for v in edge)).tolist())
+    return [
+        (x1, y1, x2, y2)
+        for x1, y1, x2, y2 in zip(values, values, values, values, strict=True)
+        if (x1, y1) != (x2, y2)
+    ]
+
+
+def build_index(
+    zones: Iterable[tuple[str, dict[str, Any]]],
+    path: Path,
+    cell_size: float = DEFAULT_CELL_SIZE,
+    tolerance: float = 0.0,
+) -> int:
+    """Write an index from ``(zone name, GeoJSON geometry)`` pairs.
+
+    Polygons are treated with the even-odd rule, so holes are honoured;
+    where zones overlap the one listed first wins. ``tolerance`` records how
+    far the polygons were simplified, which is how far lookups may snap a
+    point lying between zones to the nearest one. Returns the number of
+    zones written.
+    """
+    if not 0 < cell_size <= 90:
+        raise ValueError("cell_size must be between 0 and 90 degrees")
+    cols = math.ceil(360 / cell_size)
+    rows = math.ceil(180 / cell_size)
+
+    def col_of(x: float) -> int:
+        return min(max(math.floor((x + 180) / cell_size), 0), cols - 1)
+
+    def row_of(y: float) -> int:
+        return min(max(math.floor((y + 90) / cell_size), 0), rows - 1)
+
+    names: list[str] = []
+    # cell -> [(zone, corner inside, edges)], and cell -> zones covering it
+    boundary: dict[int, list[tuple[int, bool, list[Edge]]]] = defaultdict(list)
+    interior: dict[int, list[int]] = defaultdict(list)
+
+    for name, geometry in zones:
+        if "\n" in name:
+            raise ValueError(f"Zone name {name!r} contains a newline")
+        zone = len(names)
+        names.append(name)
+        edges = _float32_edges(_geometry_edges(geometry))
+        if not edges:
+            continue
+
+        # Edges touching each cell, found by clipping every edge to the
+        # latitude band of each row it spans
+        cell_edges: dict[int, list[Edge]] = defaultdict(list)
+        # x positions where the zone's edges cross each row's south line
+        crossings: dict[int, list[float]] = defaultdict(list)
+        for edge in edges:
+            x1, y1, x2, y2 = edge
+            low, high = min(y1, y2), max(y1, y2)
+            for row in range(row_of(low), row_of(high) + 1):
+                south = -90 + row * cell_size
+                if (y1 > south) != (y2 > south):
+                    crossings[row].append(x1 + (south - y1) * (x2 - x1) / (y2 - y1))
+                band_low = max(low, south)
+                band_high = min(high, south + cell_size)
+                if y1 == y2:
+                    xa, xb = x1, x2
+                else:
+                    xa = x1 + (band_low - y1) * (x2 - x1) / (y2 - y1)
+                    xb = x1 + (band_high - y1) * (x2 - x1) / (y2 - y1)
+                for col in range(col_of(min(xa, xb)), col_of(max(xa, xb)) + 1):
+                    cell_edges[row * cols + col].append(edge)
+
+        first_col = col_of(min(min(e[0], e[2]) for e in edges))
+        last_col = col_of(max(max(e[0], e[2]) for e in edges))
+        for row, xs in crossings.items():
+            xs.sort()
+            for col in range(first_col, last_col + 1):
+                west = -180 + col * cell_size
+                # Ray cast east from the corner along the row's south line
+                inside = (len(xs) - bisect_right(xs, west)) % 2 == 1
+                cell = row * cols + col
+                if cell in cell_edges:
+                    boundary[cell].append((zone, inside, cell_edges.pop(cell)))
+                elif inside:
+                    interior[cell].append(zone)
+        # Left over: cells in rows whose south line the zone never crosses,
+        # so their corners are outside it
+        for cell, touching in cell_edges.items():
+            boundary[cell].append((zone, False, touching))
+
+    cells = bytearray(4 * cols * rows)
+    records = bytearray()
+    for cell in sorted(boundary.keys() | interior.keys()):
+        covering = interior.get(cell, [])
+        if cell not in boundary:
+            struct.pack_into("<I", cells, 4 * cell, covering[0] + 1)
+            continue
+        candidates = [(zone, True, []) for zone in covering] + boundary[cell]
+        struct.pack_into("<I", cells, 4 * cell, BOUNDARY | len(records))
+        records += struct.pack("<H", len(candidates))
+        for zone, inside, touching in candidates:
+            records += CANDIDATE.pack(zone, inside, len(touching))
+            records += struct.pack(
+                f"<{4 * len(touching)}f", *(v for edge in touching for v in edge)
+            )
+
+    records_offset = HEADER.size + len(cells)
+    names_offset = records_offset + len(records)
+    path.write_bytes(
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            0,
+            cell_size,
+            tolerance,
+            cols,
+            rows,
+            len(names),
+            records_offset,
+            names_offset,
+        )
+        + cells
+        + records
+        + "\n".join(names).encode()
+    )
+    return len(names)
+
+
+_index: list[TimezoneIndex | None] = []
+
+
+def get_index() -> TimezoneIndex | None:
+    """Return the installed index, resolving its file on first use."""
+    if not _index:
+        override = os.environ.get(TIMEZONE_DATA_ENV)
+        candidates = [Path(override)] if override else []
+        candidates.append(DATA_DIR / "timezones.bin")
+        path = next((path for path in candidates if path.is_file()), None)
+        _index.append(TimezoneIndex(path) if path is not None else None)
+    return _index[0]
+
+
+def reset_index() -> None:
+    """Unmap the index so the next lookup re-resolves the file."""
+    for index in _index:
+        if index is not None:
+            index.close()
+    _index.clear()
+
+
+def timezone_at(latitude: float, longitude: float) -> str | None:
+    """Return the IANA zone of a point, or ``None`` if it cannot be told.
+
+    ``None`` means no index is installed or, with an index built without
+    the oceans, that the point lies outside every zone.
+    """
+    if not -90 <= latitude <= 90:
+        raise ValueError("latitude must be between -90 and 90")
+    if not -180 <= longitude <= 180:
+        raise ValueError("longitude must be between -180 and 180")
+    index = get_index()
+    return index.lookup(latitude, longitude) if index is not None else None
+
+
+def build_from_geojson(
+    source: Path,
+    destination: Path,
+    cell_size: float = DEFAULT_CELL_SIZE,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> int:
+    """Build an index from a timezone-boundary-builder GeoJSON release.
+
+    Each zone's polygons are simplified to ``tolerance`` degrees first.
+    """
+    with open(source, encoding="utf-8") as file:
+        collection = json.load(file)
+    return build_index(
+        (
+            (
+                feature["properties"]["tzid"],
+                simplify_geometry(feature["geometry"], tolerance)
+                if tolerance
+                else feature["geometry"],
+            )
+            for feature in collection["features"]
+        ),
+        destination,
+        cell_size,
+        tolerance,
+    )
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Command line entry point: build an index from GeoJSON."""
+    parser = argparse.ArgumentParser(
+        description="Build an offline timezone index for geocode-mcp"
+    )
+    parser.add_argument(
+        "source",
+        type=Path,
+        help="timezone-boundary-builder GeoJSON (e.g. combined-with-oceans.json)",
+    )
+    parser.add_argument("destination", type=Path, help="Index file to write")
+    parser.add_argument(
+        "--cell-size",
+        type=float,
+        default=DEFAULT_CELL_SIZE,
+        help=f"Grid cell size in degrees (default: {DEFAULT_CELL_SIZE})",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=(
+            "Simplify the polygons to this many degrees, 0 to keep every "
+            f"vertex (default: {DEFAULT_TOLERANCE})"
+        ),
+    )
+    args = parser.parse_args(argv)
+    count = build_from_geojson(
+        args.source, args.destination, args.cell_size, args.tolerance
+    )
+    print(f"Wrote {count} zones to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Shared fixtures for the geocode-mcp test suite
+"""
+
+import asyncio
+import os
+import sys
+from collections.abc import AsyncIterator, Callable, Mapping
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from geocode_mcp import server
+from geocode_mcp.client import GeocodeClient
+from geocode_mcp.ratelimit import RateLimiter
+
+
+@pytest.fixture(autouse=True)
+async def geocode_client(
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncIterator[GeocodeClient]:
+    """Give every test a fresh server client: empty caches and no pacing."""
+    client = GeocodeClient(limiter=RateLimiter(0))
+    monkeypatch.setattr(server, "client", client)
+    yield client
+    await client.close()
+
+
+def _fake_nominatim(
+    mock_get: MagicMock, places: Mapping[str, dict[str, Any]], delay: float = 0
+) -> dict[str, int]:
+    """Answer each request from ``places`` by its lowercased ``q`` parameter.
+
+    A query of "broken" fails with a 500. Returns in-flight request counters.
+    """
+    counters = {"active": 0, "peak": 0}
+
+    def get(url: str, **kwargs: Any) -> MagicMock:
+        query = parse_qs(urlsplit(url).query)["q"][0].lower()
+
+        async def respond() -> AsyncMock:
+            counters["active"] += 1
+            counters["peak"] = max(counters["peak"], counters["active"])
+            await asyncio.sleep(delay)
+            counters["active"] -= 1
+            response = AsyncMock()
+            response.ok = query != "broken"
+            response.status, response.reason = 500, "Internal Server Error"
+            response.json = AsyncMock(
+                return_value=[places[query]] if query in places else []
+            )
+            return response
+
+        request = MagicMock()
+        request.__aenter__ = AsyncMock(side_effect=respond)
+        request.__aexit__ = AsyncMock(return_value=False)
+        return request
+
+    mock_get.side_effect = get
+    return counters
+
+
+@pytest.fixture
+def fake_nominatim() -> Callable[..., dict[str, int]]:
+    """Make a patched ``aiohttp.ClientSession.get`` answer like Nominatim."""
+    return _fake_nominatim
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+"""
+Tests for admission control and per-session fairness
+"""
+
+import asyncio
+import json
+import os
+import sys
+from collections.abc import Callable, Hashable
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp import server
+from geocode_mcp.admission import AdmissionController, AdmissionRejected
+from geocode_mcp.server import MAX_BATCH_SIZE, geocode_location, handle_call_tool
+
+PARIS = {
+    "lat": "48.8534951",
+    "lon": "2.3483915",
+    "display_name": "Paris, Île-de-France, France",
+    "place_id": 1,
+    "type": "city",
+    "class": "place",
+    "importance": 0.9,
+    "boundingbox": ["48.8", "48.9", "2.2", "2.4"],
+}
+
+
+async def hold(
+    controller: AdmissionController,
+    session: Hashable,
+    release: asyncio.Event,
+    order: list[Hashable] | None = None,
+) -> None:
+    async with controller.slot(session):
+        if order is not None:
+            order.append(session)
+        await release.wait()
+
+
+class TestAdmissionController:
+    """Test cases for the concurrency limiter."""
+
+    @pytest.mark.asyncio
+    async def test_global_and_session_limits(self) -> None:
+        """No more than the configured number of calls run at once."""
+        controller = AdmissionController(max_concurrent=3, max_per_session=2)
+        release = asyncio.Event()
+        tasks = [
+            asyncio.create_task(hold(controller, session, release))
+            for session in ("a", "a", "a", "b", "b")
+        ]
+        await asyncio.sleep(0)
+        assert controller.active == 3
+        assert controller.queued == 2
+        release.set()
+        await asyncio.gather(*tasks)
+        assert controller.active == 0
+        assert controller.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_sessions_take_turns(self) -> None:
+        """A session with a long backlog cannot starve a later session."""
+        controller = AdmissionController(max_concurrent=1, max_per_session=1)
+        gates = {}
+        order: list[Hashable] = []
+        tasks = []
+        for index, session in enumerate(["greedy"] * 4 + ["polite"]):
+            gates[index] = asyncio.Event()
+            tasks.append(
+                asyncio.create_task(hold(controller, session, gates[index], order))
+            )
+            await asyncio.sleep(0)
+        for index in range(5):
+            gates[index].set()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        assert order.index("polite") == 2
+
+    @pytest.mark.asyncio
+    async def test_queue_bound(self) -> None:
+        """Calls beyond the queue bound are rejected immediately."""
+        controller = AdmissionController(max_concurrent=1, max_queue=1)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, "a", release))
+        queued = asyncio.create_task(hold(controller, "b", release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected, match="too many queued"):
+            async with controller.slot("c"):
+                pass
+        release.set()
+        await asyncio.gather(running, queued)
+
+    @pytest.mark.asyncio
+    async def test_greedy_session_cannot_fill_the_queue(self) -> None:
+        """A fanning-out session is capped at its share of the queue."""
+        controller = AdmissionController(
+            max_concurrent=2, max_queue=8, initial_service_time=1.0
+        )
+        release = asyncio.Event()
+        order: list[Hashable] = []
+        greedy = [
+            asyncio.create_task(hold(controller, "greedy", release, order))
+            for _ in range(4)
+        ]
+        await asyncio.sleep(0)
+        assert (controller.active, controller.queued) == (2, 2)
+        with pytest.raises(AdmissionRejected, match="from this session"):
+            async with controller.slot("greedy"):
+                pass
+
+        # The polite session is served next, so its deadline check passes
+        assert controller.estimated_wait("polite") == 1.0
+        assert controller.estimated_wait("greedy") == 2.0
+        polite = asyncio.create_task(hold(controller, "polite", release, order))
+        await asyncio.sleep(0)
+        assert controller.queued == 3
+        release.set()
+        await asyncio.gather(*greedy, polite)
+        assert order == ["greedy", "greedy", "greedy", "polite", "greedy"]
+
+    @pytest.mark.asyncio
+    async def test_deadline_aware_rejection(self) -> None:
+        """A call whose estimated wait exceeds its timeout fails fast."""
+        controller = AdmissionController(max_concurrent=1, initial_service_time=5.0)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, "a", release))
+        await asyncio.sleep(0)
+        assert controller.estimated_wait() == 5.0
+        with pytest.raises(AdmissionRejected, match="estimated wait"):
+            async with controller.slot("b", timeout=1.0):
+                pass
+        assert controller.queued == 0
+        release.set()
+        await running
+
+    @pytest.mark.asyncio
+    async def test_wait_timeout_and_cancellation_free_the_queue(self) -> None:
+        """Callers that give up are removed from the queue."""
+        controller = AdmissionController(max_concurrent=1, initial_service_time=0)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, "a", release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected, match="timed out"):
+            async with controller.slot("b", timeout=0.01):
+                pass
+        cancelled = asyncio.create_task(hold(controller, "c", release))
+        await asyncio.sleep(0)
+        assert controller.queued == 1
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert controller.queued == 0
+        release.set()
+        await running
+        assert controller.active == 0
+
+
+class TestAdmissionTool:
+    """Test cases for admission in handle_call_tool."""
+
+    @pytest.mark.asyncio
+    async def test_busy_server_reports_error(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        fake_nominatim: Callable[..., dict[str, int]],
+    ) -> None:
+        """Rejected calls come back as tool errors."""
+        controller = AdmissionController(max_concurrent=1, max_queue=0)
+        monkeypatch.setattr(server, "admission", controller)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, None, release))
+        await asyncio.sleep(0)
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, {"paris": PARIS})
+            result = await handle_call_tool("get_coordinates", {"location": "Paris"})
+            assert "Error: Server busy" in result[0].text
+            release.set()
+            await running
+            result = await handle_call_tool("get_coordinates", {"location": "Paris"})
+        assert "Error:" not in result[0].text
+
+    @pytest.mark.asyncio
+    async def test_local_answers_skip_the_queue(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        fake_nominatim: Callable[..., dict[str, int]],
+    ) -> None:
+        """Offline and cached answers are given while every slot is taken."""
+        controller = AdmissionController()
+        monkeypatch.setattr(server, "admission", controller)
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, {"paris": PARIS})
+            await geocode_location("Paris")
+        release = asyncio.Event()
+        running = [
+            asyncio.create_task(hold(controller, session, release))
+            for session in ("a", "b", "c", "d", "e")
+            for _ in range(controller.max_per_session)
+        ]
+        await asyncio.sleep(0)
+        assert controller.active == controller.max_concurrent
+        assert controller.queued == 4
+
+        for location in ("Paris", "SEA"):
+            result = await handle_call_tool(
+                "get_coordinates", {"location": location, "timeout": 0.2}
+            )
+            assert "Error:" not in result[0].text
+        result = await handle_call_tool(
+            "get_coordinates", {"location": "Tokyo", "timeout": 0.2}
+        )
+        assert "Error: Server busy" in result[0].text
+        release.set()
+        await asyncio.gather(*running)
+
+    @pytest.mark.asyncio
+    async def test_full_batch_fits_the_session_queue(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        fake_nominatim: Callable[..., dict[str, int]],
+    ) -> None:
+        """A maximum-size uncached batch is never turned away by its own size."""
+        controller = AdmissionController()
+        monkeypatch.setattr(server, "admission", controller)
+        places: dict[str, dict[str, Any]] = {
+            f"town {i}": {**PARIS, "place_id": i, "display_name": f"Town {i}"}
+            for i in range(MAX_BATCH_SIZE)
+        }
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            counters = fake_nominatim(mock_get, places, delay=0.001)
+            result = await handle_call_tool(
+                "get_coordinates_batch", {"locations": list(places)}
+            )
+        items = json.loads(result[0].text)["results"]
+        assert len(items) == MAX_BATCH_SIZE
+        assert not [item for item in items if "error" in item]
+        assert mock_get.call_count == MAX_BATCH_SIZE
+        assert counters["peak"] <= controller.max_per_session
+        assert controller.active == controller.queued == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+"""
+Tests for Arrow/Parquet output of geocoding results
+"""
+
+import io
+import os
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geocode_mcp
+from geocode_mcp.client import GeocodeClient
+from geocode_mcp.ratelimit import RateLimiter
+
+# pyarrow is an optional extra
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+arrow = pytest.importorskip("geocode_mcp.arrow")
+
+BERLIN = {
+    "lat": "52.5170365",
+    "lon": "13.3888599",
+    "display_name": "Berlin, Deutschland",
+    "place_id": 42,
+    "type": "city",
+    "class": "place",
+    "importance": 0.9,
+    "address": {"country_code": "de"},
+    "boundingbox": ["52.3", "52.7", "13.0", "13.8"],
+}
+
+
+def place(i: int, **extra: Any) -> dict[str, Any]:
+    return {
+        "latitude": 40.0 + i,
+        "longitude": -70.0 - i,
+        "display_name": f"Place {i}",
+        "place_id": 100 + i,
+        "type": "city",
+        "class": "place",
+        "importance": 0.5,
+        "country_code": "us",
+        "bounding_box": {"south": 39.0, "north": 41.0, "west": -71.0, "east": -69.0},
+        **extra,
+    }
+
+
+class TestArrowBatchWriter:
+    """Test cases for building record batches."""
+
+    def test_columns(self) -> None:
+        """Places become rows; failures become rows with null place columns."""
+        writer = arrow.ArrowBatchWriter()
+        writer.add(
+            {
+                "index": 0,
+                "query": "Springfield",
+                "results_count": 2,
+                "coordinates": [place(0, timezone="America/New_York"), place(1)],
+            }
+        )
+        writer.add({"index": 1, "query": "Nowhere", "error": "No coordinates found"})
+        writer.add(
+            {"index": 2, "query": "SEA", "source": "offline", "coordinates": [place(2)]}
+        )
+        table = writer.table()
+        table.validate(full=True)
+
+        assert table.schema == arrow.SCHEMA
+        assert table.num_rows == 4
+        assert table.column("index").to_pylist() == [0, 0, 1, 2]
+        assert table.column("latitude").to_pylist() == [40.0, 41.0, None, 42.0]
+        assert table.column("bounding_box").to_pylist()[0] == [39.0, 41.0, -71.0, -69.0]
+        assert table.column("bounding_box").null_count == 1
+        assert table.column("error").to_pylist()[2] == "No coordinates found"
+        assert table.column("source").to_pylist() == [
+            "nominatim",
+            "nominatim",
+            "nominatim",
+            "offline",
+        ]
+        assert table.column("timezone").to_pylist() == [
+            "America/New_York",
+            None,
+            None,
+            None,
+        ]
+        query = table.column("query").chunk(0)
+        assert query.dictionary.to_pylist() == ["Springfield", "Nowhere", "SEA"]
+        assert query.indices.to_pylist() == [0, 0, 1, 2]
+
+    def test_batches_are_bounded(self) -> None:
+        """Pending rows are flushed every batch_size rows."""
+        writer = arrow.ArrowBatchWriter(batch_size=3)
+        for i in range(7):
+            writer.add({"index": i, "query": "q", "coordinates": [place(i)]})
+        assert [batch.num_rows for batch in writer.batches] == [3, 3]
+        assert writer.table().num_rows == 7
+        assert writer.rows_written == 7
+
+    def test_ipc_stream(self) -> None:
+        """The IPC output is a stream readers can map without copying."""
+        sink = io.BytesIO()
+        with arrow.ArrowBatchWriter(sink, batch_size=2) as writer:
+            for i in range(5):
+                writer.add(
+                    {"index": i, "query": f"q{i % 2}", "coordinates": [place(i)]}
+                )
+        reader = pa.ipc.open_stream(pa.BufferReader(sink.getvalue()))
+        batches = list(reader)
+        assert [batch.num_rows for batch in batches] == [2, 2, 1]
+        table = pa.Table.from_batches(batches)
+        assert table.column("query").to_pylist() == ["q0", "q1", "q0", "q1", "q0"]
+
+    def test_parquet(self, tmp_path: Path) -> None:
+        """Parquet output has one row group per batch."""
+        path = tmp_path / "places.parquet"
+        with arrow.ArrowBatchWriter(path, output="parquet", batch_size=2) as writer:
+            for i in range(3):
+                writer.add({"index": i, "query": "q", "coordinates": [place(i)]})
+        parquet = pq.ParquetFile(path)
+        assert parquet.metadata.num_row_groups == 2
+        assert parquet.read().column("longitude").to_pylist() == [-70.0, -71.0, -72.0]
+
+    def test_validation(self) -> None:
+        with pytest.raises(ValueError, match="output"):
+            arrow.ArrowBatchWriter(output="csv")
+        with pytest.raises(ValueError, match="batch_size"):
+            arrow.ArrowBatchWriter(batch_size=0)
+
+    def test_lazy_export(self) -> None:
+        assert geocode_mcp.ArrowBatchWriter is arrow.ArrowBatchWriter
+
+
+class TestGeocodeToArrow:
+    """Test cases for streaming a bulk job to Arrow."""
+
+    @pytest.mark.asyncio
+    async def test_streams_all_locations(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """Every location is written once with its position in the input."""
+        sink = io.BytesIO()
+        locations = ["Berlin", "SEA", "berlin", "Atlantis", "Berlin"]
+        async with GeocodeClient(limiter=RateLimiter(0)) as client:
+            with patch("aiohttp.ClientSession.get") as mock_get:
+                fake_nominatim(mock_get, {"berlin": BERLIN})
+                rows = await arrow.geocode_to_arrow(
+                    client, locations, sink, batch_size=2
+                )
+        table = pa.ipc.open_stream(pa.BufferReader(sink.getvalue())).read_all()
+        assert rows == table.num_rows == 5
+        by_index = dict(
+            zip(
+                table.column("index").to_pylist(),
+                table.column("display_name").to_pylist(),
+                strict=True,
+            )
+        )
+        assert sorted(by_index) == [0, 1, 2, 3, 4]
+        assert by_index[0] == by_index[2] == by_index[4] == "Berlin, Deutschland"
+        assert by_index[3] is None
+        assert mock_get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_timezone_column(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """timezone=True fills the column for fetched and offline places."""
+        columns = []
+        async with GeocodeClient(limiter=RateLimiter(0)) as client:
+            with patch("aiohttp.ClientSession.get") as mock_get:
+                fake_nominatim(mock_get, {"berlin": BERLIN})
+                for timezone in (False, True):
+                    sink = io.BytesIO()
+                    await arrow.geocode_to_arrow(
+                        client, ["Berlin", "SEA", "Atlantis"], sink, timezone=timezone
+                    )
+                    table = pa.ipc.open_stream(
+                        pa.BufferReader(sink.getvalue())
+                    ).read_all()
+                    columns.append(
+                        dict(
+                            zip(
+                                table.column("index").to_pylist(),
+                                table.column("timezone").to_pylist(),
+                                strict=True,
+                            )
+                        )
+                    )
+        assert columns == [
+            {0: None, 1: None, 2: None},
+            {0: "Europe/Berlin", 1: "America/Los_Angeles", 2: None},
+        ]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+"""
+Tests for batch geocoding, progress streaming and upstream pacing
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+from unittest.mock import patch
+
+import mcp.types as types
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp import server
+from geocode_mcp.ratelimit import RateLimiter
+from geocode_mcp.server import geocode_batch, geocode_location, handle_call_tool
+
+PLACES = {
+    "paris": {
+        "lat": "48.8534951",
+        "lon": "2.3483915",
+        "display_name": "Paris, Île-de-France, France",
+        "place_id": 1,
+        "type": "city",
+        "class": "place",
+        "importance": 0.9,
+        "address": {"country_code": "fr"},
+        "boundingbox": ["48.8", "48.9", "2.2", "2.4"],
+    },
+    "tokyo": {
+        "lat": "35.6768601",
+        "lon": "139.7638947",
+        "display_name": "Tokyo, Japan",
+        "place_id": 2,
+        "type": "city",
+        "class": "place",
+        "importance": 0.9,
+        "address": {"country_code": "jp"},
+        "boundingbox": ["35.5", "35.8", "139.5", "139.9"],
+    },
+}
+
+
+class TestRateLimiter:
+    """Test cases for upstream request pacing."""
+
+    def test_reservations_are_spaced(self) -> None:
+        """Each reservation pushes the next start one interval later."""
+        limiter = RateLimiter(2.0, clock=lambda: 100.0)
+        assert limiter.delay() == 0.0
+        asyncio.run(limiter.acquire())
+        assert limiter.delay() == 0.5
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_wait_their_turn(self) -> None:
+        """Concurrent callers are released one interval apart."""
+        limiter = RateLimiter(20.0)
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(3)))
+        assert time.monotonic() - started >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_cancelled_callers_give_up_their_turn(self) -> None:
+        """Waiters that are cancelled do not delay later callers."""
+        limiter = RateLimiter(10.0)
+        await limiter.acquire()
+        waiters = [asyncio.create_task(limiter.acquire()) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert limiter.delay() == pytest.approx(0.6, abs=0.02)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert limiter.delay() <= 0.1
+        started = time.monotonic()
+        await limiter.acquire()
+        assert time.monotonic() - started < 0.15
+
+    @pytest.mark.asyncio
+    async def test_zero_rate_disables_pacing(self) -> None:
+        """A rate of zero never waits."""
+        limiter = RateLimiter(0)
+        for _ in range(100):
+            await limiter.acquire()
+        assert limiter.delay() == 0.0
+
+
+class TestGeocodeBatch:
+    """Test cases for geocode_batch."""
+
+    @pytest.mark.asyncio
+    async def test_local_answers_are_reported_first(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """Cache and offline hits are reported before any network result."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, PLACES)
+            await geocode_location("Paris")
+            reported: list[dict[str, Any]] = []
+
+            async def on_result(item: dict[str, Any]) -> None:
+                reported.append(item)
+
+            items = await geocode_batch(
+                ["Tokyo", "Paris", "SEA", "Atlantis"], on_result=on_result
+            )
+
+        assert [item["index"] for item in reported[:2]] == [1, 2]
+        assert {item["index"] for item in reported[2:]} == {0, 3}
+        assert [item["index"] for item in items] == [0, 1, 2, 3]
+        assert items[0]["coordinates"][0]["display_name"] == "Tokyo, Japan"
+        assert items[2]["source"] == "offline"
+        assert "No coordinates found" in items[3]["error"]
+        assert mock_get.call_count == 3  # Paris once, then Tokyo and Atlantis
+
+    @pytest.mark.asyncio
+    async def test_result_options_apply_to_every_path(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """timezone is added to cached, offline and fetched answers alike."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, PLACES)
+            await geocode_location("Paris")
+            items = await geocode_batch(["Tokyo", "Paris", "SEA"], timezone=True)
+            with pytest.raises(ValueError, match="geometry"):
+                await geocode_batch(["Paris"], geometry="svg")
+
+        assert [item["coordinates"][0]["timezone"] for item in items] == [
+            "Asia/Tokyo",
+            "Europe/Paris",
+            "America/Los_Angeles",
+        ]
+        assert [item.get("source") for item in items] == [None, None, "offline"]
+
+    @pytest.mark.asyncio
+    async def test_failures_stay_per_item(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """Invalid or failing locations do not fail the rest of the batch."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, PLACES)
+            items = await geocode_batch(["", "broken", "Paris"])
+
+        assert "required" in items[0]["error"]
+        assert "Nominatim API error: 500" in items[1]["error"]
+        assert items[2]["results_count"] == 1
+        assert server.admission.active == 0
+
+
+class TestBatchTool:
+    """Test cases for the get_coordinates_batch tool."""
+
+    @pytest.mark.asyncio
+    async def test_tool_returns_results_in_order(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """Without a progress token the tool still returns every item."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, PLACES)
+            result = await handle_call_tool(
+                "get_coordinates_batch", {"locations": ["Paris", "JFK"]}
+            )
+        response = json.loads(result[0].text)
+        assert response["results_count"] == 2
+        assert response["results"][1]["coordinates"][0]["place_id"] == "airport:JFK"
+
+    @pytest.mark.asyncio
+    async def test_empty_batch(self) -> None:
+        """An empty list of locations is an error."""
+        result = await handle_call_tool("get_coordinates_batch", {"locations": []})
+        assert result[0].text.startswith("Error:")
+
+    @pytest.mark.asyncio
+    async def test_progress_notifications_carry_results(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """Each completed location is streamed as a progress notification."""
+        updates: list[tuple[float, float | None, dict[str, Any]]] = []
+
+        async def on_progress(
+            progress: float, total: float | None, message: str | None
+        ) -> None:
+            updates.append((progress, total, json.loads(message or "{}")))
+
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, PLACES)
+            async with create_connected_server_and_client_session(
+                server.server
+            ) as client:
+                result = await client.call_tool(
+                    "get_coordinates_batch",
+                    {"locations": ["Tokyo", "SEA", "Paris"]},
+                    progress_callback=on_progress,
+                )
+
+        assert [(value, total) for value, total, _ in updates] == [
+            (1, 3),
+            (2, 3),
+            (3, 3),
+        ]
+        assert updates[0][2]["index"] == 1
+        assert updates[0][2]["source"] == "offline"
+        content = result.content[0]
+        assert isinstance(content, types.TextContent)
+        response = json.loads(content.text)
+        assert [item["index"] for item in response["results"]] == [0, 1, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
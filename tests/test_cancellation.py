@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+"""
+Tests for cancellation, per-call deadlines and request coalescing
+"""
+
+import asyncio
+import os
+import sys
+from typing import Any
+from unittest.mock import patch
+
+import mcp.types as types
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.shared.memory import create_connected_server_and_client_session
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp import server
+from geocode_mcp.server import handle_call_tool
+from geocode_mcp.singleflight import SingleFlight
+
+
+class HangingRequest:
+    """Stands in for ``session.get()``; never answers until cancelled."""
+
+    def __init__(self) -> None:
+        self.started = asyncio.Event()
+        self.cancelled = asyncio.Event()
+        self.request_id: Any = None
+
+    async def __aenter__(self) -> None:
+        try:
+            self.request_id = server.server.request_context.request_id
+        except LookupError:
+            pass
+        self.started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+    async def __aexit__(self, *exc_info: object) -> bool:
+        return False
+
+
+class TestSingleFlight:
+    """Test cases for request coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_callers_share_one_call(self) -> None:
+        """Concurrent callers with the same key trigger one call."""
+        flights = SingleFlight()
+        calls: list[str] = []
+        release = asyncio.Event()
+
+        async def fetch() -> str:
+            calls.append("key")
+            await release.wait()
+            return "result"
+
+        tasks = [asyncio.create_task(flights.run("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert flights.waiters("key") == 3
+        release.set()
+        assert await asyncio.gather(*tasks) == ["result"] * 3
+        assert calls == ["key"]
+        assert len(flights) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_detaches(self) -> None:
+        """Cancelling one caller leaves the shared call running for others."""
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch() -> str:
+            await release.wait()
+            return "result"
+
+        first = asyncio.create_task(flights.run("key", fetch))
+        second = asyncio.create_task(flights.run("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert flights.waiters("key") == 1
+        release.set()
+        assert await second == "result"
+
+    @pytest.mark.asyncio
+    async def test_last_waiter_cancels_call(self) -> None:
+        """The shared call is aborted once nobody is waiting for it."""
+        flights = SingleFlight()
+        aborted = asyncio.Event()
+
+        async def fetch() -> None:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                aborted.set()
+                raise
+
+        caller = asyncio.create_task(flights.run("key", fetch))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.wait_for(aborted.wait(), 1)
+        assert len(flights) == 0
+
+
+class TestCallCancellation:
+    """Test cases for deadlines and MCP cancellation in handle_call_tool."""
+
+    @pytest.mark.asyncio
+    async def test_deadline_aborts_upstream_request(self) -> None:
+        """An expired timeout cancels the HTTP call and frees the slot."""
+        hanging = HangingRequest()
+        with patch("aiohttp.ClientSession.get", return_value=hanging):
+            result = await handle_call_tool(
+                "get_coordinates", {"location": "Nowhere", "timeout": 0.05}
+            )
+        assert "timed out after 0.05 seconds" in result[0].text
+        await asyncio.wait_for(hanging.cancelled.wait(), 1)
+        assert server.admission.active == 0
+        assert len(server.client.inflight) == 0
+
+    @pytest.mark.asyncio
+    async def test_mcp_cancel_notification(self) -> None:
+        """notifications/cancelled from the client aborts the upstream call."""
+        hanging = HangingRequest()
+        with patch("aiohttp.ClientSession.get", return_value=hanging):
+            async with create_connected_server_and_client_session(
+                server.server
+            ) as client:
+                call = asyncio.create_task(
+                    client.call_tool("get_coordinates", {"location": "Nowhere"})
+                )
+                await asyncio.wait_for(hanging.started.wait(), 5)
+                await client.send_notification(
+                    types.ClientNotification.model_validate(
+                        {
+                            "method": "notifications/cancelled",
+                            "params": {"requestId": hanging.request_id},
+                        }
+                    )
+                )
+                await asyncio.wait_for(hanging.cancelled.wait(), 5)
+                with pytest.raises(McpError, match="cancelled"):
+                    await call
+        assert server.admission.active == 0
+        assert len(server.client.inflight) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+"""
+Tests for traffic capture and the replay benchmark
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp import server
+from geocode_mcp.capture import (
+    CAPTURE_ENV,
+    CAPTURE_KEY_ENV,
+    CaptureLog,
+    load_records,
+    read_records,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+PARIS = {
+    "lat": "48.8566",
+    "lon": "2.3522",
+    "display_name": "Paris, France",
+    "place_id": 7,
+    "type": "city",
+    "class": "place",
+    "importance": 0.9,
+    "boundingbox": ["48.8", "48.9", "2.2", "2.5"],
+}
+
+
+class TestCaptureLog:
+    """Test cases for the log format."""
+
+    def test_round_trip(self) -> None:
+        """Records read back as written; equal keys hash alike."""
+        buffer = io.BytesIO()
+        log = CaptureLog(buffer)
+        log.record(1000.0, ("paris",), 3, "upstream", 0.25, "alice")
+        log.record(1000.5, ("paris",), 1, "cache", 0.001, "bob")
+        log.record(1001.0, ("tokyo",), 1, "timeout", 30.0, "alice")
+        log.record(1001.5, ("tokyo",), 1, "cache", 0.0)
+        buffer.seek(0)
+        first, second, third, fourth = read_records(buffer)
+        assert first.timestamp == 1000.0
+        assert [first.session, second.session, third.session] == [1, 2, 1]
+        assert fourth.session == 0
+        assert (first.limit, first.outcome) == (3, "upstream")
+        assert first.latency == pytest.approx(0.25)
+        assert second.outcome == "cache"
+        assert first.query == second.query != third.query
+        assert len(first.query) == 16
+
+    def test_hashes_are_keyed(self) -> None:
+        """Without the process's key a hash cannot be recomputed."""
+        assert CaptureLog(io.BytesIO()).query_hash(("paris",)) != CaptureLog(
+            io.BytesIO()
+        ).query_hash(("paris",))
+
+    def test_truncated_and_foreign_files(self) -> None:
+        """A partly written last record is dropped; other files are refused."""
+        buffer = io.BytesIO()
+        CaptureLog(buffer).record(1.0, ("x",), 1, "cache", 0.0)
+        data = buffer.getvalue()
+        assert len(list(read_records(io.BytesIO(data + data[-10:])))) == 1
+        with pytest.raises(ValueError, match="capture log"):
+            list(read_records(io.BytesIO(b"not a log")))
+
+    def test_from_env(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Capture is off unless GEOCODE_MCP_CAPTURE names a file to append to."""
+        monkeypatch.delenv(CAPTURE_ENV, raising=False)
+        monkeypatch.delenv(CAPTURE_KEY_ENV, raising=False)
+        assert CaptureLog.from_env() is None
+        path = tmp_path / "calls.log"
+        monkeypatch.setenv(CAPTURE_ENV, str(path))
+        for _ in range(2):
+            log = CaptureLog.from_env()
+            assert log is not None
+            log.record(1.0, ("x",), 1, "cache", 0.0, "client")
+            log.close()
+        first, second = load_records(path)
+        assert first.query == second.query
+        assert (first.session, second.session) == (1, 2)
+        key_path = tmp_path / "calls.log.key"
+        assert key_path.stat().st_mode & 0o777 == 0o600
+
+        key_path.write_bytes(b"short")
+        with pytest.raises(ValueError, match="capture key"):
+            CaptureLog.from_env()
+
+    def test_key_from_env(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """GEOCODE_MCP_CAPTURE_KEY replaces the key file."""
+        monkeypatch.setenv(CAPTURE_KEY_ENV, "ab" * 32)
+        hashes = []
+        for name in ("one.log", "two.log"):
+            monkeypatch.setenv(CAPTURE_ENV, str(tmp_path / name))
+            log = CaptureLog.from_env()
+            assert log is not None
+            hashes.append(log.query_hash(("paris",)))
+            log.close()
+        assert hashes[0] == hashes[1]
+        assert not list(tmp_path.glob("*.key"))
+
+
+class TestCallCapture:
+    """Test cases for capturing get_coordinates calls in the server."""
+
+    @pytest.mark.asyncio
+    async def test_outcomes(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Each call is logged with how it was answered."""
+        buffer = io.BytesIO()
+        monkeypatch.setattr(server, "capture", CaptureLog(buffer))
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_response = AsyncMock()
+            mock_response.ok = True
+            mock_response.json = AsyncMock(return_value=[PARIS])
+            mock_get.return_value.__aenter__.return_value = mock_response
+
+            for arguments in (
+                {"location": "Paris", "limit": 2},
+                {"location": "  paris  "},
+                {"location": "SEA"},
+                {"location": ""},
+            ):
+                await server.handle_call_tool("get_coordinates", arguments)
+
+        buffer.seek(0)
+        records = list(read_records(buffer))
+        assert [record.outcome for record in records] == [
+            "upstream",
+            "cache",
+            "offline",
+            "error",
+        ]
+        assert records[0].query == records[1].query != records[2].query
+        assert [record.limit for record in records] == [2, 1, 1, 1]
+        assert all(record.latency >= 0 for record in records)
+
+    @pytest.mark.asyncio
+    async def test_sessions_outside_mcp(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """call_tool_in_session attributes calls to the given session."""
+        buffer = io.BytesIO()
+        monkeypatch.setattr(server, "capture", CaptureLog(buffer))
+        for session in ("alice", "bob", "alice", None):
+            await server.call_tool_in_session(
+                "get_coordinates", {"location": "SEA"}, session
+            )
+        await server.handle_call_tool("get_coordinates", {"location": "SEA"})
+        buffer.seek(0)
+        assert [record.session for record in read_records(buffer)] == [1, 2, 1, 0, 0]
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self) -> None:
+        """Without GEOCODE_MCP_CAPTURE nothing is recorded."""
+        assert server.capture is None
+        result = await server.handle_call_tool("get_coordinates", {"location": "SEA"})
+        assert "Error" not in result[0].text
+
+
+class TestReplay:
+    """Test cases for scripts/replay_capture.py."""
+
+    def test_replays_against_stub(self, tmp_path: Path) -> None:
+        """Repeats stay cache hits and only distinct queries reach upstream."""
+        path = tmp_path / "calls.log"
+        with open(path, "ab") as file:
+            log = CaptureLog(file)
+            for i, (key, outcome, session) in enumerate(
+                [
+                    (("paris",), "upstream", "alice"),
+                    (("paris",), "cache", "bob"),
+                    (("sea",), "offline", None),
+                    (("tokyo",), "upstream", "alice"),
+                    (("paris",), "cache", "carol"),
+                    (("tokyo",), "cache", "bob"),
+                ]
+            ):
+                log.record(1000.0 + i / 100, key, 1, outcome, 0.01, session)
+
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(PROJECT_ROOT / "scripts" / "replay_capture.py"),
+                str(path),
+                "--speed",
+                "max",
+                "--concurrency",
+                "1",
+                "--upstream-latency",
+                "0",
+                "--json",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=120,
+        )
+        report = json.loads(result.stdout)
+        assert report["capture"]["calls"] == report["replay"]["calls"] == 6
+        assert report["capture"]["sessions"] == report["replay"]["sessions"] == 4
+        assert report["capture"]["hit_ratio"] == pytest.approx(4 / 6)
+        assert report["replay"]["outcomes"]["offline"] == 1
+        assert report["replay"]["outcomes"]["upstream"] == 2
+        assert report["replay"]["upstream_requests"] == 2
+        assert report["replay"]["hit_ratio"] == pytest.approx(4 / 6)
+        assert set(report["replay"]["latency_ms"]) == {"p50", "p90", "p99", "max"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the in-process GeocodeClient API
+"""
+
+import os
+import subprocess
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geocode_mcp
+from geocode_mcp.client import (
+    BoundingBox,
+    GeocodeClient,
+    GeocodeResult,
+    Place,
+    SyncGeocodeClient,
+)
+from geocode_mcp.ratelimit import RateLimiter
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+BERLIN = {
+    "lat": "52.5170365",
+    "lon": "13.3888599",
+    "display_name": "Berlin, Deutschland",
+    "place_id": 42,
+    "type": "city",
+    "class": "place",
+    "importance": 0.9,
+    "address": {"country_code": "de"},
+    "boundingbox": ["52.3", "52.7", "13.0", "13.8"],
+}
+
+
+class TestGeocodeClient:
+    """Test cases for the async client."""
+
+    @pytest.mark.asyncio
+    async def test_base_url_and_user_agent(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """Requests go to the configured Nominatim instance."""
+        async with GeocodeClient(
+            "http://nominatim.internal:8080/",
+            limiter=RateLimiter(0),
+            user_agent="internal-service/2.0",
+        ) as client:
+            with patch("aiohttp.ClientSession.get") as mock_get:
+                fake_nominatim(mock_get, {"berlin": BERLIN})
+                response = await client.geocode("Berlin")
+
+        url = mock_get.call_args.args[0]
+        assert url.startswith("http://nominatim.internal:8080/search?")
+        assert mock_get.call_args.kwargs["headers"]["User-Agent"] == (
+            "internal-service/2.0"
+        )
+        assert response["coordinates"][0]["display_name"] == "Berlin, Deutschland"
+        assert client.http_session is None
+
+    @pytest.mark.asyncio
+    async def test_clients_do_not_share_state(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """Each client has its own cache and spatial index."""
+        first = GeocodeClient(limiter=RateLimiter(0))
+        second = GeocodeClient(limiter=RateLimiter(0))
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, {"berlin": BERLIN})
+            await first.geocode("Berlin")
+            await first.geocode("Berlin")
+            assert mock_get.call_count == 1
+            await second.geocode("Berlin")
+            assert mock_get.call_count == 2
+        assert len(first.spatial_index) == len(second.spatial_index) == 1
+        await first.close()
+        await second.close()
+
+    @pytest.mark.asyncio
+    async def test_geocode_many_returns_native_objects(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """Batch results are dataclasses in input order."""
+        async with GeocodeClient(limiter=RateLimiter(0)) as client:
+            with patch("aiohttp.ClientSession.get") as mock_get:
+                fake_nominatim(mock_get, {"berlin": BERLIN})
+                results = await client.geocode_many(["Berlin", "LHR", "Atlantis", ""])
+
+        berlin, heathrow, atlantis, empty = results
+        assert isinstance(berlin, GeocodeResult) and berlin.ok
+        assert berlin.places == (
+            Place(
+                latitude=52.5170365,
+                longitude=13.3888599,
+                display_name="Berlin, Deutschland",
+                place_id=42,
+                type="city",
+                place_class="place",
+                importance=0.9,
+                country_code="de",
+                bounding_box=BoundingBox(52.3, 52.7, 13.0, 13.8),
+            ),
+        )
+        assert heathrow.source == "offline"
+        assert heathrow.places[0].place_id == "airport:LHR"
+        assert not atlantis.ok and atlantis.places == ()
+        assert empty.error is not None and "required" in empty.error
+
+    @pytest.mark.asyncio
+    async def test_geocode_many_bounds_concurrency(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """No more than ``concurrency`` lookups are in flight at once."""
+        async with GeocodeClient(limiter=RateLimiter(0)) as client:
+            with patch("aiohttp.ClientSession.get") as mock_get:
+                counters = fake_nominatim(mock_get, {"berlin": BERLIN}, delay=0.01)
+                results = await client.geocode_many(
+                    [f"Place {index}" for index in range(8)], concurrency=2
+                )
+        assert len(results) == 8
+        assert counters["peak"] == 2
+
+
+class TestSyncGeocodeClient:
+    """Test cases for the blocking wrapper."""
+
+    def test_sync_calls(self, fake_nominatim: Callable[..., dict[str, int]]) -> None:
+        """The wrapper runs lookups on its own event loop."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, {"berlin": BERLIN})
+            with SyncGeocodeClient(limiter=RateLimiter(0)) as client:
+                response = client.geocode("Berlin")
+                (result,) = client.geocode_many(["berlin"])
+                session = client.client.http_session
+        assert response["results_count"] == 1
+        assert result.places[0].country_code == "de"
+        assert mock_get.call_count == 1
+        assert session is not None and session.closed
+
+
+class TestPackageExports:
+    """Test cases for the package's lazy public API."""
+
+    def test_exports(self) -> None:
+        """Public names resolve to the client module's objects."""
+        assert geocode_mcp.GeocodeClient is GeocodeClient
+        assert geocode_mcp.SyncGeocodeClient is SyncGeocodeClient
+        assert geocode_mcp.RateLimiter is RateLimiter
+        missing = "NotAThing"
+        with pytest.raises(AttributeError):
+            getattr(geocode_mcp, missing)
+
+    def test_package_import_is_lazy(self) -> None:
+        """Importing the package does not import the client."""
+        code = "import sys, geocode_mcp; print('geocode_mcp.client' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": str(PROJECT_ROOT / "src")},
+        )
+        assert result.stdout.strip() == "False"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
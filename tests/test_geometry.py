@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+"""
+Tests for boundary simplification, encoding and the geometry output mode
+"""
+
+import json
+import math
+import os
+import sys
+from unittest.mock import AsyncMock, patch
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp.geometry import (
+    decode_polyline,
+    dequantize,
+    encode_geometry,
+    encode_polyline,
+    quantize,
+    simplify_geometry,
+    simplify_line,
+    simplify_ring,
+)
+from geocode_mcp.server import handle_call_tool
+
+
+def circle(lon: float, lat: float, radius: float, points: int) -> list[list[float]]:
+    ring = [
+        [
+            lon + radius * math.cos(2 * math.pi * i / points),
+            lat + radius * math.sin(2 * math.pi * i / points),
+        ]
+        for i in range(points)
+    ]
+    return [*ring, ring[0]]
+
+
+RING = circle(2.35, 48.85, 0.1, 2000)
+BOUNDARY = {"type": "Polygon", "coordinates": [RING]}
+
+
+class TestSimplification:
+    """Test cases for Douglas-Peucker simplification."""
+
+    def test_simplify_line_drops_collinear_points(self) -> None:
+        """Points within tolerance of the chord are removed."""
+        line = [[0, 0], [1, 0.0001], [2, -0.0001], [3, 5], [4, 6]]
+        assert simplify_line(line, 0.01) == [[0, 0], [2, -0.0001], [3, 5], [4, 6]]
+        assert simplify_line(line, 0) == line
+
+    def test_simplify_ring_stays_closed_and_bounded(self) -> None:
+        """Simplified rings stay closed and within tolerance of the original."""
+        simplified = simplify_ring(RING, 0.001)
+        assert simplified[0] == simplified[-1]
+        assert 10 < len(simplified) < len(RING) / 10
+        for lon, lat in simplified:
+            assert math.hypot(lon - 2.35, lat - 48.85) == pytest.approx(0.1)
+
+    def test_tiny_rings_collapse(self) -> None:
+        """Holes smaller than the tolerance are dropped, exteriors keep a box."""
+        polygon = {
+            "type": "Polygon",
+            "coordinates": [circle(0, 0, 0.01, 50), circle(0, 0, 0.001, 50)],
+        }
+        simplified = simplify_geometry(polygon, 0.005)
+        assert len(simplified["coordinates"]) == 1
+        tiny = simplify_geometry(
+            {"type": "Polygon", "coordinates": [circle(0, 0, 0.001, 50)]}, 0.01
+        )
+        assert len(tiny["coordinates"][0]) == 5
+
+
+class TestEncoding:
+    """Test cases for polyline and quantized encodings."""
+
+    def test_polyline_reference_vector(self) -> None:
+        """Matches the example from the Google polyline documentation."""
+        points = [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]
+        encoded = encode_polyline(points)
+        assert encoded == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+        assert decode_polyline(encoded) == points
+
+    def test_quantize_round_trip(self) -> None:
+        """Quantized deltas decode back to the rounded positions."""
+        points = [(2.352222, 48.856613), (2.35, 48.86), (-0.1278, 51.5074)]
+        flat = quantize(points)
+        assert flat[:2] == [235222, 4885661]
+        assert dequantize(flat) == [
+            (2.35222, 48.85661),
+            (2.35, 48.86),
+            (-0.1278, 51.5074),
+        ]
+
+    def test_encode_geometry_keeps_nesting(self) -> None:
+        """MultiPolygon rings are encoded individually; points are skipped."""
+        multi = {
+            "type": "MultiPolygon",
+            "coordinates": [[circle(0, 0, 1, 8)], [circle(5, 5, 1, 8)]],
+        }
+        encoded = encode_geometry(multi, "polyline")
+        assert encoded is not None
+        assert encoded["type"] == "MultiPolygon"
+        assert len(encoded["coordinates"]) == 2
+        assert isinstance(encoded["coordinates"][0][0], str)
+        assert (
+            encode_geometry({"type": "Point", "coordinates": [0, 0]}, "polyline")
+            is None
+        )
+        with pytest.raises(ValueError):
+            encode_geometry(multi, "wkb")
+
+
+class TestGeometryTool:
+    """Test cases for the geometry option of get_coordinates."""
+
+    @pytest.mark.asyncio
+    async def test_geometry_requested_and_cached(self) -> None:
+        """Polygons are requested once, simplified and served from cache."""
+        mock_response_data = [
+            {
+                "lat": "48.8566969",
+                "lon": "2.3514616",
+                "display_name": "Paris, France",
+                "place_id": 789,
+                "type": "city",
+                "class": "boundary",
+                "importance": 0.9,
+                "boundingbox": ["48.75", "48.95", "2.25", "2.45"],
+                "geojson": BOUNDARY,
+            }
+        ]
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_response = AsyncMock()
+            mock_response.ok = True
+            mock_response.json = AsyncMock(return_value=mock_response_data)
+            mock_get.return_value.__aenter__.return_value = mock_response
+            arguments = {
+                "location": "Paris",
+                "geometry": "polyline",
+                "tolerance": 0.001,
+            }
+            first = await handle_call_tool("get_coordinates", arguments)
+            second = await handle_call_tool("get_coordinates", arguments)
+            params = parse_qs(urlsplit(mock_get.call_args.args[0]).query)
+
+        assert mock_get.call_count == 1
+        assert params["polygon_geojson"] == ["1"]
+        assert params["polygon_threshold"] == ["0.001"]
+        assert first[0].text == second[0].text
+        assert "\n" not in first[0].text
+        geometry = json.loads(first[0].text)["coordinates"][0]["geometry"]
+        assert geometry["encoding"] == "polyline"
+        ring = decode_polyline(geometry["coordinates"][0])
+        assert len(ring) < 200
+        assert len(first[0].text) < len(json.dumps(BOUNDARY)) / 10
+
+    @pytest.mark.asyncio
+    async def test_invalid_geometry_mode(self) -> None:
+        """Unknown encodings are reported as errors."""
+        result = await handle_call_tool(
+            "get_coordinates", {"location": "Paris", "geometry": "wkt"}
+        )
+        assert "Error:" in result[0].text
+        assert "geometry must be one of" in result[0].text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
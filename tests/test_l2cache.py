@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the shared L2 cache and the two-tier lookup path
+"""
+
+import asyncio
+import os
+import sys
+from collections.abc import AsyncIterator
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp.client import GeocodeClient
+from geocode_mcp.l2cache import (
+    VALUE_VERSION,
+    MemoryL2Cache,
+    RedisL2Cache,
+    cache_from_env,
+    decode_value,
+    encode_value,
+    storage_key,
+)
+from geocode_mcp.ratelimit import RateLimiter
+
+OSLO = {
+    "lat": "59.9133301",
+    "lon": "10.7389701",
+    "display_name": "Oslo, Norge",
+    "place_id": 7,
+    "type": "city",
+    "class": "place",
+    "importance": 0.8,
+    "address": {"country_code": "no"},
+    "boundingbox": ["59.8", "60.1", "10.4", "10.9"],
+}
+
+
+class FakeRedis:
+    """Minimal RESP2 server: AUTH, SELECT, GET, MGET and SET ... EX."""
+
+    def __init__(self) -> None:
+        self.data: dict[bytes, bytes] = {}
+        self.commands: list[list[bytes]] = []
+        self.password: bytes | None = None
+        self.server: asyncio.Server | None = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        assert self.server is not None
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        authenticated = self.password is None
+        try:
+            while True:
+                count = int((await reader.readuntil(b"\r\n"))[1:-2])
+                parts = []
+                for _ in range(count):
+                    length = int((await reader.readuntil(b"\r\n"))[1:-2])
+                    parts.append((await reader.readexactly(length + 2))[:-2])
+                self.commands.append(parts)
+                name = parts[0].upper()
+                if name == b"AUTH":
+                    authenticated = parts[-1] == self.password
+                    writer.write(b"+OK\r\n" if authenticated else b"-WRONGPASS\r\n")
+                elif not authenticated:
+                    writer.write(b"-NOAUTH Authentication required\r\n")
+                elif name == b"SELECT":
+                    writer.write(b"+OK\r\n")
+                elif name == b"SET":
+                    self.data[parts[1]] = parts[2]
+                    writer.write(b"+OK\r\n")
+                elif name == b"MGET":
+                    writer.write(b"*%d\r\n" % (len(parts) - 1))
+                    for key in parts[1:]:
+                        value = self.data.get(key)
+                        if value is None:
+                            writer.write(b"$-1\r\n")
+                        else:
+                            writer.write(b"$%d\r\n%s\r\n" % (len(value), value))
+                else:
+                    writer.write(b"-ERR unknown command\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+
+@pytest.fixture
+async def fake_redis() -> AsyncIterator[tuple[FakeRedis, int]]:
+    redis = FakeRedis()
+    port = await redis.start()
+    yield redis, port
+    await redis.stop()
+
+
+def mock_nominatim(mock_get: Any) -> None:
+    mock_response = AsyncMock()
+    mock_response.ok = True
+    mock_response.json = AsyncMock(return_value=[OSLO])
+    mock_get.return_value.__aenter__.return_value = mock_response
+
+
+class TestEncoding:
+    """Test cases for stored keys and values."""
+
+    def test_value_round_trip(self) -> None:
+        """Values are version-tagged, compressed JSON."""
+        value = {"limit": 5, "coordinates": [{"display_name": "Oslo, Norge"}] * 20}
+        data = encode_value(value)
+        assert data[0] == VALUE_VERSION
+        assert len(data) < len(repr(value)) / 4
+        assert decode_value(data) == value
+
+    def test_unreadable_values_are_misses(self) -> None:
+        """Other versions and corrupt data decode as None."""
+        data = encode_value({"limit": 1})
+        assert decode_value(bytes([VALUE_VERSION + 1]) + data[1:]) is None
+        assert decode_value(data[:-3]) is None
+        assert decode_value(b"") is None
+
+    def test_storage_key(self) -> None:
+        """Keys are fixed-length hashes under the prefix."""
+        key = ("oslo", None, ("no",))
+        assert storage_key(key) == storage_key(("oslo", None, ("no",)))
+        assert storage_key(key) != storage_key(("bergen", None, ("no",)))
+        assert storage_key(key).startswith(b"geocode-mcp:")
+        assert len(storage_key(key)) == len(b"geocode-mcp:") + 32
+
+    def test_cache_from_env(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """GEOCODE_MCP_REDIS_URL selects the backend."""
+        monkeypatch.delenv("GEOCODE_MCP_REDIS_URL", raising=False)
+        assert cache_from_env() is None
+        monkeypatch.setenv("GEOCODE_MCP_REDIS_URL", "memory://")
+        assert isinstance(cache_from_env(), MemoryL2Cache)
+        monkeypatch.setenv("GEOCODE_MCP_REDIS_URL", "rediss://:s%40cret@cache:6380/2")
+        cache = cache_from_env()
+        assert isinstance(cache, RedisL2Cache)
+        assert (cache.host, cache.port, cache.db) == ("cache", 6380, 2)
+        assert cache.password == "s@cret" and cache.tls
+
+
+class TestRedisL2Cache:
+    """Test cases for the RESP client against a fake server."""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self, fake_redis: tuple[FakeRedis, int]) -> None:
+        """Writes are SET ... EX; a batch read is a single MGET."""
+        redis, port = fake_redis
+        redis.password = b"secret"
+        cache = RedisL2Cache.from_url(f"redis://:secret@127.0.0.1:{port}/3")
+        await cache.set_many([(("a",), {"n": 1}), (("b",), {"n": 2})], ttl=90)
+        values = await cache.get_many([("a",), ("missing",), ("b",)])
+        await cache.close()
+
+        assert values == [{"n": 1}, None, {"n": 2}]
+        names = [command[0] for command in redis.commands]
+        assert names == [b"AUTH", b"SELECT", b"SET", b"SET", b"MGET"]
+        assert redis.commands[2][3:] == [b"EX", b"90"]
+        assert len(redis.commands[4]) == 4
+        assert cache.failures == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_fail_open(self, fake_redis: tuple[FakeRedis, int]) -> None:
+        """Error replies and unreachable servers become misses."""
+        redis, port = fake_redis
+        redis.password = b"secret"
+        cache = RedisL2Cache("127.0.0.1", port)
+        assert await cache.get_many([("a",)]) == [None]
+        assert cache.failures == 1
+        await cache.close()
+
+        unreachable = RedisL2Cache("127.0.0.1", 1, timeout=1)
+        await unreachable.set_many([(("a",), 1)], ttl=60)
+        assert await unreachable.get_many([("a",)]) == [None]
+        assert unreachable.failures == 2
+
+
+class TestTwoTierLookup:
+    """Test cases for the L2 cache behind GeocodeClient's in-memory cache."""
+
+    @pytest.mark.asyncio
+    async def test_processes_share_answers(self) -> None:
+        """A second client is answered from L2; hot keys then stay in L1."""
+        shared = MemoryL2Cache()
+        first = GeocodeClient(limiter=RateLimiter(0), l2=shared)
+        second = GeocodeClient(limiter=RateLimiter(0), l2=shared)
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_nominatim(mock_get)
+            await first.geocode("Oslo")
+            await first.close()
+            response = await second.geocode("oslo")
+            requests = shared.requests
+            await second.geocode("Oslo")
+        await second.close()
+
+        assert mock_get.call_count == 1
+        assert response["coordinates"][0]["display_name"] == "Oslo, Norge"
+        assert len(second.spatial_index) == 1
+        assert shared.requests == requests
+
+    @pytest.mark.asyncio
+    async def test_batch_reads_l2_in_one_round_trip(self) -> None:
+        """Batch misses in L1 are fetched from L2 together."""
+        shared = MemoryL2Cache()
+        writer = GeocodeClient(limiter=RateLimiter(0), l2=shared)
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_nominatim(mock_get)
+            for name in ("Oslo", "Bergen", "Tromsø"):
+                await writer.geocode(name)
+            await writer.close()
+
+            reader = GeocodeClient(limiter=RateLimiter(0), l2=shared)
+            before = shared.requests
+            results = await reader.geocode_many(["Oslo", "Bergen", "Tromsø", "SEA"])
+            await reader.close()
+
+        assert mock_get.call_count == 3
+        assert shared.requests == before + 1
+        assert all(result.ok for result in results)
+
+    @pytest.mark.asyncio
+    async def test_unreachable_l2_falls_back_to_nominatim(self) -> None:
+        """Lookups still succeed when the shared cache is down."""
+        l2 = RedisL2Cache("127.0.0.1", 1, timeout=1)
+        async with GeocodeClient(limiter=RateLimiter(0), l2=l2) as client:
+            with patch("aiohttp.ClientSession.get") as mock_get:
+                mock_nominatim(mock_get)
+                response = await client.geocode("Oslo")
+        assert response["results_count"] == 1
+        assert l2.failures == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(
+        not os.environ.get("GEOCODE_MCP_TEST_REDIS_URL"),
+        reason="set GEOCODE_MCP_TEST_REDIS_URL to test against a real Redis",
+    )
+    async def test_real_redis(self) -> None:
+        """Round trip through a real Redis server."""
+        cache = RedisL2Cache.from_url(os.environ["GEOCODE_MCP_TEST_REDIS_URL"])
+        key = ("geocode-mcp test", os.getpid())
+        await cache.set_many([(key, {"limit": 1})], ttl=10)
+        assert await cache.get_many([key]) == [{"limit": 1}]
+        await cache.close()
+        assert cache.failures == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
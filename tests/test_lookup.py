@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the offline airport and postal code lookup tables
+"""
+
+import json
+import os
+import sys
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp import lookup
+from geocode_mcp.lookup import (
+    LookupTable,
+    build_from_csv,
+    build_table,
+    lookup_place,
+    postcode_keys,
+    reset_tables,
+)
+from geocode_mcp.server import geocode_location, handle_call_tool
+
+
+@pytest.fixture(autouse=True)
+def fresh_tables() -> Iterator[None]:
+    reset_tables()
+    yield
+    reset_tables()
+
+
+class TestLookupTable:
+    """Test cases for the memory-mapped table format."""
+
+    def test_round_trip_with_collisions(self, tmp_path: Path) -> None:
+        """Every key of every record resolves, including after probing."""
+        rows = [
+            ([f"K{i:03d}", f"A{i:03d}"], i / 10, -i / 10, "us", f"Place {i}")
+            for i in range(500)
+        ]
+        path = tmp_path / "table.bin"
+        assert build_table(rows, path, key_size=4) == 500
+        table = LookupTable(path)
+        for i in (0, 123, 499):
+            entry = table.get(f"A{i:03d}")
+            assert entry is not None
+            assert entry.code == f"K{i:03d}"
+            assert entry.latitude == i / 10
+            assert entry.name == f"Place {i}"
+        assert table.get("ZZZZ") is None
+        assert table.get("TOO-LONG") is None
+        table.close()
+
+    def test_rejects_oversized_keys(self, tmp_path: Path) -> None:
+        """Keys must fit the fixed key width."""
+        with pytest.raises(ValueError, match="longer"):
+            build_table([(["ABCDE"], 0.0, 0.0, "us", "x")], tmp_path / "t.bin", 4)
+
+    def test_bundled_tables_match_sources(self, tmp_path: Path) -> None:
+        """The shipped .bin files are rebuilt from the CSV sources."""
+        for name in lookup.TABLES:
+            rebuilt = tmp_path / f"{name}.bin"
+            build_from_csv(name, lookup.DATA_DIR / f"{name}.csv", rebuilt)
+            assert (
+                rebuilt.read_bytes() == (lookup.DATA_DIR / f"{name}.bin").read_bytes()
+            )
+
+    def test_override_directory(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Tables in GEOCODE_MCP_LOOKUP_DIR replace the bundled ones."""
+        build_table(
+            [(["XXX"], 1.0, 2.0, "zz", "Test Airport")], tmp_path / "airports.bin", 4
+        )
+        monkeypatch.setenv(lookup.LOOKUP_DIR_ENV, str(tmp_path))
+        assert lookup_place("XXX") is not None
+        assert lookup_place("SEA") is None
+        assert lookup_place("98101") is not None
+
+
+class TestLookupPlace:
+    """Test cases for code detection."""
+
+    def test_airport_codes(self) -> None:
+        """IATA and ICAO codes resolve to the same place."""
+        iata = lookup_place("SEA")
+        icao = lookup_place("KSEA")
+        assert iata is not None and icao is not None
+        assert iata["place_id"] == icao["place_id"] == "airport:SEA"
+        assert iata["type"] == "aerodrome"
+        assert lookup_place("sea") is None
+        assert lookup_place("SEA", countrycodes=("fr",)) is None
+
+    def test_postal_codes(self) -> None:
+        """Postal codes are normalised per country format."""
+        assert postcode_keys("sw1a1aa") == ["gb:SW1A 1AA"]
+        assert postcode_keys("98101-1234") == ["us:98101"]
+        assert postcode_keys("1234", ("dk",)) == ["dk:1234"]
+        result = lookup_place(postalcode="k1a 0a6")
+        assert result is not None
+        assert result["country_code"] == "ca"
+
+
+class TestOfflineGeocoding:
+    """Test cases for the offline fast path in geocode_location."""
+
+    @pytest.mark.asyncio
+    async def test_airport_code_skips_network(self) -> None:
+        """Known codes are answered without calling Nominatim."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            result = await geocode_location("JFK", limit=5)
+        mock_get.assert_not_called()
+        assert result["source"] == "offline"
+        assert result["results_count"] == 1
+        assert result["coordinates"][0]["latitude"] == pytest.approx(40.6413)
+
+    @pytest.mark.asyncio
+    async def test_structured_postal_code(self) -> None:
+        """The structured postalcode field uses the postal table."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            result = await handle_call_tool(
+                "get_coordinates", {"postalcode": "98101", "countrycodes": "us"}
+            )
+        mock_get.assert_not_called()
+        response_data = json.loads(result[0].text)
+        assert response_data["coordinates"][0]["place_id"] == "postcode:us:98101"
+
+    @pytest.mark.asyncio
+    async def test_structured_country_must_match(
+        self, fake_nominatim: Callable[..., dict[str, int]]
+    ) -> None:
+        """A postal code from another country is left to Nominatim."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            fake_nominatim(mock_get, {})
+            for country in ("United States", "US"):
+                result = await geocode_location(postalcode="10001", country=country)
+                assert result["source"] == "offline"
+            mock_get.assert_not_called()
+            result = await handle_call_tool(
+                "get_coordinates", {"postalcode": "10001", "country": "Italy"}
+            )
+        mock_get.assert_called_once()
+        assert "United States" not in result[0].text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -127,7 +127,7 @@ class TestGeocodingServer:
     async def test_list_tools(self) -> None:
         """Test that the server lists available tools correctly."""
         tools = await handle_list_tools()
-        assert len(tools) == 1
+        assert len(tools) == 5
         assert tools[0].name == "get_coordinates"
         assert "latitude and longitude" in tools[0].description.lower()
         assert "location" in tools[0].inputSchema["properties"]
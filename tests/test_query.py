@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+"""
+Tests for canonical search queries and cache-aware geocoding
+"""
+
+import json
+import os
+import sys
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp.cache import TTLCache
+from geocode_mcp.query import SearchQuery
+from geocode_mcp.server import geocode_location, handle_call_tool
+
+SPRINGFIELDS = [
+    {
+        "lat": "39.7817213",
+        "lon": "-89.6501481",
+        "display_name": "Springfield, Illinois, United States",
+        "place_id": 123,
+        "type": "city",
+        "class": "place",
+        "importance": 0.8,
+        "address": {"country_code": "us"},
+        "boundingbox": ["39.7", "39.8", "-89.7", "-89.6"],
+    },
+    {
+        "lat": "-43.3",
+        "lon": "171.9",
+        "display_name": "Springfield, Canterbury, New Zealand",
+        "place_id": 456,
+        "type": "village",
+        "class": "place",
+        "importance": 0.4,
+        "address": {"country_code": "nz"},
+        "boundingbox": ["-43.4", "-43.2", "171.8", "172.0"],
+    },
+    {
+        "lat": "42.1014831",
+        "lon": "-72.589811",
+        "display_name": "Springfield, Massachusetts, United States",
+        "place_id": 789,
+        "type": "city",
+        "class": "place",
+        "importance": 0.7,
+        "address": {"country_code": "us"},
+        "boundingbox": ["42.0", "42.1", "-72.6", "-72.5"],
+    },
+]
+
+
+def mock_nominatim(mock_get: MagicMock, data: list[dict[str, Any]]) -> None:
+    mock_response = AsyncMock()
+    mock_response.ok = True
+    mock_response.json = AsyncMock(return_value=data)
+    mock_get.return_value.__aenter__.return_value = mock_response
+
+
+def requested_params(mock_get: MagicMock) -> dict[str, list[str]]:
+    return parse_qs(urlsplit(mock_get.call_args.args[0]).query)
+
+
+class TestSearchQuery:
+    """Test cases for query normalisation."""
+
+    def test_equivalent_queries_share_cache_key(self) -> None:
+        """Whitespace, case, code order and viewbox corners are normalised."""
+        first = SearchQuery.create(
+            "  new   york ",
+            countrycodes="US,ca",
+            viewbox=[-74.5, 40.9, -73.5, 40.4],
+        )
+        second = SearchQuery.create(
+            "New York",
+            countrycodes=["ca", "us", "us"],
+            viewbox={"west": -74.5, "south": 40.4, "east": -73.5, "north": 40.9},
+        )
+        assert first.cache_key() == second.cache_key()
+        assert first.viewbox == (-74.5, 40.4, -73.5, 40.9)
+
+    def test_structured_and_free_text_are_exclusive(self) -> None:
+        """Mixing location with structured fields is rejected."""
+        with pytest.raises(ValueError, match="not both"):
+            SearchQuery.create("Paris", city="Paris")
+        with pytest.raises(ValueError, match="required"):
+            SearchQuery.create("", city=" ")
+
+    def test_invalid_parameters(self) -> None:
+        """Bad country codes and viewboxes raise ValueError."""
+        with pytest.raises(ValueError, match="country code"):
+            SearchQuery.create("Paris", countrycodes="fra")
+        with pytest.raises(ValueError, match="four"):
+            SearchQuery.create("Paris", viewbox=[1, 2, 3])
+        with pytest.raises(ValueError, match="antimeridian"):
+            SearchQuery.create(
+                "Suva",
+                viewbox={"west": 177.0, "south": -19.0, "east": -179.0, "north": -16.0},
+            )
+        with pytest.raises(ValueError, match="south"):
+            SearchQuery.create(
+                "Paris", viewbox={"west": 2, "south": 49, "east": 3, "north": 48}
+            )
+        with pytest.raises(ValueError, match="Unknown"):
+            SearchQuery.create(town="Paris")
+
+    def test_params(self) -> None:
+        """Structured fields replace q and bounded needs a viewbox."""
+        query = SearchQuery.create(
+            city="Seattle", state="WA", countrycodes="us", bounded=True
+        )
+        params = query.params(3)
+        assert "q" not in params
+        assert params["city"] == "Seattle"
+        assert params["countrycodes"] == "us"
+        assert "bounded" not in params
+        assert query.describe() == "Seattle, WA"
+
+
+class TestTTLCache:
+    """Test cases for the LRU/TTL result cache."""
+
+    def test_expiry_and_eviction(self) -> None:
+        """Entries expire after ttl and the least recently used is evicted."""
+        now = [0.0]
+        cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+        assert "b" not in cache
+        now[0] = 11
+        assert cache.get("a") is None
+        assert len(cache) == 1
+
+
+class TestCachedGeocoding:
+    """Test cases for cache reuse in geocode_location."""
+
+    @pytest.mark.asyncio
+    async def test_filters_are_sent_upstream(self) -> None:
+        """countrycodes and viewbox become Nominatim parameters."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_nominatim(mock_get, SPRINGFIELDS[:1])
+            await geocode_location(
+                "Springfield",
+                countrycodes="us",
+                viewbox={"west": -90, "south": 39, "east": -89, "north": 40},
+                bounded=True,
+            )
+            params = requested_params(mock_get)
+        assert params["q"] == ["Springfield"]
+        assert params["countrycodes"] == ["us"]
+        assert params["viewbox"] == ["-90.0,39.0,-89.0,40.0"]
+        assert params["bounded"] == ["1"]
+
+    @pytest.mark.asyncio
+    async def test_equivalent_requests_hit_cache(self) -> None:
+        """A smaller limit and different spelling reuse the cached answer."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_nominatim(mock_get, SPRINGFIELDS)
+            await geocode_location("Springfield", limit=3)
+            result = await geocode_location("springfield", limit=2)
+        assert mock_get.call_count == 1
+        assert result["query"] == "springfield"
+        assert result["results_count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_country_filter_served_from_superset(self) -> None:
+        """A country-restricted request filters the cached unfiltered answer."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_nominatim(mock_get, SPRINGFIELDS)
+            await geocode_location("Springfield", limit=3)
+            result = await geocode_location("Springfield", limit=2, countrycodes="us")
+        assert mock_get.call_count == 1
+        assert [r["place_id"] for r in result["coordinates"]] == [123, 789]
+
+    @pytest.mark.asyncio
+    async def test_truncated_superset_goes_upstream(self) -> None:
+        """A superset that may have cut off matches is not trusted."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_nominatim(mock_get, SPRINGFIELDS[:2])
+            await geocode_location("Springfield", limit=2)
+            mock_nominatim(mock_get, [SPRINGFIELDS[0], SPRINGFIELDS[2]])
+            result = await geocode_location("Springfield", limit=2, countrycodes="us")
+        assert mock_get.call_count == 2
+        assert result["results_count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_structured_tool_call(self) -> None:
+        """get_coordinates accepts structured fields without a location."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_nominatim(mock_get, SPRINGFIELDS[2:])
+            result = await handle_call_tool(
+                "get_coordinates",
+                {"city": "Springfield", "state": "MA", "countrycodes": "us"},
+            )
+            params = requested_params(mock_get)
+        response_data = json.loads(result[0].text)
+        assert response_data["query"] == "Springfield, MA"
+        assert response_data["coordinates"][0]["country_code"] == "us"
+        assert params["state"] == ["MA"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
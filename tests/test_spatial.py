@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the spatial index and the local spatial query tools
+"""
+
+import json
+import os
+import sys
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp import server
+from geocode_mcp.server import geocode_location, handle_call_tool
+from geocode_mcp.spatial import SpatialIndex, haversine_km
+
+
+def make_place(
+    place_id: int,
+    lat: float,
+    lon: float,
+    place_type: str = "city",
+    place_class: str = "place",
+    importance: float = 0.5,
+) -> dict[str, Any]:
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "display_name": f"Place {place_id}",
+        "place_id": place_id,
+        "type": place_type,
+        "class": place_class,
+        "importance": importance,
+    }
+
+
+CITIES = [
+    make_place(1, 47.6062, -122.3321, importance=0.8),  # Seattle
+    make_place(2, 45.5152, -122.6784, importance=0.7),  # Portland
+    make_place(3, 49.2827, -123.1207, importance=0.75),  # Vancouver
+    make_place(4, 37.7749, -122.4194, importance=0.9),  # San Francisco
+    make_place(5, 40.7128, -74.0060, importance=0.95),  # New York
+    make_place(6, 47.6205, -122.3493, "attraction", "tourism", 0.4),  # Space Needle
+]
+
+
+class TestSpatialIndex:
+    """Test cases for the grid spatial index."""
+
+    def test_haversine_known_distance(self) -> None:
+        """Seattle to Portland is roughly 233 km."""
+        assert haversine_km(47.6062, -122.3321, 45.5152, -122.6784) == pytest.approx(
+            233.4, abs=1.0
+        )
+
+    def test_bulk_load_and_replace(self) -> None:
+        """Re-loading a place_id replaces the entry instead of duplicating it."""
+        index = SpatialIndex()
+        assert index.bulk_load(CITIES) == len(CITIES)
+        index.insert(make_place(1, 10.0, 10.0))
+        assert len(index) == len(CITIES)
+        assert index.nearest(10.0, 10.0, 1)[0][1]["place_id"] == 1
+        nearby = index.within_radius(47.6062, -122.3321, 5)
+        assert [place["place_id"] for _, place in nearby] == [6]
+
+    def test_bulk_load_skips_incomplete_places(self) -> None:
+        """Places without coordinates or ids are not indexed."""
+        index = SpatialIndex()
+        loaded = index.bulk_load([{"place_id": 1}, {"latitude": 1, "longitude": 2}])
+        assert loaded == 0
+        assert len(index) == 0
+
+    def test_nearest_matches_brute_force(self) -> None:
+        """The grid search returns the same neighbours as a linear scan."""
+        index = SpatialIndex(cell_size=0.5)
+        index.bulk_load(CITIES)
+        expected = sorted(
+            CITIES,
+            key=lambda p: haversine_km(46.0, -122.0, p["latitude"], p["longitude"]),
+        )[:3]
+        found = [place for _, place in index.nearest(46.0, -122.0, 3)]
+        assert [p["place_id"] for p in found] == [p["place_id"] for p in expected]
+
+    def test_nearest_filters_and_max_distance(self) -> None:
+        """Class/type filters and the distance cap are applied."""
+        index = SpatialIndex()
+        index.bulk_load(CITIES)
+        tourism = index.nearest(47.0, -122.0, 5, place_class="tourism")
+        assert [place["place_id"] for _, place in tourism] == [6]
+        capped = index.nearest(47.6062, -122.3321, 5, max_distance_km=300)
+        assert {place["place_id"] for _, place in capped} == {1, 2, 3, 6}
+
+    def test_within_bbox_orders_by_importance(self) -> None:
+        """Bounding box queries honour limits and importance ordering."""
+        index = SpatialIndex()
+        index.bulk_load(CITIES)
+        found = index.within_bbox(45.0, -124.0, 50.0, -122.0, limit=2)
+        assert [place["place_id"] for place in found] == [1, 3]
+
+    def test_antimeridian_queries(self) -> None:
+        """Boxes and radii that cross the antimeridian still match."""
+        index = SpatialIndex()
+        index.bulk_load([make_place(10, -17.7, 179.9), make_place(11, -17.7, -179.9)])
+        assert len(index.within_bbox(-18.0, 179.0, -17.0, -179.0)) == 2
+        assert len(index.within_radius(-17.7, 179.95, 50)) == 2
+
+    def test_remove_and_clear(self) -> None:
+        """Places can be removed individually or all at once."""
+        index = SpatialIndex()
+        index.bulk_load(CITIES)
+        assert index.remove(5)
+        assert not index.remove(5)
+        assert 5 not in index
+        index.clear()
+        assert index.nearest(0, 0, 3) == []
+
+
+class TestSpatialTools:
+    """Test cases for the nearest_places and places_within tools."""
+
+    @pytest.mark.asyncio
+    async def test_geocoded_results_are_indexed(self) -> None:
+        """Places returned by geocode_location become queryable."""
+        mock_response_data = [
+            {
+                "lat": "48.8566969",
+                "lon": "2.3514616",
+                "display_name": "Paris, France",
+                "place_id": 789,
+                "type": "city",
+                "class": "place",
+                "importance": 0.9,
+                "boundingbox": ["48.8", "48.9", "2.3", "2.4"],
+            }
+        ]
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            mock_response = AsyncMock()
+            mock_response.ok = True
+            mock_response.json = AsyncMock(return_value=mock_response_data)
+            mock_get.return_value.__aenter__.return_value = mock_response
+            await geocode_location("Paris")
+
+        result = await handle_call_tool(
+            "nearest_places", {"latitude": 48.85, "longitude": 2.35, "k": 1}
+        )
+        response_data = json.loads(result[0].text)
+        assert response_data["results_count"] == 1
+        assert response_data["places"][0]["place_id"] == 789
+        assert response_data["places"][0]["distance_km"] < 1
+
+    @pytest.mark.asyncio
+    async def test_places_within_radius_and_bbox(self) -> None:
+        """Both search shapes are supported."""
+        server.client.spatial_index.bulk_load(CITIES)
+        result = await handle_call_tool(
+            "places_within",
+            {"latitude": 47.6062, "longitude": -122.3321, "radius_km": 10},
+        )
+        response_data = json.loads(result[0].text)
+        assert [p["place_id"] for p in response_data["places"]] == [1, 6]
+
+        result = await handle_call_tool(
+            "places_within",
+            {
+                "bounding_box": {
+                    "south": 30,
+                    "north": 50,
+                    "west": -125,
+                    "east": -120,
+                },
+                "type": "city",
+            },
+        )
+        response_data = json.loads(result[0].text)
+        assert response_data["results_count"] == 4
+
+    @pytest.mark.asyncio
+    async def test_places_within_requires_area(self) -> None:
+        """An error is returned when no search area is given."""
+        result = await handle_call_tool("places_within", {})
+        assert "Error:" in result[0].text
+        assert "required" in result[0].text
+
+    @pytest.mark.asyncio
+    async def test_nearest_places_validates_coordinates(self) -> None:
+        """Out-of-range coordinates are rejected."""
+        result = await handle_call_tool(
+            "nearest_places", {"latitude": 95, "longitude": 0}
+        )
+        assert "Error:" in result[0].text
+        assert "latitude" in result[0].text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the server's startup path: lazy imports and event loop selection
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp import server
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestLazyImports:
+    """Test cases for deferred imports."""
+
+    def test_import_does_not_load_aiohttp(self) -> None:
+        """aiohttp is only imported once a request needs the network."""
+        code = "import sys, geocode_mcp.server; print('aiohttp' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": str(PROJECT_ROOT / "src")},
+        )
+        assert result.stdout.strip() == "False"
+
+
+class TestEventLoop:
+    """Test cases for run_server's event loop selection."""
+
+    def test_asyncio_loop(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """The standard loop is used when asked for."""
+        monkeypatch.setenv(server.EVENT_LOOP_ENV, "asyncio")
+        assert server._loop_factory() is None
+
+    def test_unknown_loop(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Unknown loop names are rejected."""
+        monkeypatch.setenv(server.EVENT_LOOP_ENV, "trio")
+        with pytest.raises(ValueError, match="must be one of"):
+            server._loop_factory()
+
+    def test_uvloop_when_available(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """auto uses uvloop if installed; an explicit uvloop requires it."""
+        monkeypatch.setenv(server.EVENT_LOOP_ENV, "auto")
+        try:
+            import uvloop  # ty: ignore[unresolved-import]
+        except ImportError:
+            assert server._loop_factory() is None
+            monkeypatch.setenv(server.EVENT_LOOP_ENV, "uvloop")
+            with pytest.raises(ImportError):
+                server._loop_factory()
+        else:
+            assert server._loop_factory() is uvloop.new_event_loop
+
+
+class TestStartupBenchmark:
+    """Test the startup benchmark against a real server process."""
+
+    def test_benchmark_runs(self) -> None:
+        """run_server answers over stdio and the benchmark reports each phase."""
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(PROJECT_ROOT / "scripts" / "bench_startup.py"),
+                "--runs",
+                "1",
+                "--json",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=120,
+        )
+        (timings,) = json.loads(result.stdout)
+        assert 0 < timings["initialize"] <= timings["list_tools"]
+        assert timings["list_tools"] <= timings["get_coordinates"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the offline timezone index
+"""
+
+import json
+import os
+import random
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+# Add the parent directory to the path so we can import the server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocode_mcp import timezones
+from geocode_mcp.client import GeocodeResult
+from geocode_mcp.server import geocode_location, handle_call_tool
+from geocode_mcp.timezones import (
+    TimezoneIndex,
+    build_from_geojson,
+    build_index,
+    reset_index,
+    timezone_at,
+)
+
+
+def _box(west: float, south: float, east: float, north: float) -> list[list[float]]:
+    return [[west, south], [east, south], [east, north], [west, north], [west, south]]
+
+
+# A zone with a hole holding a second zone, a multi-part zone with edges lying
+# on grid lines, and a zone smaller than one cell
+ZONES: list[tuple[str, dict[str, Any]]] = [
+    (
+        "America/New_York",
+        {
+            "type": "Polygon",
+            "coordinates": [
+                [
+                    [-82.3, 24.7],
+                    [-66.9, 44.8],
+                    [-71.1, 47.5],
+                    [-84.6, 46.3],
+                    [-82.3, 24.7],
+                ],
+                _box(-76.2, 38.1, -75.1, 39.4)[::-1],
+            ],
+        },
+    ),
+    (
+        "America/Hole",
+        {"type": "Polygon", "coordinates": [_box(-76.2, 38.1, -75.1, 39.4)]},
+    ),
+    (
+        "Europe/Paris",
+        {
+            "type": "MultiPolygon",
+            "coordinates": [
+                [_box(-5.0, 42.0, 8.0, 51.0)],
+                [_box(8.5, 41.5, 9.5, 43.0)],
+            ],
+        },
+    ),
+    (
+        "Pacific/Tiny",
+        {"type": "Polygon", "coordinates": [_box(170.1, -10.4, 170.3, -10.1)]},
+    ),
+]
+
+
+def _brute_force(latitude: float, longitude: float) -> str | None:
+    """Even-odd ray cast against every edge of every zone."""
+    for name, geometry in ZONES:
+        inside = False
+        for x1, y1, x2, y2 in timezones._geometry_edges(geometry):
+            if (y1 > latitude) != (y2 > latitude):
+                if x1 + (latitude - y1) * (x2 - x1) / (y2 - y1) > longitude:
+                    inside = not inside
+        if inside:
+            return name
+    return None
+
+
+@pytest.fixture(autouse=True)
+def fresh_index() -> Iterator[None]:
+    reset_index()
+    yield
+    reset_index()
+
+
+@pytest.fixture
+def index_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Build the test zones and install them via GEOCODE_MCP_TIMEZONE_DATA."""
+    path = tmp_path / "timezones.bin"
+    build_index(ZONES, path)
+    monkeypatch.setenv(timezones.TIMEZONE_DATA_ENV, str(path))
+    return path
+
+
+class TestTimezoneIndex:
+    """Test cases for building and querying the grid index."""
+
+    @pytest.mark.parametrize("cell_size", [0.25, 0.5, 2.0])
+    def test_matches_brute_force(self, tmp_path: Path, cell_size: float) -> None:
+        """Grid answers agree with a full point-in-polygon test."""
+        path = tmp_path / "timezones.bin"
+        assert build_index(ZONES, path, cell_size) == len(ZONES)
+        index = TimezoneIndex(path)
+        rng = random.Random(7)
+        points = [
+            (rng.uniform(20.0, 52.0), rng.uniform(-90.0, 12.0)) for _ in range(3000)
+        ]
+        points += [
+            (rng.uniform(-11.0, -9.5), rng.uniform(169.5, 171.0)) for _ in range(500)
+        ]
+        for latitude, longitude in points:
+            assert index.lookup(latitude, longitude) == _brute_force(
+                latitude, longitude
+            )
+        index.close()
+
+    def test_lookups(self, index_path: Path) -> None:
+        """Interior, boundary, hole and empty cells resolve as expected."""
+        index = TimezoneIndex(index_path)
+        assert index.lookup(40.7, -74.0) == "America/New_York"
+        assert index.lookup(38.5, -75.5) == "America/Hole"
+        assert index.lookup(48.86, 2.35) == "Europe/Paris"
+        assert index.lookup(42.0, 9.0) == "Europe/Paris"
+        assert index.lookup(-10.2, 170.2) == "Pacific/Tiny"
+        assert index.lookup(-10.2, 170.4) is None
+        assert index.lookup(0.0, 0.0) is None
+        assert index.zones == [name for name, _ in ZONES]
+        index.close()
+
+    def test_cell_cache_is_bounded(self, index_path: Path) -> None:
+        """Decoded boundary cells are evicted past the cache size."""
+        index = TimezoneIndex(index_path, cache_size=2)
+        for longitude in (-82.0, -70.0, -60.0, 5.0, 9.0):
+            index.lookup(45.0, longitude)
+        assert len(index._cells) <= 2
+        index.close()
+
+    def test_rejects_other_files(self, tmp_path: Path) -> None:
+        """Files without the index header are refused."""
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"\0" * 64)
+        with pytest.raises(ValueError, match="not a timezone index"):
+            TimezoneIndex(path).lookup(0.0, 0.0)
+
+    def test_build_from_geojson(self, tmp_path: Path) -> None:
+        """The command line builds from timezone-boundary-builder GeoJSON."""
+        source = tmp_path / "combined.json"
+        source.write_text(
+            json.dumps(
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "properties": {"tzid": name},
+                            "geometry": geometry,
+                        }
+                        for name, geometry in ZONES
+                    ],
+                }
+            )
+        )
+        destination = tmp_path / "timezones.bin"
+        timezones.main(
+            [str(source), str(destination), "--cell-size", "1", "--tolerance", "0"]
+        )
+        index = TimezoneIndex(destination)
+        assert index.lookup(48.86, 2.35) == "Europe/Paris"
+        index.close()
+        assert build_from_geojson(source, tmp_path / "again.bin") == len(ZONES)
+
+    def test_slivers_snap_to_nearest_zone(self, tmp_path: Path) -> None:
+        """Gaps narrower than the build tolerance go to the closest zone."""
+        zones = [
+            ("Europe/West", {"type": "Polygon", "coordinates": [_box(0, 0, 5, 5)]}),
+            ("Europe/East", {"type": "Polygon", "coordinates": [_box(5.02, 0, 9, 5)]}),
+        ]
+        path = tmp_path / "timezones.bin"
+        build_index(zones, path, tolerance=0.01)
+        index = TimezoneIndex(path)
+        assert index.lookup(2.5, 5.005) == "Europe/West"
+        assert index.lookup(2.5, 5.015) == "Europe/East"
+        assert index.lookup(2.5, 9.5) is None
+        index.close()
+
+        build_index(zones, path)
+        index = TimezoneIndex(path)
+        assert index.lookup(2.5, 5.005) is None
+        index.close()
+
+
+class TestTimezoneAt:
+    """Test cases for the lookup entry point."""
+
+    def test_without_index(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Without an index no zone is made up."""
+        monkeypatch.setenv(timezones.TIMEZONE_DATA_ENV, str(tmp_path / "missing.bin"))
+        monkeypatch.setattr(timezones, "DATA_DIR", tmp_path)
+        assert timezone_at(40.7, -74.0) is None
+
+    def test_uses_installed_index(self, index_path: Path) -> None:
+        """Points inside a zone come from the index, others have none."""
+        assert timezone_at(40.7, -74.0) == "America/New_York"
+        assert timezone_at(0.0, 0.0) is None
+        with pytest.raises(ValueError, match="latitude"):
+            timezone_at(91.0, 0.0)
+
+    @pytest.mark.parametrize(
+        ("latitude", "longitude", "zone"),
+        [
+            (40.4168, -3.7038, "Europe/Madrid"),
+            (48.8566, 2.3522, "Europe/Paris"),
+            (28.6139, 77.2090, "Asia/Kolkata"),
+            (27.7172, 85.3240, "Asia/Kathmandu"),
+            (39.4704, 75.9898, "Asia/Shanghai"),
+            (40.7128, -74.0060, "America/New_York"),
+            (39.7684, -86.1581, "America/Indiana/Indianapolis"),
+            (33.4484, -112.0740, "America/Phoenix"),
+            (-33.8688, 151.2093, "Australia/Sydney"),
+            (0.0, -30.0, "Etc/GMT+2"),
+        ],
+    )
+    def test_bundled_index(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        latitude: float,
+        longitude: float,
+        zone: str,
+    ) -> None:
+        """The shipped index resolves real zones, oceans included."""
+        monkeypatch.delenv(timezones.TIMEZONE_DATA_ENV, raising=False)
+        assert timezone_at(latitude, longitude) == zone
+
+
+class TestTimezoneTools:
+    """Test cases for timezone enrichment through the server."""
+
+    @pytest.mark.asyncio
+    async def test_get_coordinates_opt_in(self, index_path: Path) -> None:
+        """Results carry a timezone only when asked for."""
+        with patch("aiohttp.ClientSession.get") as mock_get:
+            plain = await geocode_location("JFK")
+            enriched = await geocode_location("JFK", timezone=True)
+            result = await handle_call_tool(
+                "get_coordinates", {"location": "JFK", "timezone": True}
+            )
+        mock_get.assert_not_called()
+        assert "timezone" not in plain["coordinates"][0]
+        place = GeocodeResult.from_response(enriched).places[0]
+        assert place.timezone == "America/New_York"
+        response_data = json.loads(result[0].text)
+        assert response_data["coordinates"][0]["timezone"] == "America/New_York"
+
+    @pytest.mark.asyncio
+    async def test_timezone_at_tool(self, index_path: Path) -> None:
+        """The timezone_at tool reports the zone, or null where there is none."""
+        result = await handle_call_tool(
+            "timezone_at", {"latitude": 48.86, "longitude": 2.35}
+        )
+        assert json.loads(result[0].text) == {
+            "latitude": 48.86,
+            "longitude": 2.35,
+            "timezone": "Europe/Paris",
+        }
+        result = await handle_call_tool(
+            "timezone_at", {"latitude": 0.0, "longitude": 0.0}
+        )
+        assert json.loads(result[0].text)["timezone"] is None
+        result = await handle_call_tool("timezone_at", {"latitude": 48.86})
+        assert result[0].text == "Error: longitude parameter is required"
+
+    @pytest.mark.asyncio
+    async def test_timezone_at_tool_without_index(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Without an index the tool reports an error instead of a guess."""
+        monkeypatch.setenv(timezones.TIMEZONE_DATA_ENV, str(tmp_path / "missing.bin"))
+        monkeypatch.setattr(timezones, "DATA_DIR", tmp_path)
+        result = await handle_call_tool(
+            "timezone_at", {"latitude": 48.86, "longitude": 2.35}
+        )
+        assert result[0].text.startswith("Error: No timezone index installed")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])